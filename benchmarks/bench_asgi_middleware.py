@@ -0,0 +1,146 @@
+"""
+Benchmark: peticiones por segundo del servicio de autenticación con el stack de
+middleware anterior (BaseHTTPMiddleware) y con el stack ASGI puro de app_factory.
+
+Las peticiones se inyectan directamente en la aplicación ASGI (sin red ni
+uvicorn), así que la diferencia medida es el costo del stack en sí. Los
+endpoints elegidos no tocan Mongo: /health, /api/auth/me y /api/auth/verify-token.
+
+Uso:
+    python benchmarks/bench_asgi_middleware.py --seconds 3 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "microservices" / "auth"))
+sys.path.insert(0, str(ROOT / "common"))
+
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DATABASE_NAME", "blindcheck_bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ENCRYPTION_KEY", "bench")
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from slowapi.errors import RateLimitExceeded  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from app_factory import create_app  # noqa: E402
+from config import settings  # noqa: E402
+from routers import auth  # noqa: E402
+from utils.auth import create_access_token  # noqa: E402
+from utils.limiter import limiter  # noqa: E402
+
+def legacy_app() -> FastAPI:
+    """Réplica del main.py anterior (SecurityHeadersMiddleware sobre BaseHTTPMiddleware)"""
+    app = FastAPI(title="Auth Service (legacy)")
+
+    class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            response = await call_next(request)
+            response.headers["X-Content-Type-Options"] = "nosniff"
+            response.headers["X-Frame-Options"] = "DENY"
+            response.headers["X-XSS-Protection"] = "1; mode=block"
+            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+            return response
+
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, lambda request, exc: JSONResponse({"detail": "Rate limit exceeded"}, status_code=429))
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.allowed_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(auth.router)
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy", "service": "auth"}
+
+    return app
+
+def factory_app() -> FastAPI:
+    return create_app(service="auth", title="Auth Service", description="bench", routers=[auth.router])
+
+async def call(app, method: str, path: str, headers: list) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    status_code = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await app(scope, receive, send)
+    return status_code
+
+async def run(app, method: str, path: str, headers: list, seconds: float, concurrency: int) -> float:
+    status_code = await call(app, method, path, headers)
+    if status_code != 200:
+        raise RuntimeError(f"{method} {path} respondió {status_code}")
+
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await call(app, method, path, headers)
+            done += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done / (time.perf_counter() - start)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    # Los límites de login/verify-token cortarían el benchmark con 429
+    limiter.enabled = False
+    token = create_access_token({"sub": "EST0001", "role": "estudiante", "email": "bench@blindcheck.edu"})
+    base_headers = [(b"host", b"testserver"), (b"origin", b"http://localhost:5173")]
+    auth_headers = base_headers + [(b"authorization", f"Bearer {token}".encode())]
+
+    endpoints = [
+        ("GET", "/health", base_headers),
+        ("GET", "/api/auth/me", auth_headers),
+        ("POST", "/api/auth/verify-token", auth_headers),
+    ]
+    apps = {"BaseHTTPMiddleware": legacy_app(), "ASGI puro": factory_app()}
+
+    print(f"{'endpoint':<28} {'BaseHTTPMiddleware':>20} {'ASGI puro':>12} {'mejora':>8}")
+    for method, path, headers in endpoints:
+        rps = {name: await run(app, method, path, headers, args.seconds, args.concurrency) for name, app in apps.items()}
+        before, after = rps["BaseHTTPMiddleware"], rps["ASGI puro"]
+        print(f"{method + ' ' + path:<28} {before:>17,.0f}/s {after:>9,.0f}/s {after / before - 1:>+7.0%}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
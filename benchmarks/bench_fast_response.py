@@ -0,0 +1,98 @@
+"""
+Benchmark: filas por segundo de un listado con response_model=List[...].
+
+Compara el camino clásico (modelo Pydantic por fila + validación/serialización
+de FastAPI + json.dumps) con el camino rápido de utils.responses (dicts + orjson).
+
+Uso:
+    python benchmarks/bench_fast_response.py --rows 100 1000 5000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "common"))
+
+# Settings exige estas variables aunque el benchmark no toque Mongo
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DATABASE_NAME", "blindcheck_bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ENCRYPTION_KEY", "bench")
+
+from bson import ObjectId  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from models.schemas import SolicitudResponse  # noqa: E402
+from utils.responses import FastJSONResponse, _model_defaults  # noqa: E402
+
+def build_rows(n: int) -> List[dict]:
+    base = datetime(2026, 1, 15, 8, 30)
+    estados = ["pendiente", "en_revision", "calificada", "rechazada"]
+    return [
+        {
+            "id": str(ObjectId()),
+            "estudiante_id": f"EST{i:04d}",
+            "estudiante_nombre_anonimo": f"Usuario-{i:06x}",
+            "materia_id": str(ObjectId()),
+            "materia_nombre": "Estructuras de Datos",
+            "docente_id": f"DOC{i % 200:04d}",
+            "docente_nombre_anonimo": f"Usuario-{i * 7:06x}",
+            "grupo": "GR1",
+            "aporte": "Examen",
+            "calificacion_actual": 6.5,
+            "motivo": "Solicito la revisión de la pregunta 3 del examen. " * 4,
+            "estado": estados[i % len(estados)],
+            "fecha_creacion": base + timedelta(minutes=i),
+            "fecha_actualizacion": base + timedelta(minutes=i, seconds=30),
+        }
+        for i in range(n)
+    ]
+
+_adapter = TypeAdapter(List[SolicitudResponse])
+
+def classic_path(rows: List[dict]) -> bytes:
+    """Lo que hacía el endpoint: modelo por fila y FastAPI revalida/serializa la lista"""
+    models = [SolicitudResponse(**row) for row in rows]
+    # FastAPI (_prepare_response_content) vuelca cada modelo a dict antes de validar
+    content = [m.model_dump() for m in models]
+    validated = _adapter.validate_python(content)
+    serialized = _adapter.dump_python(validated, mode="json")
+    return json.dumps(serialized, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def fast_path(rows: List[dict], accept_encoding: str = "") -> bytes:
+    defaults = _model_defaults(SolicitudResponse)
+    return FastJSONResponse([{**defaults, **row} for row in rows], accept_encoding=accept_encoding).body
+
+def measure(fn, rows: List[dict], min_seconds: float) -> float:
+    """Devuelve filas/segundo repitiendo la función durante al menos min_seconds"""
+    iterations = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        fn(rows)
+        iterations += 1
+        elapsed = time.perf_counter() - start
+    return iterations * len(rows) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--seconds", type=float, default=2.0, help="Tiempo mínimo por medición")
+    args = parser.parse_args()
+
+    print(f"{'filas':>8} {'clásico filas/s':>18} {'orjson filas/s':>18} {'orjson+gzip filas/s':>22} {'speedup':>8}")
+    for n in args.rows:
+        rows = build_rows(n)
+        classic = measure(classic_path, rows, args.seconds)
+        fast = measure(fast_path, rows, args.seconds)
+        fast_gzip = measure(lambda r: fast_path(r, "gzip"), rows, args.seconds)
+        print(f"{n:>8} {classic:>18,.0f} {fast:>18,.0f} {fast_gzip:>22,.0f} {fast / classic:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
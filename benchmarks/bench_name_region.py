@@ -0,0 +1,213 @@
+"""
+Benchmark: detección del área del nombre (utils/name_region.py).
+
+Mide tiempo por imagen (desde los bytes JPEG, como en upload-temp) y acierto
+contra un conjunto etiquetado. Una propuesta acierta si su corte (y + height)
+cae entre el final del encabezado y el comienzo del cuerpo: ni el nombre queda
+visible ni se pierde la primera línea de respuestas.
+
+Sin --dir se genera un conjunto sintético reproducible de hojas fotografiadas:
+encabezado con "Nombre: ____", cuerpo de respuestas, iluminación despareja,
+ruido, a veces recuadro en el encabezado, borde oscuro de la mesa o la foto
+girada con orientación EXIF.
+
+Con --dir se usa un conjunto real: imágenes más un labels.json con el rango
+de corte aceptable de cada una, en píxeles de la imagen orientada:
+    {"examen01.jpg": {"corte_min": 410, "corte_max": 470}, ...}
+
+Uso:
+    python benchmarks/bench_name_region.py --images 200
+    python benchmarks/bench_name_region.py --dir ~/etiquetadas --budget-ms 5
+"""
+import argparse
+import io
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "common"))
+
+import numpy as np  # noqa: E402
+from PIL import Image, ImageDraw  # noqa: E402
+
+from utils.name_region import ORIENTATION_TAG, detect_name_region, load_gray, propose_crop, scale_area  # noqa: E402
+
+Sample = Tuple[str, bytes, int, int]
+
+def draw_words(draw: ImageDraw.ImageDraw, rng: random.Random, x0: int, x1: int, y: int, line_h: int, ink: int):
+    """Una línea de 'palabras' (rectángulos de altura de letra) entre x0 y x1"""
+    x = x0
+    while x < x1:
+        width = rng.randint(line_h, line_h * 5)
+        if x + width > x1:
+            break
+        top = y + rng.randint(0, line_h // 6)
+        draw.rectangle([x, top, x + width, top + int(line_h * 0.6)], fill=ink)
+        x += width + rng.randint(line_h // 3, line_h)
+
+def synthetic_page(rng: random.Random) -> Tuple[Image.Image, int, int]:
+    """Hoja sintética y su rango de corte aceptable (fin del encabezado, inicio del cuerpo)"""
+    width = rng.choice([1200, 1600, 2000])
+    height = int(width * rng.uniform(1.3, 1.45))
+    line_h = int(width * rng.uniform(0.018, 0.028))
+    margin = int(width * rng.uniform(0.06, 0.1))
+    ink = rng.randint(20, 70)
+
+    # Papel con iluminación despareja (gradiente en los dos ejes)
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+    paper = 235 - 45 * (ys / height) * rng.uniform(0, 1) - 35 * (xs / width) * rng.uniform(0, 1)
+    img = Image.fromarray(paper.clip(0, 255).astype(np.uint8), "L")
+    draw = ImageDraw.Draw(img)
+
+    # Encabezado: institución y materia, después la línea del nombre
+    y = int(height * rng.uniform(0.03, 0.08))
+    header_top = y
+    for _ in range(rng.randint(1, 3)):
+        draw_words(draw, rng, margin, width - margin, y, line_h, ink)
+        y += int(line_h * rng.uniform(1.4, 1.9))
+    draw_words(draw, rng, margin, margin + line_h * 4, y, line_h, ink)
+    rule_y = y + int(line_h * 0.75)
+    draw.line([margin + line_h * 5, rule_y, width - margin, rule_y], fill=ink, width=max(2, line_h // 10))
+    draw_words(draw, rng, margin + line_h * 6, int(width * 0.6), y - line_h // 6, line_h, ink)
+    header_bottom = rule_y + max(2, line_h // 10)
+    if rng.random() < 0.3:
+        # Encabezado en recuadro
+        box = (margin // 2, header_top - line_h // 2, width - margin // 2, header_bottom + line_h // 2)
+        draw.rectangle(box, outline=ink, width=max(2, line_h // 10))
+        header_bottom = box[3] + max(2, line_h // 10)
+
+    # Cuerpo: el hueco tras el encabezado a veces no es mayor que los huecos entre párrafos
+    body_top = header_bottom + int(line_h * rng.uniform(1.5, 5))
+    y = body_top
+    while y < height - margin - line_h:
+        draw_words(draw, rng, margin, width - margin, y, line_h, ink)
+        y += int(line_h * rng.uniform(1.4, 1.9))
+        if rng.random() < 0.12:
+            y += int(line_h * rng.uniform(0.5, 1.5))
+
+    if rng.random() < 0.2:
+        # Borde de la mesa a un costado de la foto
+        side = rng.choice([0, width - int(width * 0.04)])
+        draw.rectangle([side, 0, side + int(width * 0.04), height], fill=rng.randint(10, 40))
+
+    # Ruido de sensor
+    noisy = np.asarray(img, dtype=np.float32) + np.random.default_rng(rng.randint(0, 2 ** 31)).normal(0, 6, (height, width))
+    img = Image.fromarray(noisy.clip(0, 255).astype(np.uint8), "L").convert("RGB")
+    return img, header_bottom, body_top
+
+def synthetic_samples(count: int, seed: int, quality: int) -> List[Sample]:
+    rng = random.Random(seed)
+    samples = []
+    for i in range(count):
+        img, corte_min, corte_max = synthetic_page(rng)
+        options = {"quality": quality}
+        if rng.random() < 0.25:
+            # Foto del celular en horizontal: píxeles girados + orientación EXIF 6
+            img = img.transpose(Image.Transpose.ROTATE_90)
+            exif = Image.Exif()
+            exif[ORIENTATION_TAG] = 6
+            options["exif"] = exif.tobytes()
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", **options)
+        samples.append((f"sintetica-{i:04d}.jpg", buffer.getvalue(), corte_min, corte_max))
+    return samples
+
+def labelled_samples(directory: Path) -> List[Sample]:
+    labels = json.loads((directory / "labels.json").read_text())
+    return [
+        (name, (directory / name).read_bytes(), label["corte_min"], label["corte_max"])
+        for name, label in sorted(labels.items())
+    ]
+
+def run(samples: List[Sample], verbose: bool) -> dict:
+    for _, data, _, _ in samples[:3]:
+        detect_name_region(data)  # calentamiento (imports, cachés)
+
+    decode, analysis, times = [], [], []
+    hits, misses, none = 0, 0, 0
+    errors = []
+    for name, data, corte_min, corte_max in samples:
+        # Mismos pasos que detect_name_region, medidos por separado
+        start = time.perf_counter()
+        gray, size = load_gray(data)
+        decoded = time.perf_counter()
+        area = propose_crop(gray)
+        area = scale_area(area, gray.shape, size) if area else None
+        end = time.perf_counter()
+        decode.append((decoded - start) * 1000)
+        analysis.append((end - decoded) * 1000)
+        times.append((end - start) * 1000)
+        if area is None:
+            none += 1
+            if verbose:
+                print(f"  {name}: sin propuesta (esperado {corte_min}-{corte_max})")
+            continue
+        corte = area["y"] + area["height"]
+        if corte_min <= corte <= corte_max:
+            hits += 1
+        else:
+            misses += 1
+            errors.append(min(abs(corte - corte_min), abs(corte - corte_max)))
+            if verbose:
+                print(f"  {name}: corte {corte} fuera de {corte_min}-{corte_max} (confianza {area['confianza']})")
+
+    def percentiles(values, prefix):
+        values = sorted(values)
+        return {
+            f"{prefix}_p50": round(statistics.median(values), 2),
+            f"{prefix}_p95": round(values[max(0, int(len(values) * 0.95) - 1)], 2),
+        }
+
+    return {
+        "imagenes": len(samples),
+        "aciertos": hits,
+        "fallos": misses,
+        "sin_propuesta": none,
+        "acierto": round(hits / len(samples), 3) if samples else 0.0,
+        "error_medio_px": round(statistics.mean(errors), 1) if errors else 0.0,
+        "bytes_medio": round(statistics.mean(len(data) for _, data, _, _ in samples)),
+        **percentiles(times, "ms"),
+        **percentiles(decode, "ms_decodificar"),
+        **percentiles(analysis, "ms_analisis"),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", type=Path, help="Conjunto etiquetado real (imágenes + labels.json)")
+    parser.add_argument("--images", type=int, default=100, help="Imágenes sintéticas a generar")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--quality", type=int, default=85, help="Calidad JPEG de las sintéticas")
+    parser.add_argument("--verbose", action="store_true", help="Lista cada fallo")
+    parser.add_argument("--budget-ms", type=float, help="Sale con código 1 si el p95 del análisis lo excede")
+    parser.add_argument("--json", type=Path, help="Guarda los resultados en JSON")
+    args = parser.parse_args()
+
+    if args.dir:
+        samples = labelled_samples(args.dir)
+    else:
+        print(f"Generando {args.images} hojas sintéticas (seed {args.seed})...")
+        samples = synthetic_samples(args.images, args.seed, args.quality)
+
+    result = run(samples, args.verbose)
+    print(f"Imágenes: {result['imagenes']}")
+    print(f"Acierto: {result['acierto']:.1%} ({result['aciertos']} aciertos, {result['fallos']} fallos, "
+          f"{result['sin_propuesta']} sin propuesta; error medio de los fallos {result['error_medio_px']} px)")
+    print(f"Tiempo por imagen ({result['bytes_medio'] / 1024:,.0f} KiB de media): "
+          f"p50 {result['ms_p50']} ms, p95 {result['ms_p95']} ms")
+    print(f"  decodificar: p50 {result['ms_decodificar_p50']} ms, p95 {result['ms_decodificar_p95']} ms")
+    print(f"  análisis:    p50 {result['ms_analisis_p50']} ms, p95 {result['ms_analisis_p95']} ms")
+
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+    if args.budget_ms is not None and result["ms_analisis_p95"] > args.budget_ms:
+        print(f"p95 del análisis {result['ms_analisis_p95']} ms excede el presupuesto de {args.budget_ms} ms")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
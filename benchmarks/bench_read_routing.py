@@ -0,0 +1,129 @@
+"""
+Benchmark: carga del primario con y sin ruteo de listados a secundarios.
+
+Requiere el replica set local de benchmarks/replset/start_replset.sh. Ejecuta la
+misma carga de listados (logs y solicitudes) con la política "primary" y con la
+política "listing", y compara las consultas que atendió cada miembro a partir
+de serverStatus().opcounters.
+
+Uso:
+    ./benchmarks/replset/start_replset.sh
+    python benchmarks/bench_read_routing.py --seed --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "common"))
+
+MEMBERS = ["localhost:27017", "localhost:27018", "localhost:27019"]
+
+os.environ.setdefault("MONGODB_URL", f"mongodb://{','.join(MEMBERS)}/?replicaSet=rs0")
+os.environ.setdefault("DATABASE_NAME", "blindcheck_bench_rs")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ENCRYPTION_KEY", "bench")
+
+from pymongo import MongoClient, WriteConcern  # noqa: E402
+
+from database import (  # noqa: E402
+    connect_to_mongo, close_mongo_connection, get_database, routed,
+    logs_collection, solicitudes_collection
+)
+from utils.queries import Projection, find_list  # noqa: E402
+
+LOG = Projection("usuario_id", "rol", "accion", "detalle", "fecha", "ip")
+SOLICITUD = Projection("estudiante_id", "materia_id", "docente_id", "grupo", "aporte", "estado", "fecha_creacion")
+
+def opcounters() -> dict:
+    """Consultas (find) atendidas por cada miembro, leyendo directamente su serverStatus"""
+    counts = {}
+    for member in MEMBERS:
+        client = MongoClient(f"mongodb://{member}/?directConnection=true", serverSelectionTimeoutMS=3000)
+        status = client.admin.command("serverStatus")
+        counts[member] = status["opcounters"]["query"]
+        client.close()
+    return counts
+
+def primary_member() -> str:
+    client = MongoClient(f"mongodb://{MEMBERS[0]}/?directConnection=true")
+    hello = client.admin.command("hello")
+    client.close()
+    return hello["primary"]
+
+async def seed(n_logs: int, n_solicitudes: int):
+    db = get_database()
+    majority = WriteConcern(w="majority")
+    await db.logs.with_options(write_concern=majority).delete_many({})
+    await db.solicitudes.with_options(write_concern=majority).delete_many({})
+    base = datetime.utcnow()
+    await db.logs.with_options(write_concern=majority).insert_many([
+        {"usuario_id": f"EST{i % 500:04d}", "rol": "estudiante", "accion": "LOGIN",
+         "detalle": "Inicio de sesión exitoso", "fecha": base - timedelta(seconds=i), "ip": "10.0.0.1"}
+        for i in range(n_logs)
+    ])
+    await db.solicitudes.with_options(write_concern=majority).insert_many([
+        {"estudiante_id": f"EST{i % 500:04d}", "materia_id": "M1", "docente_id": f"DOC{i % 50:04d}",
+         "grupo": "GR1", "aporte": "Examen", "estado": "pendiente", "fecha_creacion": base - timedelta(minutes=i)}
+        for i in range(n_solicitudes)
+    ])
+    await db.logs.create_index([("fecha", -1)])
+    await db.solicitudes.create_index([("fecha_creacion", -1)])
+
+async def workload(policy: str, requests: int, concurrency: int) -> float:
+    logs = routed(logs_collection, policy)
+    solicitudes = routed(solicitudes_collection, policy)
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            if i % 2:
+                await find_list(logs, {}, LOG, sort=[("fecha", -1)], limit=100, length=100)
+            else:
+                await find_list(solicitudes, {}, SOLICITUD, sort=[("fecha_creacion", -1)], length=1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="Recrear datos de prueba")
+    parser.add_argument("--logs", type=int, default=50_000)
+    parser.add_argument("--solicitudes", type=int, default=5_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    if args.seed:
+        await seed(args.logs, args.solicitudes)
+
+    primary = primary_member()
+    results = {}
+    for policy in ("primary", "listing"):
+        before = opcounters()
+        elapsed = await workload(policy, args.requests, args.concurrency)
+        after = opcounters()
+        served = {m: after[m] - before[m] for m in MEMBERS}
+        total = sum(served.values()) or 1
+        results[policy] = served[primary]
+        print(f"\nPolítica '{policy}': {args.requests / elapsed:,.0f} req/s")
+        for member in MEMBERS:
+            tag = " (primario)" if member == primary else ""
+            print(f"   {member}{tag}: {served[member]:>8} consultas ({served[member] / total:.0%})")
+
+    if results["primary"]:
+        reduction = 1 - results["listing"] / results["primary"]
+        print(f"\n📉 Reducción de consultas en el primario: {reduction:.0%}")
+    close_mongo_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+"""
+Benchmark: costo de arranque de cada microservicio.
+
+Para cada servicio mide:
+  - import de main.py con `python -X importtime`: total y los paquetes que más
+    aportan (tiempo propio agregado por paquete raíz);
+  - tiempo hasta la primera petición: desde que se lanza uvicorn hasta que
+    /health responde 200, más la duración del lifespan que el servicio publica
+    en /metrics (service_startup_seconds).
+
+El arranque real necesita Mongo (el lifespan calienta el pool y el admin
+revisa el marcador del seed); usa MONGODB_URL / DATABASE_NAME del entorno.
+
+Uso:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --service teacher --top 15 --budget-ms 3000 --json startup.json
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SERVICES = ["auth", "student", "teacher", "admin"]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+LIFESPAN_METRIC = re.compile(r'^service_startup_seconds\{phase="lifespan"\} (\S+)', re.MULTILINE)
+
+def service_env(service: str) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(ROOT / "microservices" / service), str(ROOT / "common")])
+    env.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+    env.setdefault("DATABASE_NAME", "blindcheck_bench")
+    env.setdefault("SECRET_KEY", "bench")
+    env.setdefault("ENCRYPTION_KEY", "bench")
+    return env
+
+def parse_importtime(stderr: str):
+    """(total_us, {paquete_raíz: self_us}) a partir de la salida de -X importtime"""
+    total = 0
+    per_package = defaultdict(int)
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match[1]), int(match[2]), match[3], match[4]
+        per_package[name.split(".")[0]] += self_us
+        # Solo los imports de primer nivel suman al total (los anidados ya están en su acumulado)
+        if not indent:
+            total += cumulative_us
+    return total, per_package
+
+def measure_imports(service: str, workdir: str, runs: int):
+    totals = []
+    breakdown = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=workdir, env=service_env(service), capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"{service}: import main falló\n{result.stderr[-2000:]}")
+        total, per_package = parse_importtime(result.stderr)
+        totals.append(total)
+        if breakdown is None or total <= min(totals):
+            breakdown = per_package
+    return statistics.median(totals) / 1000, breakdown
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_first_request(service: str, workdir: str, timeout: float = 30.0):
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=workdir, env=service_env(service), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        ready = time.perf_counter() - start
+                        break
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            if process.poll() is not None:
+                raise RuntimeError(f"{service}: uvicorn terminó\n{process.stderr.read().decode()[-2000:]}")
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError(f"{service}: /health no respondió en {timeout:.0f} s")
+            time.sleep(0.01)
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            match = LIFESPAN_METRIC.search(response.read().decode())
+        lifespan = float(match[1]) if match else None
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return ready * 1000, lifespan * 1000 if lifespan is not None else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", action="append", choices=SERVICES, help="Servicio a medir (repetible)")
+    parser.add_argument("--runs", type=int, default=3, help="Repeticiones por medición (se reporta la mediana)")
+    parser.add_argument("--top", type=int, default=8, help="Paquetes más caros a listar")
+    parser.add_argument("--skip-first-request", action="store_true", help="Solo medir imports (sin Mongo)")
+    parser.add_argument("--budget-ms", type=float, help="Sale con código 1 si algún servicio lo excede")
+    parser.add_argument("--json", type=Path, help="Guarda los resultados en JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for service in args.service or SERVICES:
+        # Directorio de trabajo aislado: uploads/ (almacenamiento local) es relativo al cwd
+        with tempfile.TemporaryDirectory(prefix=f"bench-{service}-") as workdir:
+            import_ms, breakdown = measure_imports(service, workdir, args.runs)
+            result = {
+                "import_ms": round(import_ms, 1),
+                "top_packages_ms": {
+                    name: round(us / 1000, 1)
+                    for name, us in sorted(breakdown.items(), key=lambda item: -item[1])[:args.top]
+                },
+            }
+            if not args.skip_first_request:
+                samples = [measure_first_request(service, workdir) for _ in range(args.runs)]
+                result["first_request_ms"] = round(statistics.median(ready for ready, _ in samples), 1)
+                lifespans = [lifespan for _, lifespan in samples if lifespan is not None]
+                result["lifespan_ms"] = round(statistics.median(lifespans), 1) if lifespans else None
+        results[service] = result
+
+        line = f"{service:<8} import {result['import_ms']:>7.1f} ms"
+        if "first_request_ms" in result:
+            line += f"   primera petición {result['first_request_ms']:>7.1f} ms"
+            if result["lifespan_ms"] is not None:
+                line += f" (lifespan {result['lifespan_ms']:.1f} ms)"
+        print(line)
+        print("         " + ", ".join(f"{name} {ms:.1f}" for name, ms in result["top_packages_ms"].items()))
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+    if args.budget_ms is not None:
+        key = "import_ms" if args.skip_first_request else "first_request_ms"
+        over = [service for service, result in results.items() if result[key] > args.budget_ms]
+        if over:
+            print(f"\nExceden el presupuesto de {args.budget_ms:.0f} ms: {', '.join(over)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
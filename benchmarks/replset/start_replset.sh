@@ -0,0 +1,34 @@
+#!/bin/sh
+# Levanta un replica set local de tres miembros en un solo host (puertos 27017-27019).
+# Uso: ./start_replset.sh [directorio_datos]
+#
+# Después exportar:
+#   MONGODB_URL="mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0"
+set -e
+
+DATA_DIR="${1:-/tmp/blindcheck-rs}"
+PORTS="27017 27018 27019"
+
+for port in $PORTS; do
+    mkdir -p "$DATA_DIR/$port"
+    mongod --replSet rs0 --port "$port" --bind_ip localhost \
+        --dbpath "$DATA_DIR/$port" --logpath "$DATA_DIR/$port/mongod.log" \
+        --fork --wiredTigerCacheSizeGB 0.25
+done
+
+mongosh --quiet --port 27017 --eval '
+try {
+    rs.status();
+} catch (e) {
+    rs.initiate({
+        _id: "rs0",
+        members: [
+            { _id: 0, host: "localhost:27017", priority: 2 },
+            { _id: 1, host: "localhost:27018" },
+            { _id: 2, host: "localhost:27019" }
+        ]
+    });
+}
+while (!db.hello().isWritablePrimary) { sleep(500); }
+print("✅ Replica set rs0 listo (primario: localhost:27017)");
+'
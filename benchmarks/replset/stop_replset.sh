@@ -0,0 +1,7 @@
+#!/bin/sh
+# Detiene el replica set local levantado con start_replset.sh
+DATA_DIR="${1:-/tmp/blindcheck-rs}"
+
+for port in 27019 27018 27017; do
+    mongod --shutdown --dbpath "$DATA_DIR/$port" || true
+done
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable
+
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from fastapi.staticfiles import StaticFiles
+from slowapi.errors import RateLimitExceeded
+
+from config import settings
+from database import connect_to_mongo, close_mongo_connection
+from utils.app_logging import configure_logging, stop_logging
+from utils.limiter import limiter
+from utils.metrics import SERVICE_STARTUP, MetricsMiddleware, metrics_response, monitor_event_loop_lag
+from utils.middleware import SecurityHeadersMiddleware, TimingMiddleware
+from utils.mongo_monitoring import pool_monitor
+from utils.query_budget import QueryBudgetMiddleware
+
+logger = logging.getLogger(__name__)
+
+# Respaldo para process_age() fuera de Linux
+_IMPORTED_AT = time.perf_counter()
+
+# =============== FÁBRICA DE SERVICIOS ===============
+
+def process_age() -> float:
+    """Segundos desde que arrancó el proceso (incluye intérprete e imports)"""
+    try:
+        with open("/proc/self/stat") as stat, open("/proc/uptime") as uptime:
+            # starttime es el campo 22, en ticks desde el boot; comm (campo 2) puede tener espacios
+            fields = stat.read().rsplit(")", 1)[1].split()
+            started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+            return float(uptime.read().split()[0]) - started
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter() - _IMPORTED_AT
+
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    return JSONResponse({"detail": "Rate limit exceeded"}, status_code=429)
+
+def create_app(
+    *,
+    service: str,
+    title: str,
+    description: str,
+    routers: Iterable[APIRouter],
+    on_startup: Iterable[Callable[[], Awaitable[None]]] = (),
+    on_shutdown: Iterable[Callable[[], Awaitable[None]]] = (),
+    background_tasks: Iterable[Callable[[], Awaitable[None]]] = (),
+    mount_uploads: bool = False,
+) -> FastAPI:
+    """
+    Construye un microservicio con la configuración común: conexión a Mongo en el
+    lifespan, logging estructurado, headers de seguridad, tiempos, CORS, rate limiting, /health y /metrics.
+
+    on_startup corre antes de aceptar tráfico; background_tasks se lanzan como
+    tareas que viven mientras el servicio esté arriba y se cancelan al apagarlo,
+    antes de correr on_shutdown.
+    """
+    configure_logging(service)
+    startup_hooks = list(on_startup)
+    shutdown_hooks = list(on_shutdown)
+    background = list(background_tasks)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        lifespan_start = time.perf_counter()
+        await connect_to_mongo()
+        for hook in startup_hooks:
+            await hook()
+        tasks = [asyncio.create_task(monitor_event_loop_lag())]
+        tasks += [asyncio.create_task(task()) for task in background]
+
+        lifespan_s = time.perf_counter() - lifespan_start
+        total_s = process_age()
+        SERVICE_STARTUP.labels("lifespan").set(lifespan_s)
+        SERVICE_STARTUP.labels("total").set(total_s)
+        log = logger.warning if total_s * 1000 > settings.startup_budget_ms else logger.info
+        log("Servicio listo", extra={
+            "startup_ms": round(total_s * 1000), "lifespan_ms": round(lifespan_s * 1000),
+            "budget_ms": settings.startup_budget_ms,
+        })
+        yield
+        for task in tasks:
+            task.cancel()
+        for hook in shutdown_hooks:
+            await hook()
+        close_mongo_connection()
+        stop_logging()
+
+    app = FastAPI(
+        title=title,
+        description=description,
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+
+    # Rate Limiting (los límites se declaran con @limiter.limit en cada endpoint)
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+
+    # Middleware (el último agregado es el más externo):
+    # métricas > presupuesto de consultas > CORS > seguridad > tiempos
+    app.add_middleware(TimingMiddleware)
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.allowed_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        # Cursor de paginación de los listados por keyset (ej. /api/subdecano/logs)
+        expose_headers=["X-Next-Cursor"],
+    )
+    app.add_middleware(QueryBudgetMiddleware)
+    app.add_middleware(MetricsMiddleware)
+
+    if mount_uploads:
+        upload_dir = Path("uploads")
+        upload_dir.mkdir(exist_ok=True)
+        app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+
+    for router in routers:
+        app.include_router(router)
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy", "service": service, "mongo_pool": pool_monitor.snapshot()}
+
+    # Solo accesible dentro de la red de Docker: el gateway no enruta /metrics
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return metrics_response()
+
+    return app
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 # =============== CONFIGURACIÓN ===============
@@ -11,6 +12,115 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     allowed_origins: list[str] = ["http://localhost:5173", "http://127.0.0.1:5173"]
 
+    # Pool de conexiones de MongoDB (Motor)
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    mongo_wait_queue_timeout_ms: Optional[int] = None
+    # Compresión de protocolo en orden de preferencia: zstd, snappy, zlib
+    mongo_compressors: list[str] = ["zstd", "zlib"]
+    mongo_read_preference: str = "primary"
+    # Read preference por colección, ej. {"logs": "secondaryPreferred"}
+    mongo_collection_read_preferences: dict[str, str] = {}
+    # Read concern ("local", "majority", ...); None usa el del servidor
+    mongo_read_concern: Optional[str] = None
+    # Ruteo de lecturas por política (ver database.routed): "primary" para flujos
+    # que leen lo que acaban de escribir, "listing" para reportes y selectores
+    mongo_read_policies: dict[str, str] = {"primary": "primary", "listing": "secondaryPreferred"}
+    # Atraso máximo tolerado en secundarios para políticas no primarias (mínimo 90 s)
+    mongo_max_staleness_seconds: int = 90
+
+    # Respuestas rápidas: los listados se serializan con orjson sin revalidar con Pydantic
+    fast_responses: bool = False
+    # Tamaño mínimo (bytes) a partir del cual se comprime una respuesta rápida
+    response_compression_min_size: int = 1024
+    # Desarrollo/CI: falla si un handler lee un campo fuera de su proyección declarada
+    strict_projections: bool = False
+
+    # Modo debug: agrega headers de diagnóstico (X-Mongo-Queries, ...)
+    debug: bool = False
+    # Presupuesto de consultas por petición: warning al superar el total o al
+    # repetir la misma forma de consulta (posible N+1) este número de veces
+    query_budget_warn_threshold: int = 25
+    query_budget_repeat_threshold: int = 10
+
+    # Presupuesto de arranque (ms desde que arranca el proceso hasta aceptar tráfico):
+    # si se excede se registra un warning
+    startup_budget_ms: int = 5000
+
+    # Rate limiting de slowapi; las pruebas de carga lo apagan (RATE_LIMIT_ENABLED=false)
+    rate_limit_enabled: bool = True
+
+    # Logging estructurado (ver utils/app_logging.py)
+    log_level: str = "INFO"
+    # Nivel por módulo, ej. {"routers.docente": "DEBUG", "pymongo": "WARNING"}
+    log_levels: dict[str, str] = {}
+    log_json: bool = True
+    # Máximo de registros DEBUG por segundo y por logger (0 = sin límite)
+    log_debug_rate_per_second: float = 20.0
+
+    # Retención de la colección logs (índice TTL sobre fecha, ver utils/audit_store.py);
+    # 0 = sin expiración. Debe ser mayor que logs_archive_after_days para que el
+    # TTL no borre logs que todavía no se archivaron
+    logs_retention_days: int = 365
+    # Archivo frío (tools/archive_logs.py, ver utils/log_archive.py)
+    logs_archive_after_days: int = 180
+    logs_archive_dir: str = "archive/logs"
+
+    # Reconciliación de las estadísticas del dashboard (utils/stats.py); 0 = desactivada
+    stats_reconcile_interval_seconds: int = 3600
+
+    # Cuánto se reutiliza en memoria una versión de utils/etags.py antes de releerla
+    etag_version_cache_seconds: float = 2.0
+
+    # Descargas de evidencias delegadas al gateway con X-Accel-Redirect (utils/downloads.py);
+    # sin gateway (desarrollo) el archivo lo sirve el propio servicio
+    accel_redirect: bool = False
+    accel_redirect_location: str = "/_protected/uploads/"
+
+    # Almacenamiento de evidencias (utils/storage.py): "local" o "s3"
+    storage_backend: str = "local"
+    storage_local_root: str = "uploads"
+    # Niveles de subdirectorio por prefijo del hash: evidencias/3f/9a/3f9a...jpg
+    # (0 = directorio plano; los archivos planos se migran con tools/migrate_fanout.py)
+    storage_local_fanout: int = 2
+    # S3 o compatible (MinIO, moto): s3_endpoint_url=None usa AWS
+    s3_bucket: str = "blindcheck-evidencias"
+    s3_prefix: str = ""
+    s3_endpoint_url: Optional[str] = None
+    # Endpoint con el que se firman las URLs para el navegador (si difiere del interno)
+    s3_presign_endpoint_url: Optional[str] = None
+    s3_region: Optional[str] = None
+    s3_access_key_id: Optional[str] = None
+    s3_secret_access_key: Optional[str] = None
+    s3_multipart_threshold_bytes: int = 8 * 1024 * 1024
+    s3_multipart_part_bytes: int = 8 * 1024 * 1024
+    # Vigencia de las URLs firmadas a las que redirigen las descargas con S3
+    s3_presign_seconds: int = 300
+
+    # Subidas temporales para el recorte (utils/staging.py): vigencia y cada
+    # cuánto se barren las vencidas (0 = sin barrido)
+    staging_ttl_seconds: int = 3600
+    staging_sweep_interval_seconds: int = 300
+    # Subidas reanudables por bloques: vigencia desde el último bloque, tamaño
+    # máximo del archivo, bloque sugerido al cliente y máximo por PUT
+    upload_session_ttl_seconds: int = 86400
+    upload_session_max_bytes: int = 50 * 1024 * 1024
+    upload_session_chunk_bytes: int = 1024 * 1024
+    upload_session_max_chunk_bytes: int = 8 * 1024 * 1024
+    # Subida en lote: máximo de archivos por petición e hilos que procesan
+    # imágenes a la vez en cada proceso (utils/images.image_pool)
+    evidence_batch_max_files: int = 60
+    image_workers: int = 4
+
+    # Normalización de evidencias al guardarlas (utils/images.py): lado mayor
+    # máximo en píxeles, formato de salida ("jpeg" progresivo o "webp") y calidad
+    image_normalize: bool = True
+    image_max_edge: int = 2560
+    image_format: str = "jpeg"
+    image_quality: int = 82
+    # Propuesta automática del área del nombre en upload-temp (utils/name_region.py)
+    name_region_detect: bool = True
+
     class Config:
         env_file = ".env"
 
@@ -1,19 +1,163 @@
+import asyncio
+from typing import Optional
+
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
 from config import settings
+from utils.metrics import mongo_command_metrics
+from utils.mongo_monitoring import pool_monitor
+from utils.query_budget import query_budget_listener
 
 # =============== BASE DE DATOS ===============
+# El cliente se crea en el lifespan de cada servicio (connect_to_mongo) con la
+# configuración del pool definida en Settings. Los scripts (seed_db.py, etc.)
+# lo crean bajo demanda al usar la primera colección.
+
+_client: Optional[AsyncIOMotorClient] = None
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+def read_preference(mode: str, max_staleness: int = -1):
+    """Convierte un nombre de modo ('secondaryPreferred', ...) en un ReadPreference de pymongo"""
+    if mode not in READ_PREFERENCES:
+        raise ValueError(f"Read preference desconocida: {mode}")
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCES[mode](max_staleness=max_staleness)
+
+def create_client() -> AsyncIOMotorClient:
+    """Crea el cliente de Motor con el pool, compresión y lecturas configurados"""
+    options = {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "readPreference": settings.mongo_read_preference,
+        "event_listeners": [pool_monitor, mongo_command_metrics, query_budget_listener],
+    }
+    if settings.mongo_wait_queue_timeout_ms is not None:
+        options["waitQueueTimeoutMS"] = settings.mongo_wait_queue_timeout_ms
+    if settings.mongo_compressors:
+        options["compressors"] = ",".join(settings.mongo_compressors)
+    if settings.mongo_read_concern:
+        options["readConcernLevel"] = settings.mongo_read_concern
+    return AsyncIOMotorClient(settings.mongodb_url, **options)
+
+def get_client() -> AsyncIOMotorClient:
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
+
+def get_database():
+    return get_client()[settings.database_name]
+
+def get_collection(name: str):
+    """Obtiene una colección aplicando su read preference particular (si existe)"""
+    options = {}
+    mode = settings.mongo_collection_read_preferences.get(name)
+    if mode:
+        options["read_preference"] = read_preference(mode)
+    if settings.mongo_read_concern:
+        options["read_concern"] = ReadConcern(settings.mongo_read_concern)
+    return get_database().get_collection(name, **options)
+
+async def connect_to_mongo():
+    """Crea el cliente y calienta el pool antes de aceptar tráfico"""
+    client = get_client()
+    # Cada ping concurrente toma una conexión distinta: se abren minPoolSize conexiones
+    warm = max(1, settings.mongo_min_pool_size)
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(warm)))
+
+def close_mongo_connection():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+# =============== RUTEO DE LECTURAS ===============
+
+def policy_read_preference(policy: str):
+    """ReadPreference de una política de lectura definida en settings.mongo_read_policies"""
+    mode = settings.mongo_read_policies.get(policy)
+    if mode is None:
+        raise ValueError(f"Política de lectura desconocida: {policy}")
+    if mode == "primary":
+        return Primary()
+    return read_preference(mode, max_staleness=settings.mongo_max_staleness_seconds)
+
+def routed(collection, policy: str):
+    """
+    Devuelve la colección con la read preference de la política indicada.
+
+    Cada endpoint declara su política: los reportes (logs, estadísticas) y los
+    selectores usan "listing" (secundarios con atraso acotado) y descargan al
+    primario. Se quedan en "primary" los flujos que leen justo después de
+    escribir, como los listados de gestión que el frontend vuelve a pedir tras
+    cada alta o cambio, y los recursos con ETag (el cuerpo debe corresponder a
+    la versión recién escrita).
+    """
+    if isinstance(collection, LazyCollection):
+        return collection.routed(policy)
+    return collection.with_options(read_preference=policy_read_preference(policy))
+
+class LazyCollection:
+    """
+    Colección que se resuelve contra el cliente activo en el primer uso.
+
+    Permite seguir importando las colecciones como globales de módulo aunque el
+    cliente se cree recién en el lifespan.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._client = None
+        self._collection = None
+        self._routed = {}
+
+    def _resolve(self):
+        client = get_client()
+        if self._collection is None or self._client is not client:
+            self._collection = get_collection(self._name)
+            self._client = client
+            self._routed = {}
+        return self._collection
+
+    def routed(self, policy: str):
+        """Colección con la read preference de la política (cacheada por cliente)"""
+        collection = self._resolve()
+        if policy not in self._routed:
+            self._routed[policy] = collection.with_options(read_preference=policy_read_preference(policy))
+        return self._routed[policy]
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
 
-client = AsyncIOMotorClient(settings.mongodb_url)
-database = client[settings.database_name]
+    def __repr__(self):
+        return f"LazyCollection({self._name!r})"
 
 # Colecciones
-estudiantes_collection = database.get_collection("estudiantes")
-docentes_collection = database.get_collection("docentes")
-subdecanos_collection = database.get_collection("subdecanos")
-solicitudes_collection = database.get_collection("solicitudes")
-materias_collection = database.get_collection("materias")
-calificaciones_collection = database.get_collection("calificaciones")
-evidencias_collection = database.get_collection("evidencias")
-mensajes_collection = database.get_collection("mensajes")
-reset_password_collection = database.get_collection("reset_password")
-logs_collection = database.get_collection("logs")
+estudiantes_collection = LazyCollection("estudiantes")
+docentes_collection = LazyCollection("docentes")
+subdecanos_collection = LazyCollection("subdecanos")
+solicitudes_collection = LazyCollection("solicitudes")
+materias_collection = LazyCollection("materias")
+calificaciones_collection = LazyCollection("calificaciones")
+evidencias_collection = LazyCollection("evidencias")
+mensajes_collection = LazyCollection("mensajes")
+reset_password_collection = LazyCollection("reset_password")
+logs_collection = LazyCollection("logs")
+# Agregados del dashboard mantenidos con $inc (utils/stats.py)
+estadisticas_collection = LazyCollection("estadisticas")
+# Contadores de versión para ETags (utils/etags.py)
+versiones_collection = LazyCollection("versiones")
+# Subidas temporales de evidencias para el recorte (utils/staging.py)
+staging_collection = LazyCollection("evidencias_staging")
+# Metadatos de la instancia (marcador de versión del seed, ...)
+meta_collection = LazyCollection("meta")
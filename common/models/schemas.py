@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 
@@ -278,3 +278,22 @@ class LogResponse(BaseModel):
     detalle: Optional[str]
     fecha: datetime
     ip: Optional[str]
+
+# =============== MODELOS DE ESTADÍSTICAS ===============
+
+class EstadisticasMateria(BaseModel):
+    materia_id: str
+    materia_nombre: str
+    estados: Dict[str, int]
+    total: int
+
+class EstadisticasResponse(BaseModel):
+    estados: Dict[str, int]
+    total: int
+    # Promedio desde la creación hasta quedar calificada o rechazada
+    tiempo_resolucion_promedio_horas: Optional[float] = None
+    resueltas: int
+    docentes: int
+    estudiantes: int
+    por_materia: List[EstadisticasMateria]
+    reconciliado: Optional[datetime] = None
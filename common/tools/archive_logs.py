@@ -0,0 +1,103 @@
+"""
+Archivo frío de los logs de auditoría.
+
+Mueve los logs más viejos que LOGS_ARCHIVE_AFTER_DAYS de Mongo a segmentos
+diarios JSONL comprimidos (zstd, o gzip si zstandard no está instalado) en
+LOGS_ARCHIVE_DIR, cada uno con su índice (rango, conteo, sha256). Es seguro
+volver a correrlo: retoma los borrados pendientes y solo archiva lo que quede.
+
+Uso (desde common/, con las variables de entorno del servicio; en docker:
+docker compose exec admin-service python -m tools.archive_logs ...):
+    python -m tools.archive_logs archive --dry-run
+    python -m tools.archive_logs archive --after-days 90 --batch-size 2000 --pause 0.05
+    python -m tools.archive_logs scan --usuario-id EST000123 --desde 2025-01-01 --hasta 2025-07-01
+    python -m tools.archive_logs verify
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import orjson
+
+from config import settings
+from utils.log_archive import archive_before, default_compression, list_indexes, scan_archive, verify_segment
+
+async def archive(args):
+    if 0 < settings.logs_retention_days <= args.after_days:
+        raise SystemExit(
+            f"LOGS_RETENTION_DAYS={settings.logs_retention_days} no es mayor que el horizonte de archivo "
+            f"({args.after_days} días): el TTL borraría logs antes de archivarlos."
+        )
+    cutoff = datetime.utcnow().date() - timedelta(days=args.after_days)
+    print(f"Archivando logs anteriores a {cutoff} en {args.dir} ({args.compression})"
+          + (" [dry-run]" if args.dry_run else ""))
+    results = await archive_before(
+        args.dir, cutoff, compression=args.compression, batch_size=args.batch_size,
+        pause=args.pause, dry_run=args.dry_run,
+    )
+    archived = deleted = 0
+    for result in results:
+        if result["archived"] or result["deleted"]:
+            print(f"  {result['day']}: {result['archived']:>8,} archivados, {result['deleted']:>8,} borrados")
+        archived += result["archived"]
+        deleted += result["deleted"]
+    print(f"Total: {archived:,} archivados, {deleted:,} borrados de Mongo")
+
+def scan(args):
+    out = sys.stdout.buffer
+    found = 0
+    for doc in scan_archive(args.dir, desde=args.desde, hasta=args.hasta, usuario_id=args.usuario_id,
+                            rol=args.rol, accion=args.accion, verify=args.verify):
+        out.write(orjson.dumps(doc) + b"\n")
+        found += 1
+        if args.limit and found >= args.limit:
+            break
+    print(f"{found:,} logs", file=sys.stderr)
+
+def verify(args):
+    bad = []
+    indexes = list_indexes(args.dir)
+    for index in indexes:
+        if not verify_segment(index):
+            bad.append(index["segment"])
+    total = sum(index["count"] for index in indexes)
+    print(f"{len(indexes)} segmentos, {total:,} logs")
+    if bad:
+        print("sha256 no coincide en: " + ", ".join(bad))
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", type=Path, default=Path(settings.logs_archive_dir), help="Directorio del archivo")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    archive_parser = commands.add_parser("archive", help="Archiva y borra de Mongo los logs viejos")
+    archive_parser.add_argument("--after-days", type=int, default=settings.logs_archive_after_days)
+    archive_parser.add_argument("--compression", choices=["zstd", "gzip"], default=default_compression())
+    archive_parser.add_argument("--batch-size", type=int, default=1000, help="Documentos por lote de lectura/borrado")
+    archive_parser.add_argument("--pause", type=float, default=0.0, help="Segundos entre lotes de borrado")
+    archive_parser.add_argument("--dry-run", action="store_true", help="Solo cuenta lo que se archivaría")
+
+    scan_parser = commands.add_parser("scan", help="Busca en el archivo sin restaurarlo (JSONL por stdout)")
+    scan_parser.add_argument("--usuario-id")
+    scan_parser.add_argument("--rol")
+    scan_parser.add_argument("--accion")
+    scan_parser.add_argument("--desde", type=datetime.fromisoformat, help="Fecha UTC inicial (inclusive)")
+    scan_parser.add_argument("--hasta", type=datetime.fromisoformat, help="Fecha UTC final (exclusiva)")
+    scan_parser.add_argument("--limit", type=int, default=0)
+    scan_parser.add_argument("--verify", action="store_true", help="Comprueba el sha256 de cada segmento leído")
+
+    commands.add_parser("verify", help="Comprueba el sha256 de todos los segmentos")
+
+    args = parser.parse_args()
+    if args.command == "archive":
+        asyncio.run(archive(args))
+    elif args.command == "scan":
+        scan(args)
+    else:
+        verify(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Completa los campos de búsqueda (busqueda y nombre_orden) de estudiantes y
+docentes.
+
+Los documentos creados antes de utils/search.py no los tienen y no aparecen en
+/estudiantes/buscar ni /docentes/buscar. Crea también los índices de búsqueda
+(el servicio admin los crea al arrancar).
+
+Uso (desde common/, con las variables de entorno del servicio):
+    python -m tools.backfill_search
+    python -m tools.backfill_search --all --batch-size 2000
+"""
+import argparse
+import asyncio
+import sys
+
+from pymongo import UpdateOne
+
+from database import docentes_collection, estudiantes_collection
+from utils.search import SEARCH_FIELD, SORT_FIELD, ensure_search_indexes, search_fields
+
+async def backfill(collection, rebuild: bool, batch_size: int) -> int:
+    faltantes = [{SEARCH_FIELD: {"$exists": False}}, {SORT_FIELD: {"$exists": False}}]
+    filtro = {} if rebuild else {"$or": faltantes}
+    updated = 0
+    batch = []
+    async for doc in collection.find(filtro, {"nombre": 1, "email": 1}).batch_size(batch_size):
+        batch.append(UpdateOne(
+            {"_id": doc["_id"]}, {"$set": search_fields(doc.get("nombre", ""), doc.get("email", ""))}
+        ))
+        if len(batch) >= batch_size:
+            updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+    return updated
+
+async def run(args):
+    await ensure_search_indexes()
+    for name, collection in (("estudiantes", estudiantes_collection), ("docentes", docentes_collection)):
+        updated = await backfill(collection, args.all, args.batch_size)
+        print(f"{name}: {updated:,} documentos actualizados")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="Recalcula también los que ya tienen la clave")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
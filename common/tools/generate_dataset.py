@@ -0,0 +1,444 @@
+"""
+Generador de datos sintéticos a escala de producción.
+
+Complementa seed_db.py (que solo crea al subdecano): llena estudiantes, docentes,
+materias, evidencias (con archivos de imagen reales), solicitudes en todos los
+estados, mensajes y logs. El resultado es reproducible: la misma --seed y los
+mismos conteos generan exactamente los mismos documentos e IDs.
+
+Los documentos tienen la misma forma que los que crean los endpoints, así que
+todas las pantallas funcionan contra el dataset. Las contraseñas son las que
+asigna el admin (estudiante123 / docente123); el hash se calcula una sola vez.
+
+Uso (desde common/, con las variables de entorno del servicio):
+    python -m tools.generate_dataset --preset produccion --drop
+    python -m tools.generate_dataset --estudiantes 5000 --evidencias 20000 --logs 100000 \\
+        --image-kb 150 --fixtures-out ../loadtest/results/fixtures.json
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from bson import ObjectId
+from PIL import Image
+
+from config import settings
+from database import get_database
+from utils.encryption import anonymize_name, hash_password
+from utils.search import search_fields
+from utils.storage import fanout_name
+
+PRESETS = {
+    "demo": dict(estudiantes=500, docentes=40, materias=30, evidencias=5_000,
+                 solicitudes=1_000, logs=20_000),
+    "produccion": dict(estudiantes=50_000, docentes=2_000, materias=500, evidencias=1_000_000,
+                       solicitudes=200_000, logs=5_000_000),
+}
+
+NOMBRES = ["Ana", "Luis", "María", "José", "Carla", "Diego", "Lucía", "Andrés", "Sofía", "Mateo",
+           "Valeria", "Daniel", "Camila", "Javier", "Paula", "Gabriel", "Elena", "Martín", "Isabel", "Tomás"]
+APELLIDOS = ["García", "Pérez", "López", "Torres", "Vega", "Ramírez", "Castro", "Morales", "Herrera",
+             "Jiménez", "Mendoza", "Ruiz", "Ortiz", "Silva", "Rojas", "Navarro", "Paredes", "Cedeño"]
+CARRERAS = ["Software", "Sistemas", "Telecomunicaciones", "Electrónica", "Industrial", "Civil"]
+AREAS = ["Cálculo", "Física", "Programación", "Bases de Datos", "Redes", "Estadística",
+         "Álgebra", "Química", "Circuitos", "Sistemas Operativos"]
+GRUPOS = ["GR1", "GR2", "GR3", "GR4"]
+APORTES = ["1", "2", "3", "Examen"]
+# Reparto de estados de solicitud (la aprobación pasa a en_revision al asignar docente)
+ESTADOS = [("pendiente", 30), ("aprobada", 5), ("rechazada", 10), ("en_revision", 30), ("calificada", 25)]
+ACCIONES = [("LOGIN", 70), ("CREAR_SOLICITUD", 10), ("SUBIR_EVIDENCIA", 15), ("CALIFICAR_SOLICITUD", 5)]
+
+# Usuarios por rol que se exportan con --fixtures-out
+FIXTURES_SAMPLE = 500
+
+COLLECTIONS = ["materias", "docentes", "estudiantes", "evidencias", "solicitudes", "mensajes", "logs"]
+
+# =============== UTILIDADES ===============
+
+def rng_for(seed: int, name: str) -> random.Random:
+    """RNG independiente por colección: cambiar un conteo no altera las demás"""
+    return random.Random(f"{seed}:{name}")
+
+def object_id(rng: random.Random) -> ObjectId:
+    return ObjectId(rng.randbytes(12))
+
+def weighted(rng: random.Random, options: List[Tuple[str, int]]) -> str:
+    values, weights = zip(*options)
+    return rng.choices(values, weights=weights)[0]
+
+def fecha_en_periodo(rng: random.Random, end: datetime, days: int) -> datetime:
+    return end - timedelta(seconds=rng.randrange(days * 86400))
+
+def nombre_completo(rng: random.Random) -> str:
+    return f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+
+def make_images(rng: random.Random, target_bytes: int, variants: int) -> List[bytes]:
+    """JPEGs de ~target_bytes hechos de ruido: casi no comprimen, así el tamaño es predecible"""
+    probe = Image.frombytes("L", (256, 256), rng.randbytes(256 * 256)).convert("RGB")
+    buffer = io.BytesIO()
+    probe.save(buffer, format="JPEG", quality=85)
+    bytes_per_pixel = buffer.tell() / (256 * 256)
+    side = max(64, int((target_bytes / bytes_per_pixel) ** 0.5))
+    width, height = side * 3 // 4 or 1, side * 4 // 3
+
+    images = []
+    for _ in range(variants):
+        img = Image.frombytes("L", (width, height), rng.randbytes(width * height)).convert("RGB")
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=85)
+        images.append(buffer.getvalue())
+    return images
+
+# =============== GENERADORES ===============
+
+def gen_materias(seed: int, count: int, end: datetime) -> Iterator[Dict]:
+    rng = rng_for(seed, "materias")
+    for i in range(count):
+        area = AREAS[i % len(AREAS)]
+        yield {
+            "_id": object_id(rng),
+            "nombre": f"{area} {i // len(AREAS) + 1}",
+            "codigo": f"{area[:3].upper()}-{i:04d}",
+            "descripcion": f"Curso de {area.lower()} nivel {i // len(AREAS) + 1}",
+            "fecha_creacion": fecha_en_periodo(rng, end, 365),
+        }
+
+def gen_docentes(seed: int, count: int, materia_ids: List[str], password: str, end: datetime) -> Iterator[Dict]:
+    rng = rng_for(seed, "docentes")
+    for i in range(count):
+        nombre = nombre_completo(rng)
+        email = f"doc{i:05d}@blindcheck.edu"
+        yield {
+            "_id": f"DOC{i:05d}",
+            "email": email,
+            "nombre": nombre,
+            "password": password,
+            "rol": "docente",
+            "carrera": rng.choice(CARRERAS),
+            # Cada materia tiene docente: la i-ésima materia va al docente i mod count
+            "materias": sorted({materia_ids[i % len(materia_ids)], *rng.sample(materia_ids, k=min(2, len(materia_ids)))}),
+            "grupos_asignados": rng.sample(GRUPOS, k=2),
+            "activo": rng.random() > 0.02,
+            "primer_login": False,
+            "fecha_registro": fecha_en_periodo(rng, end, 730),
+            **search_fields(nombre, email),
+        }
+
+def gen_estudiantes(seed: int, count: int, materia_ids: List[str], password: str, end: datetime) -> Iterator[Dict]:
+    rng = rng_for(seed, "estudiantes")
+    for i in range(count):
+        nombre = nombre_completo(rng)
+        email = f"est{i:06d}@blindcheck.edu"
+        yield {
+            "_id": f"EST{i:06d}",
+            "email": email,
+            "nombre": nombre,
+            "password": password,
+            "rol": "estudiante",
+            "carrera": rng.choice(CARRERAS),
+            "materias_cursando": rng.sample(materia_ids, k=min(5, len(materia_ids))),
+            "activo": rng.random() > 0.01,
+            "primer_login": False,
+            "fecha_registro": fecha_en_periodo(rng, end, 1460),
+            **search_fields(nombre, email),
+        }
+
+def gen_evidencias(seed: int, count: int, docentes: List[Tuple[str, List[str]]], estudiantes: int,
+                   image_names: List[str], end: datetime) -> Iterator[Dict]:
+    rng = rng_for(seed, "evidencias")
+    for i in range(count):
+        docente_id, materias = docentes[rng.randrange(len(docentes))]
+        materia_id = rng.choice(materias)
+        aporte = rng.choice(APORTES)
+        file_hash = hashlib.sha256(f"{seed}:{i}".encode()).hexdigest()[:16]
+        hashed_filename = f"{file_hash}.jpg"
+        yield {
+            "_id": object_id(rng),
+            "codigo_interno": f"GEN-{aporte.upper()[:3]}-{file_hash[:6].upper()}",
+            "estudiante_id": f"EST{rng.randrange(estudiantes):06d}",
+            "docente_id": docente_id,
+            "materia_id": materia_id,
+            "grupo": rng.choice(GRUPOS),
+            "aporte": aporte,
+            "descripcion": "Evidencia generada",
+            "archivo_nombre_hash": hashed_filename,
+            "archivo_url": f"/uploads/evidencias/{hashed_filename}",
+            "recortada": True,
+            "fecha_subida": fecha_en_periodo(rng, end, 120),
+            # Variante de imagen a enlazar (se quita antes de insertar)
+            "_imagen": image_names[i % len(image_names)] if image_names else None,
+        }
+
+def gen_solicitudes(seed: int, count: int, evidencias: List[Tuple], docente_ids: List[str], end: datetime) -> Iterator[Dict]:
+    rng = rng_for(seed, "solicitudes")
+    for i in range(count):
+        estudiante_id, docente_id, materia_id, grupo, aporte = evidencias[i % len(evidencias)]
+        estado = weighted(rng, ESTADOS)
+        creada = fecha_en_periodo(rng, end, 90)
+        solicitud = {
+            "_id": object_id(rng),
+            "estudiante_id": estudiante_id,
+            "estudiante_nombre_anonimo": anonymize_name("", estudiante_id),
+            "materia_id": materia_id,
+            "docente_id": docente_id,
+            "docente_nombre_anonimo": anonymize_name("", docente_id),
+            "grupo": grupo,
+            "aporte": aporte,
+            "calificacion_actual": round(rng.uniform(0, 7), 1),
+            "motivo": "Solicito revisión de la calificación",
+            "estado": estado,
+            "fecha_creacion": creada,
+            "fecha_actualizacion": creada + timedelta(hours=rng.randrange(1, 240)),
+        }
+        if estado == "rechazada":
+            solicitud["motivo_rechazo"] = "Fuera de plazo"
+        if estado in ("en_revision", "calificada"):
+            recalificador = rng.choice(docente_ids)
+            if recalificador == docente_id:
+                recalificador = docente_ids[(docente_ids.index(recalificador) + 1) % len(docente_ids)]
+            solicitud["docente_recalificador_id"] = recalificador
+            solicitud["fecha_asignacion"] = solicitud["fecha_actualizacion"]
+        if estado == "calificada":
+            solicitud["calificacion_nueva"] = round(rng.uniform(0, 10), 1)
+            solicitud["comentario_docente"] = "Revisado"
+        yield solicitud
+
+def gen_mensajes(solicitudes: List[Tuple[str, datetime]]) -> Iterator[Dict]:
+    """El aviso 'Solicitud creada' que el endpoint envía al estudiante"""
+    for estudiante_id, fecha in solicitudes:
+        yield {
+            "destinatario_id": estudiante_id,
+            "remitente": "Sistema",
+            "asunto": "Solicitud creada",
+            "contenido": "Tu solicitud de recalificación ha sido creada exitosamente y está pendiente de aprobación.",
+            "tipo": "info",
+            "leido": True,
+            "fecha_envio": fecha,
+        }
+
+def gen_logs(seed: int, count: int, estudiantes: int, docentes: int, end: datetime) -> Iterator[Dict]:
+    rng = rng_for(seed, "logs")
+    for _ in range(count):
+        accion = weighted(rng, ACCIONES)
+        if accion in ("SUBIR_EVIDENCIA", "CALIFICAR_SOLICITUD") or (accion == "LOGIN" and rng.random() < 0.1):
+            rol, usuario_id = "docente", f"DOC{rng.randrange(docentes):05d}"
+        else:
+            rol, usuario_id = "estudiante", f"EST{rng.randrange(estudiantes):06d}"
+        yield {
+            "usuario_id": usuario_id,
+            "rol": rol,
+            "accion": accion,
+            "detalle": "Inicio de sesión exitoso" if accion == "LOGIN" else "Generado",
+            "fecha": fecha_en_periodo(rng, end, 180),
+            "ip": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+        }
+
+# =============== INSERCIÓN ===============
+
+class Loader:
+    """insert_many en lotes con varias inserciones en vuelo a la vez"""
+
+    def __init__(self, db, batch_size: int, workers: int):
+        self.db = db
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(workers)
+        self.pending = set()
+
+    async def _insert(self, collection: str, batch: List[Dict]):
+        try:
+            await self.db[collection].insert_many(batch, ordered=False)
+        finally:
+            self.semaphore.release()
+
+    async def load(self, collection: str, docs: Iterator[Dict], on_batch=None) -> int:
+        start = time.perf_counter()
+        total = 0
+        batch = []
+        for doc in docs:
+            batch.append(doc)
+            if len(batch) == self.batch_size:
+                total += await self._submit(collection, batch, on_batch)
+                batch = []
+        if batch:
+            total += await self._submit(collection, batch, on_batch)
+        await asyncio.gather(*self.pending)
+        self.pending.clear()
+        elapsed = time.perf_counter() - start
+        print(f"   {collection:<12} {total:>10,} docs en {elapsed:6.1f} s ({total / elapsed if elapsed else 0:,.0f}/s)")
+        return total
+
+    async def _submit(self, collection: str, batch: List[Dict], on_batch) -> int:
+        if on_batch is not None:
+            await on_batch(batch)
+        await self.semaphore.acquire()
+        task = asyncio.create_task(self._insert(collection, batch))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+        return len(batch)
+
+def link_images(batch: List[Dict], images_dir: Path, variants_dir: Path, copy: bool, fanout: int):
+    """Crea el archivo de cada evidencia como hard link (o copia) de una variante"""
+    for doc in batch:
+        variant = doc.pop("_imagen", None)
+        if variant is None:
+            continue
+        # Mismo layout que utils/storage.LocalStorage
+        target = images_dir / fanout_name(doc["archivo_nombre_hash"], fanout)
+        if target.exists():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if copy:
+            target.write_bytes((variants_dir / variant).read_bytes())
+        else:
+            os.link(variants_dir / variant, target)
+
+# =============== CLI ===============
+
+async def generate(args):
+    counts = dict(PRESETS[args.preset]) if args.preset else dict(PRESETS["demo"])
+    for name in counts:
+        if getattr(args, name) is not None:
+            counts[name] = getattr(args, name)
+    end = datetime.fromisoformat(args.end_date)
+    db = get_database()
+
+    existing = {name: await db[name].estimated_document_count() for name in COLLECTIONS}
+    if any(existing.values()) and not (args.drop or args.append):
+        occupied = ", ".join(f"{name}={count:,}" for name, count in existing.items() if count)
+        raise SystemExit(f"La base {db.name} ya tiene datos ({occupied}). Usa --drop o --append.")
+    if args.drop:
+        for name in COLLECTIONS:
+            await db[name].drop()
+
+    print(f"Generando en {db.name} (seed={args.seed}): " + ", ".join(f"{k}={v:,}" for k, v in counts.items()))
+    start = time.perf_counter()
+
+    # Un solo hash bcrypt por rol en vez de uno por usuario
+    password_estudiante = hash_password("estudiante123")
+    password_docente = hash_password("docente123")
+
+    loader = Loader(db, args.batch_size, args.workers)
+
+    materias = list(gen_materias(args.seed, counts["materias"], end))
+    materia_ids = [str(m["_id"]) for m in materias]
+    await loader.load("materias", iter(materias))
+
+    docentes = []
+    # Muestra de usuarios activos para los fixtures de carga
+    muestra = {"docentes": [], "estudiantes": []}
+
+    def keep_sample(kind: str, materias_key: str):
+        async def on_batch(batch):
+            for doc in batch:
+                if doc["activo"] and len(muestra[kind]) < FIXTURES_SAMPLE:
+                    muestra[kind].append({"id": doc["_id"], "email": doc["email"], "materias": doc[materias_key]})
+        return on_batch
+
+    keep_docentes_sample = keep_sample("docentes", "materias")
+
+    async def keep_docentes(batch):
+        docentes.extend((doc["_id"], doc["materias"]) for doc in batch)
+        await keep_docentes_sample(batch)
+
+    await loader.load("docentes", gen_docentes(args.seed, counts["docentes"], materia_ids, password_docente, end),
+                      on_batch=keep_docentes)
+    await loader.load("estudiantes",
+                      gen_estudiantes(args.seed, counts["estudiantes"], materia_ids, password_estudiante, end),
+                      on_batch=keep_sample("estudiantes", "materias_cursando"))
+
+    image_names = []
+    images_dir = Path(args.images_dir)
+    variants_dir = images_dir / ".variantes"
+    if not args.no_images:
+        variants_dir.mkdir(parents=True, exist_ok=True)
+        for index, data in enumerate(make_images(rng_for(args.seed, "imagenes"), args.image_kb * 1024, args.image_variants)):
+            name = f"variante-{args.image_kb}kb-{index:03d}.jpg"
+            (variants_dir / name).write_bytes(data)
+            image_names.append(name)
+
+    # Una de cada `step` evidencias se guarda como base de las solicitudes
+    step = max(1, counts["evidencias"] // max(counts["solicitudes"], 1))
+    evidencia_keys = []
+    seen = 0
+
+    async def after_evidencias(batch):
+        nonlocal seen
+        for doc in batch:
+            if seen % step == 0:
+                evidencia_keys.append((doc["estudiante_id"], doc["docente_id"], doc["materia_id"], doc["grupo"], doc["aporte"]))
+            seen += 1
+        if image_names:
+            await asyncio.to_thread(link_images, batch, images_dir, variants_dir, args.copy_images, args.fanout)
+        else:
+            for doc in batch:
+                doc.pop("_imagen", None)
+
+    await loader.load("evidencias", gen_evidencias(args.seed, counts["evidencias"], docentes, counts["estudiantes"],
+                                                  image_names, end), on_batch=after_evidencias)
+
+    creadas = []
+
+    async def keep_creadas(batch):
+        creadas.extend((doc["estudiante_id"], doc["fecha_creacion"]) for doc in batch)
+
+    if evidencia_keys:
+        docente_ids = [docente_id for docente_id, _ in docentes]
+        await loader.load("solicitudes", gen_solicitudes(args.seed, counts["solicitudes"], evidencia_keys, docente_ids, end),
+                          on_batch=keep_creadas)
+        await loader.load("mensajes", gen_mensajes(creadas))
+    await loader.load("logs", gen_logs(args.seed, counts["logs"], counts["estudiantes"], counts["docentes"], end))
+    # Los datos cambiaron sin pasar por los endpoints: se invalidan todos los ETags (utils/etags.py)
+    # y las estadísticas se recalculan en la próxima reconciliación del admin (utils/stats.py)
+    await db["versiones"].drop()
+
+    print(f"Dataset listo en {time.perf_counter() - start:.1f} s")
+
+    if args.fixtures_out:
+        write_fixtures(Path(args.fixtures_out), args.seed, muestra, materia_ids)
+
+def write_fixtures(path: Path, seed: int, muestra: Dict[str, List[Dict]], materia_ids: List[str]):
+    """Credenciales de una muestra de usuarios en el formato de loadtest/fixtures.py"""
+    fixtures = {
+        "tag": f"dataset-{seed}",
+        "subdecano": {"email": "admin@blindcheck.edu", "password": "Admin2026!"},
+        "materias": [{"id": materia_id} for materia_id in materia_ids],
+        "docentes": [{**docente, "password": "docente123"} for docente in muestra["docentes"]],
+        "estudiantes": [{**estudiante, "password": "estudiante123"} for estudiante in muestra["estudiantes"]],
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(fixtures, indent=2, ensure_ascii=False))
+    print(f"Fixtures de carga en {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), help="Conteos predefinidos (por defecto demo)")
+    for name in PRESETS["demo"]:
+        parser.add_argument(f"--{name}", type=int, help=f"Cantidad de {name}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", default="2026-03-01", help="Fin del periodo simulado (ISO); fija las fechas")
+    parser.add_argument("--image-kb", type=int, default=200, help="Tamaño aproximado de cada imagen")
+    parser.add_argument("--image-variants", type=int, default=32, help="Imágenes distintas (las demás son enlaces)")
+    parser.add_argument("--images-dir", default="uploads/evidencias")
+    parser.add_argument("--copy-images", action="store_true", help="Copiar en vez de hard link (otro filesystem)")
+    parser.add_argument("--fanout", type=int, default=settings.storage_local_fanout,
+                        help="Niveles de subdirectorio de las imágenes (por defecto STORAGE_LOCAL_FANOUT)")
+    parser.add_argument("--no-images", action="store_true", help="No escribir archivos de imagen")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=8, help="insert_many en vuelo a la vez")
+    parser.add_argument("--drop", action="store_true", help="Borra las colecciones generadas antes de insertar")
+    parser.add_argument("--append", action="store_true", help="Inserta aunque la base ya tenga datos")
+    parser.add_argument("--fixtures-out", help="Escribe credenciales de muestra para loadtest/run.py --fixtures")
+    args = parser.parse_args()
+    asyncio.run(generate(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Informe de ahorro de almacenamiento de la normalización de evidencias.
+
+Las evidencias normalizadas al subirlas (utils/images.py) guardan sus bytes
+original y almacenado: se suman tal cual. Las que conservaron su formato
+porque normalizar las agrandaba se cuentan aparte, sin ahorro. Las anteriores
+(o subidas con IMAGE_NORMALIZE=false) no se normalizaron: se toma una muestra
+aleatoria, se normaliza en memoria con la configuración actual
+(IMAGE_MAX_EDGE, IMAGE_FORMAT, IMAGE_QUALITY) y el ahorro se extrapola al
+resto. No modifica nada: ni archivos ni documentos.
+
+Uso (desde common/, con las variables de entorno del servicio):
+    python -m tools.image_report
+    python -m tools.image_report --sample 500 --seed 7 --json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import PurePosixPath
+
+from config import settings
+from database import evidencias_collection
+from utils.images import process_evidence
+from utils.storage import close_storage, get_storage, url_to_key
+
+def ratio(parte: float, total: float) -> float:
+    return round(parte / total, 4) if total else 0.0
+
+async def scan(sample_size: int, rng: random.Random) -> dict:
+    """Suma las evidencias normalizadas y muestrea (reservoir) las que no lo están"""
+    normalizadas = {"evidencias": 0, "bytes_original": 0, "bytes_almacenados": 0}
+    conservadas = {"evidencias": 0, "bytes_almacenados": 0}
+    sin_normalizar = 0
+    muestra = []
+    proyeccion = {"archivo_url": 1, "normalizada": 1, "formato_conservado": 1,
+                  "bytes_original": 1, "bytes_almacenados": 1}
+    async for doc in evidencias_collection.find({}, proyeccion).batch_size(1000):
+        if doc.get("normalizada") and "bytes_almacenados" in doc:
+            normalizadas["evidencias"] += 1
+            normalizadas["bytes_original"] += doc.get("bytes_original", 0)
+            normalizadas["bytes_almacenados"] += doc["bytes_almacenados"]
+            continue
+        if doc.get("formato_conservado"):
+            # Normalizar las agrandaba: ya están en su mejor formato, no hay ahorro que contar
+            conservadas["evidencias"] += 1
+            conservadas["bytes_almacenados"] += doc.get("bytes_almacenados", 0)
+            continue
+        sin_normalizar += 1
+        if len(muestra) < sample_size:
+            muestra.append(doc.get("archivo_url"))
+        else:
+            indice = rng.randrange(sin_normalizar)
+            if indice < sample_size:
+                muestra[indice] = doc.get("archivo_url")
+    normalizadas["ahorro"] = ratio(
+        normalizadas["bytes_original"] - normalizadas["bytes_almacenados"], normalizadas["bytes_original"]
+    )
+    return {"normalizadas": normalizadas, "conservadas": conservadas, "sin_normalizar": sin_normalizar,
+            "muestra": muestra}
+
+async def measure_sample(urls) -> dict:
+    """Normaliza en memoria cada archivo de la muestra; mide bytes y tiempo"""
+    storage = get_storage()
+    medida = {"archivos": 0, "bytes_actuales": 0, "bytes_normalizados": 0, "conservados": 0, "faltantes": 0,
+              "errores": 0, "segundos_por_imagen": 0.0}
+    segundos = 0.0
+    for url in urls:
+        try:
+            key = url_to_key(url)
+            data = await storage.get(key)
+        except (ValueError, FileNotFoundError):
+            medida["faltantes"] += 1
+            continue
+        inicio = time.perf_counter()
+        try:
+            procesada = await asyncio.to_thread(process_evidence, data, PurePosixPath(key).name, None, False, True)
+        except Exception as e:
+            medida["errores"] += 1
+            print(f"  no se pudo normalizar {key}: {e}", file=sys.stderr)
+            continue
+        segundos += time.perf_counter() - inicio
+        medida["archivos"] += 1
+        medida["bytes_actuales"] += len(data)
+        if procesada["formato_conservado"]:
+            # Normalizar lo agrandaría: al subirlo se habría guardado tal cual
+            medida["conservados"] += 1
+            medida["bytes_normalizados"] += len(data)
+        else:
+            medida["bytes_normalizados"] += procesada["bytes_guardados"]
+    if medida["archivos"]:
+        medida["segundos_por_imagen"] = round(segundos / medida["archivos"], 4)
+    medida["ahorro"] = ratio(medida["bytes_actuales"] - medida["bytes_normalizados"], medida["bytes_actuales"])
+    return medida
+
+async def report(args) -> dict:
+    rng = random.Random(args.seed)
+    try:
+        resultado = await scan(args.sample, rng)
+        medida = await measure_sample(resultado.pop("muestra"))
+    finally:
+        await close_storage()
+
+    # Extrapolación: tamaño medio de la muestra por evidencia sin normalizar
+    sin_normalizar = resultado["sin_normalizar"]
+    estimado_actual = estimado_normalizado = 0
+    if medida["archivos"]:
+        estimado_actual = round(medida["bytes_actuales"] / medida["archivos"] * sin_normalizar)
+        estimado_normalizado = round(medida["bytes_normalizados"] / medida["archivos"] * sin_normalizar)
+    return {
+        "configuracion": {
+            "image_normalize": settings.image_normalize,
+            "image_max_edge": settings.image_max_edge,
+            "image_format": settings.image_format,
+            "image_quality": settings.image_quality,
+        },
+        "normalizadas": resultado["normalizadas"],
+        "conservadas": resultado["conservadas"],
+        "sin_normalizar": {
+            "evidencias": sin_normalizar,
+            "muestra": medida,
+            "bytes_estimados": estimado_actual,
+            "bytes_estimados_normalizados": estimado_normalizado,
+            "ahorro_estimado_bytes": estimado_actual - estimado_normalizado,
+        },
+    }
+
+def mib(n: int) -> str:
+    return f"{n / (1024 * 1024):,.1f} MiB"
+
+def print_report(datos: dict):
+    config = datos["configuracion"]
+    print(f"Configuración: {config['image_format']} calidad {config['image_quality']}, "
+          f"lado mayor {config['image_max_edge']} px (normalización {'activa' if config['image_normalize'] else 'inactiva'})")
+
+    normalizadas = datos["normalizadas"]
+    print(f"\nNormalizadas al subir: {normalizadas['evidencias']:,}")
+    print(f"  originales {mib(normalizadas['bytes_original'])} -> guardadas {mib(normalizadas['bytes_almacenados'])} "
+          f"({normalizadas['ahorro']:.1%} de ahorro)")
+    conservadas = datos["conservadas"]
+    print(f"Formato original conservado (normalizar las agrandaba): {conservadas['evidencias']:,}, "
+          f"{mib(conservadas['bytes_almacenados'])}")
+
+    pendientes = datos["sin_normalizar"]
+    medida = pendientes["muestra"]
+    print(f"\nSin normalizar: {pendientes['evidencias']:,}")
+    print(f"  muestra: {medida['archivos']:,} archivos ({medida['conservados']:,} sin ahorro posible, "
+          f"{medida['faltantes']:,} faltantes, {medida['errores']:,} errores), "
+          f"{medida['segundos_por_imagen'] * 1000:.0f} ms por imagen")
+    print(f"  muestra: {mib(medida['bytes_actuales'])} -> {mib(medida['bytes_normalizados'])} "
+          f"({medida['ahorro']:.1%} de ahorro)")
+    print(f"  estimado total: {mib(pendientes['bytes_estimados'])} -> "
+          f"{mib(pendientes['bytes_estimados_normalizados'])} "
+          f"(ahorro estimado {mib(pendientes['ahorro_estimado_bytes'])})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", type=int, default=200, help="Evidencias sin normalizar a medir")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    datos = asyncio.run(report(args))
+    if args.json:
+        print(json.dumps(datos, indent=2))
+    else:
+        print_report(datos)
+
+if __name__ == "__main__":
+    sys.exit(main())
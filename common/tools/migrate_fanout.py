@@ -0,0 +1,101 @@
+"""
+Mueve las evidencias del layout plano (uploads/evidencias/<hash>.jpg) al
+layout con fan-out (uploads/evidencias/ab/cd/<hash>.jpg) de
+settings.storage_local_fanout.
+
+Se puede correr con los servicios arriba: cada archivo se mueve con un rename
+atómico y utils/storage.py lee de los dos layouts, así que una descarga nunca
+ve el archivo ausente. archivo_url no cambia (guarda la clave, no la ruta), así
+que no se toca la base. Se puede cortar y volver a correr: retoma lo que falta.
+
+Uso (desde common/, en el contenedor o con el mismo uploads/):
+    python -m tools.migrate_fanout --dry-run
+    python -m tools.migrate_fanout --batch-size 1000 --pause 0.2
+    python -m tools.migrate_fanout --prefix evidencias --prefix temp
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Iterator, List
+
+from config import settings
+from utils.storage import EVIDENCIAS, LocalStorage
+
+def flat_batches(directory, batch_size: int) -> Iterator[List[str]]:
+    """Nombres de archivo directamente en directory (sin subdirectorios ni ocultos), por lotes"""
+    batch = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # .variantes del generador y .<nombre>.part de escrituras en curso
+            if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                continue
+            batch.append(entry.name)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def migrate_prefix(storage: LocalStorage, prefix: str, batch_size: int, pause: float, dry_run: bool) -> dict:
+    directory = storage.root / prefix
+    counts = {"movidos": 0, "duplicados": 0, "conflictos": 0}
+    if not directory.is_dir():
+        return counts
+
+    for batch in flat_batches(directory, batch_size):
+        for name in batch:
+            source = directory / name
+            target = storage.write_path(f"{prefix}/{name}")
+            if not source.exists():
+                # Borrado mientras tanto (ej. barrido de temporales)
+                continue
+            if target.exists():
+                # Ya existe en el layout nuevo: la copia plana sobra si es igual
+                if target.stat().st_size == source.stat().st_size:
+                    counts["duplicados"] += 1
+                    if not dry_run:
+                        source.unlink()
+                else:
+                    counts["conflictos"] += 1
+                    print(f"  conflicto, se deja sin mover: {source} (destino {target} distinto)")
+                continue
+            counts["movidos"] += 1
+            if not dry_run:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(source, target)
+        print(f"  {prefix}: {counts['movidos']:,} movidos, {counts['duplicados']:,} duplicados")
+        if pause and not dry_run:
+            time.sleep(pause)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=settings.storage_local_root)
+    parser.add_argument("--levels", type=int, default=settings.storage_local_fanout,
+                        help="Niveles de fan-out destino (por defecto STORAGE_LOCAL_FANOUT)")
+    parser.add_argument("--prefix", action="append", help=f"Directorio a migrar (repetible; por defecto {EVIDENCIAS})")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.0, help="Segundos de espera entre lotes")
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta, no mueve nada")
+    args = parser.parse_args()
+
+    if settings.storage_backend != "local":
+        print(f"STORAGE_BACKEND={settings.storage_backend}: el fan-out solo aplica al almacenamiento local")
+        return 1
+    if args.levels <= 0:
+        print("Sin niveles de fan-out destino (STORAGE_LOCAL_FANOUT=0): nada que migrar")
+        return 1
+
+    storage = LocalStorage(args.root, fanout=args.levels)
+    conflictos = 0
+    for prefix in args.prefix or [EVIDENCIAS]:
+        counts = migrate_prefix(storage, prefix, args.batch_size, args.pause, args.dry_run)
+        conflictos += counts["conflictos"]
+        accion = "a mover" if args.dry_run else "movidos"
+        print(f"{prefix}: {counts['movidos']:,} {accion}, {counts['duplicados']:,} duplicados, "
+              f"{counts['conflictos']:,} conflictos")
+    return 1 if conflictos else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
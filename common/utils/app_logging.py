@@ -0,0 +1,146 @@
+import logging
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+import orjson
+
+from config import settings
+
+# =============== LOGGING ESTRUCTURADO ===============
+# Los handlers de la app solo encolan el registro (QueueHandler); un hilo aparte
+# (QueueListener) lo formatea como JSON y lo escribe en stdout. Así una petición
+# nunca espera la escritura en stdout ni al driver de logs de Docker.
+#
+# Uso en cada módulo:
+#
+#     logger = logging.getLogger(__name__)
+#     logger.debug("Materia no encontrada", extra={"materia_id": materia_id})
+#
+# Los campos de `extra` salen como claves del JSON.
+
+# Atributos propios de LogRecord: todo lo demás viene de `extra`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro: ts, level, logger, msg, service y los extras"""
+
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "service": self.service,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+class TextFormatter(logging.Formatter):
+    """Formato legible para desarrollo local (LOG_JSON=false)"""
+
+    def __init__(self, service: str):
+        super().__init__(f"%(asctime)s %(levelname)-7s [{service}] %(name)s: %(message)s")
+
+class DebugSampler(logging.Filter):
+    """
+    Limita los registros DEBUG a `rate` por segundo por logger (token bucket).
+
+    Los DEBUG de un bucle caliente no inundan la cola; los descartados se cuentan
+    y se informan en el siguiente DEBUG que sí pasa (campo `sampled_out`).
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self._lock = threading.Lock()
+        # logger -> [tokens, último refill, descartados]
+        self._buckets: Dict[str, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or self.rate <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                bucket = self._buckets[record.name] = [self.rate, now, 0]
+            bucket[0] = min(self.rate, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.sampled_out = bucket[2]
+                bucket[2] = 0
+        return True
+
+class _StructuredQueueHandler(QueueHandler):
+    """
+    QueueHandler que conserva los extras del registro.
+
+    El prepare() estándar reemplaza msg por el texto ya formateado; aquí solo se
+    resuelven los args y la traza para que el registro viaje seguro al otro hilo.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_listener: Optional[QueueListener] = None
+
+def configure_logging(service: str):
+    """
+    Configura el logging raíz del proceso (idempotente).
+
+    Nivel global en LOG_LEVEL, niveles por módulo en LOG_LEVELS
+    (ej. {"routers.docente": "DEBUG", "pymongo": "WARNING"}).
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter(service) if settings.log_json else TextFormatter(service))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _StructuredQueueHandler(log_queue)
+    handler.addFilter(DebugSampler(settings.log_debug_rate_per_second))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.log_level.upper())
+    for name, level in settings.log_levels.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+def stop_logging():
+    """Vacía la cola y detiene el hilo escritor (apagado del servicio)"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
@@ -0,0 +1,114 @@
+import base64
+import calendar
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+
+from config import settings
+from database import logs_collection, routed
+from utils.queries import Projection, find_list
+
+logger = logging.getLogger(__name__)
+
+# =============== ALMACÉN DE AUDITORÍA (LOGS) ===============
+# Colección normal con índices compuestos terminados en (fecha, _id) y un índice
+# TTL sobre fecha. Las consultas se paginan por keyset (fecha desc, _id desc):
+# cada página continúa donde terminó la anterior, sin skip, así que su costo no
+# crece con la profundidad ni con el tamaño de la colección.
+
+# Índices: filtro por usuario, por acción y solo por rango de fechas (el TTL)
+LOG_INDEXES = [
+    ([("usuario_id", ASCENDING), ("fecha", DESCENDING), ("_id", DESCENDING)], "usuario_fecha"),
+    ([("accion", ASCENDING), ("fecha", DESCENDING), ("_id", DESCENDING)], "accion_fecha"),
+]
+TTL_INDEX = "fecha_ttl"
+
+MAX_PAGE_SIZE = 500
+
+async def ensure_log_indexes():
+    """Crea los índices de logs y ajusta la retención (idempotente; corre en el arranque del admin)"""
+    for keys, name in LOG_INDEXES:
+        await logs_collection.create_index(keys, name=name)
+
+    retention_s = settings.logs_retention_days * 86400
+    existing = (await logs_collection.index_information()).get(TTL_INDEX)
+    if existing is None:
+        options = {"expireAfterSeconds": retention_s} if retention_s > 0 else {}
+        await logs_collection.create_index([("fecha", ASCENDING)], name=TTL_INDEX, **options)
+    elif retention_s > 0 and existing.get("expireAfterSeconds") != retention_s:
+        # Cambiar la retención no requiere reconstruir el índice
+        await logs_collection.database.command({
+            "collMod": logs_collection.name,
+            "index": {"name": TTL_INDEX, "expireAfterSeconds": retention_s},
+        })
+        logger.info("Retención de logs actualizada", extra={"dias": settings.logs_retention_days})
+    elif retention_s <= 0 and "expireAfterSeconds" in existing:
+        logger.warning(
+            "LOGS_RETENTION_DAYS=0 pero el índice TTL sigue activo; eliminar el índice fecha_ttl para desactivarlo"
+        )
+
+# =============== CURSORES ===============
+
+def _to_millis(fecha: datetime) -> int:
+    # Mongo guarda fechas UTC con precisión de milisegundos
+    return calendar.timegm(fecha.utctimetuple()) * 1000 + fecha.microsecond // 1000
+
+def encode_cursor(doc: Dict) -> str:
+    raw = f"{_to_millis(doc['fecha'])}:{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """(fecha, _id) del último log de la página anterior; ValueError si el cursor es inválido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        millis, oid = raw.split(":", 1)
+        return datetime(1970, 1, 1) + timedelta(milliseconds=int(millis)), ObjectId(oid)
+    except (ValueError, InvalidId, UnicodeDecodeError) as exc:
+        raise ValueError("Cursor inválido") from exc
+
+# =============== CONSULTA ===============
+
+def build_filter(usuario_id: Optional[str] = None, rol: Optional[str] = None, accion: Optional[str] = None,
+                 desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+                 cursor: Optional[str] = None) -> Dict:
+    filtro: Dict = {}
+    if usuario_id:
+        filtro["usuario_id"] = usuario_id
+    if rol:
+        filtro["rol"] = rol
+    if accion:
+        filtro["accion"] = accion
+    rango = {}
+    if desde:
+        rango["$gte"] = desde
+    if hasta:
+        rango["$lt"] = hasta
+    if rango:
+        filtro["fecha"] = rango
+    if cursor:
+        fecha, oid = decode_cursor(cursor)
+        filtro["$or"] = [{"fecha": {"$lt": fecha}}, {"fecha": fecha, "_id": {"$lt": oid}}]
+    return filtro
+
+async def query_logs(projection: Projection, *, limit: int = 100, cursor: Optional[str] = None,
+                     **filters) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Una página de logs (más recientes primero) y el cursor de la siguiente.
+
+    filters: usuario_id, rol, accion, desde, hasta. El cursor es None en la
+    última página.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    # Se pide uno de más para saber si hay otra página sin un count aparte
+    logs = await find_list(
+        routed(logs_collection, "listing"), build_filter(cursor=cursor, **filters),
+        projection, sort=[("fecha", DESCENDING), ("_id", DESCENDING)], limit=limit + 1, length=limit + 1
+    )
+    if len(logs) > limit:
+        logs = logs[:limit]
+        return logs, encode_cursor(logs[-1])
+    return logs, None
@@ -0,0 +1,66 @@
+import asyncio
+from pathlib import PurePosixPath
+from typing import Optional
+from urllib.parse import quote
+
+from fastapi import HTTPException, status
+from fastapi.responses import FileResponse, RedirectResponse, Response
+
+from config import settings
+from utils.storage import get_storage, guess_content_type, url_to_key
+
+# =============== DESCARGA DE ARCHIVOS (X-ACCEL-REDIRECT) ===============
+# Los endpoints de descarga solo autorizan: con settings.accel_redirect la
+# respuesta es un X-Accel-Redirect vacío hacia la location interna del gateway,
+# que sirve el archivo con sendfile (Range, ETag y Last-Modified los resuelve
+# nginx) y el worker de Python queda libre en el acto. Sin gateway (desarrollo,
+# pruebas de carga en proceso) se sirve con FileResponse.
+#
+# Con el almacenamiento en S3 (utils/storage.py) no hay archivo local: la
+# respuesta es una redirección a una URL firmada de vida corta.
+
+# Las evidencias no cambian (nombre hasheado), pero la autorización sí puede
+# cambiar (reasignación): se cachean poco y solo en el navegador
+ARCHIVO_CACHE = "private, max-age=300"
+
+def upload_relative_path(archivo_url: Optional[str]) -> str:
+    """'/uploads/evidencias/x.jpg' -> 'evidencias/x.jpg'; 404 si no apunta dentro de uploads/"""
+    try:
+        return url_to_key(archivo_url)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Archivo no disponible")
+
+async def send_upload(archivo_url: str, *, media_type: Optional[str] = None,
+                      cache_control: str = ARCHIVO_CACHE) -> Response:
+    """Respuesta de descarga de un archivo de uploads/ ya autorizado"""
+    key = upload_relative_path(archivo_url)
+    name = PurePosixPath(key).name
+    media_type = media_type or guess_content_type(name)
+    storage = get_storage()
+
+    # LocalStorage comprueba en disco el layout actual y el plano: fuera del event loop
+    path = await asyncio.to_thread(storage.local_path, key)
+    if path is None:
+        url = await storage.presign(
+            key, expires=settings.s3_presign_seconds, filename=name,
+            content_type=media_type, cache_control=cache_control,
+        )
+        # La redirección no se cachea: la URL firmada vence
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+                                headers={"Cache-Control": "private, no-store"})
+
+    headers = {
+        "Cache-Control": cache_control,
+        "Content-Disposition": f"inline; filename=\"{name}\"",
+    }
+
+    if settings.accel_redirect:
+        # nginx conserva Content-Type, Content-Disposition y Cache-Control de esta respuesta.
+        # Se redirige a la ruta real (layout con fan-out o plano sin migrar), no a la clave
+        relative = path.relative_to(storage.root).as_posix()
+        headers["X-Accel-Redirect"] = settings.accel_redirect_location + quote(relative)
+        return Response(status_code=status.HTTP_200_OK, media_type=media_type, headers=headers)
+
+    if not await asyncio.to_thread(path.is_file):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Archivo no disponible")
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -1,4 +1,4 @@
-from cryptography.fernet import Fernet
+from functools import lru_cache
 from passlib.context import CryptContext
 from config import settings
 import base64
@@ -14,7 +14,11 @@ def get_encryption_key():
     key = hashlib.sha256(settings.encryption_key.encode()).digest()
     return base64.urlsafe_b64encode(key)
 
-cipher = Fernet(get_encryption_key())
+@lru_cache(maxsize=1)
+def get_cipher():
+    """Cifrador Fernet, creado en el primer uso (no al importar el módulo)"""
+    from cryptography.fernet import Fernet
+    return Fernet(get_encryption_key())
 
 def hash_password(password: str) -> str:
     """Hashea una contraseña"""
@@ -28,7 +32,7 @@ def encrypt_data(data: str) -> str:
     """Cifra datos sensibles"""
     if not data:
         return data
-    encrypted = cipher.encrypt(data.encode())
+    encrypted = get_cipher().encrypt(data.encode())
     return encrypted.decode()
 
 def decrypt_data(encrypted_data: str) -> str:
@@ -36,7 +40,7 @@ def decrypt_data(encrypted_data: str) -> str:
     if not encrypted_data:
         return encrypted_data
     try:
-        decrypted = cipher.decrypt(encrypted_data.encode())
+        decrypted = get_cipher().decrypt(encrypted_data.encode())
         return decrypted.decode()
     except Exception:
         return encrypted_data
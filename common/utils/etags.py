@@ -0,0 +1,106 @@
+import hashlib
+import time
+import uuid
+from typing import Dict, Iterable, Tuple
+
+from fastapi import Request, Response
+from pymongo import ReturnDocument
+
+from config import settings
+from database import versiones_collection
+
+# =============== ETAGS POR VERSIÓN ===============
+# Cada recurso cacheable depende de una o más claves de versión en la colección
+# versiones: "materias" o "docentes" para catálogos completos y
+# "estudiante:<id>" / "docente:<id>" para un perfil. Toda escritura que cambie
+# esos datos llama a bump(). El ETag de una respuesta es el hash de las
+# versiones de sus claves, así que se puede responder 304 sin consultar los
+# datos.
+#
+# Las versiones se cachean en memoria settings.etag_version_cache_seconds: un
+# 304 repetido no toca Mongo. Un bump en este proceso actualiza la caché en el
+# acto; uno hecho por otro servicio se ve a lo sumo ese tiempo después.
+#
+# Cada clave guarda también un epoch aleatorio que se fija al crearla. Si la
+# colección se borra (ej. al regenerar el dataset), los contadores vuelven a
+# empezar pero los ETags no se repiten.
+
+# Cache-Control de todos los recursos con ETag, también de los catálogos
+# compartidos: piden Authorization y el gateway no guarda respuestas, así que
+# solo el navegador los guarda y los revalida siempre (la autorización se
+# comprueba en cada petición)
+PRIVADO = "private, no-cache"
+
+_cache: Dict[str, Tuple[float, str]] = {}
+
+def _token(doc: dict) -> str:
+    return f"{doc['epoch']}.{doc['v']}"
+
+def _remember(key: str, token: str) -> str:
+    _cache[key] = (time.monotonic() + settings.etag_version_cache_seconds, token)
+    return token
+
+async def get_version(key: str) -> str:
+    cached = _cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    doc = await versiones_collection.find_one({"_id": key})
+    if doc is None:
+        # Primera lectura de la clave: se crea con versión 0
+        doc = await versiones_collection.find_one_and_update(
+            {"_id": key}, {"$setOnInsert": {"epoch": uuid.uuid4().hex[:8], "v": 0}},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
+    return _remember(key, _token(doc))
+
+async def bump(*keys: str):
+    """Invalida los ETags que dependen de estas claves (llamar después de la escritura)"""
+    for key in keys:
+        doc = await versiones_collection.find_one_and_update(
+            {"_id": key}, {"$inc": {"v": 1}, "$setOnInsert": {"epoch": uuid.uuid4().hex[:8]}},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
+        _remember(key, _token(doc))
+
+async def etag_for(keys: Iterable[str]) -> str:
+    versions = [f"{key}={await get_version(key)}" for key in keys]
+    return '"' + hashlib.sha1("|".join(versions).encode()).hexdigest()[:20] + '"'
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+class Conditional:
+    """Resultado de conditional(): 304 listo para devolver o headers para la respuesta"""
+
+    def __init__(self, etag: str, cache_control: str, response: Response, not_modified: bool):
+        self.headers = {"ETag": etag, "Cache-Control": cache_control}
+        self._response = response
+        self.not_modified = not_modified
+
+    def not_modified_response(self) -> Response:
+        return Response(status_code=304, headers=self.headers)
+
+    def apply(self, result):
+        """Agrega ETag y Cache-Control al resultado del handler (Response propio o datos)"""
+        # FastAPI no combina los headers del Response inyectado con un Response devuelto
+        target = result if isinstance(result, Response) else self._response
+        target.headers.update(self.headers)
+        return result
+
+async def conditional(request: Request, response: Response, *keys: str,
+                      cache_control: str = PRIVADO) -> Conditional:
+    """
+    Calcula el ETag de un endpoint a partir de sus claves de versión.
+
+    Uso:
+        cache = await conditional(request, response, "materias")
+        if cache.not_modified:
+            return cache.not_modified_response()
+        ...
+        return cache.apply(resultado)
+    """
+    etag = await etag_for(keys)
+    return Conditional(etag, cache_control, response, _matches(request.headers.get("if-none-match", ""), etag))
@@ -0,0 +1,249 @@
+import asyncio
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# =============== PIPELINE DE IMÁGENES DE EVIDENCIAS ===============
+# Orientación EXIF -> recorte del encabezado con el nombre -> codificación.
+# Todo es CPU y bloqueante: los endpoints lo corren con asyncio.to_thread, o
+# en image_pool() cuando procesan muchas imágenes a la vez (lotes). PIL libera
+# el GIL al decodificar y codificar, así que los hilos sí corren en paralelo.
+# PIL se importa en la primera imagen, no al arrancar el servicio.
+
+_pool: Optional[ThreadPoolExecutor] = None
+
+def image_pool() -> ThreadPoolExecutor:
+    """Pool acotado (settings.image_workers) compartido por todos los lotes del proceso"""
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=settings.image_workers, thread_name_prefix="imagenes")
+    return _pool
+
+async def run_in_image_pool(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(image_pool(), func, *args)
+
+def correct_image_orientation(img):
+    """Corrige la orientación de la imagen según metadatos EXIF"""
+    from PIL import ExifTags
+    try:
+        # Obtener información EXIF
+        exif = img._getexif()
+        if exif is None:
+            return img
+
+        # Buscar el tag de orientación
+        orientation_key = None
+        for tag, value in ExifTags.TAGS.items():
+            if value == 'Orientation':
+                orientation_key = tag
+                break
+
+        if orientation_key is None:
+            return img
+
+        orientation = exif.get(orientation_key)
+
+        # Aplicar rotación según orientación EXIF
+        if orientation == 3:
+            img = img.rotate(180, expand=True)
+        elif orientation == 6:
+            img = img.rotate(270, expand=True)
+        elif orientation == 8:
+            img = img.rotate(90, expand=True)
+
+        logger.debug("Orientación EXIF corregida", extra={"orientation": orientation})
+
+    except (AttributeError, KeyError, IndexError, TypeError) as e:
+        # Si no hay EXIF o hay error, devolver imagen original
+        logger.debug("Imagen sin orientación EXIF legible", extra={"error": str(e)})
+    return img
+
+def encode_image(img, extension: str) -> bytes:
+    """Codifica la imagen en el formato que indica la extensión (como img.save(ruta))"""
+    from PIL import Image
+    formato = Image.registered_extensions().get(extension.lower())
+    if formato is None:
+        raise ValueError(f"Extensión de imagen no soportada: {extension!r}")
+    buffer = io.BytesIO()
+    img.save(buffer, format=formato)
+    return buffer.getvalue()
+
+class InvalidImage(ValueError):
+    """El archivo no es una imagen que PIL pueda leer (reintentar no sirve)"""
+
+def open_image(source):
+    """Abre y decodifica la imagen; InvalidImage si no es una imagen válida"""
+    from PIL import Image, UnidentifiedImageError
+    try:
+        img = Image.open(source)
+        img.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, SyntaxError, OSError) as e:
+        # OSError: archivo truncado o corrupto (la fuente ya está en memoria o en un temporal)
+        raise InvalidImage(f"Imagen no válida: {e}") from e
+    return img
+
+def parse_crop_area(crop_area) -> Optional[Dict]:
+    """crop_area tal como llega del cliente: None o {x, y, width, height} numéricos; ValueError si no"""
+    if crop_area is None:
+        return None
+    if not isinstance(crop_area, dict) or not all(
+        isinstance(crop_area.get(campo), (int, float)) and not isinstance(crop_area.get(campo), bool)
+        for campo in ("x", "y", "width", "height")
+    ):
+        raise ValueError(f"crop_area inválido: {crop_area!r}")
+    return crop_area
+
+def has_crop(crop_area: Optional[Dict]) -> bool:
+    return bool(crop_area) and crop_area.get("width", 0) > 0 and crop_area.get("height", 0) > 0
+
+# Formatos de salida de la normalización: (formato PIL, extensión, content type)
+NORMALIZED_FORMATS = {
+    "jpeg": ("JPEG", ".jpg", "image/jpeg"),
+    "webp": ("WEBP", ".webp", "image/webp"),
+}
+
+def source_size(source) -> int:
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    position = source.tell()
+    size = source.seek(0, os.SEEK_END)
+    source.seek(position)
+    return size
+
+def normalize_image(img, max_edge: int, output_format: str, quality: int):
+    """
+    Reduce el lado mayor a max_edge y codifica sin metadatos (EXIF, GPS,
+    comentarios, XMP). Se conserva solo el perfil ICC para no alterar los
+    colores. Devuelve (bytes, extensión, content type, dimensiones).
+    """
+    from PIL import Image
+
+    formato, extension, content_type = NORMALIZED_FORMATS[output_format]
+    icc_profile = img.info.get("icc_profile")
+
+    if max(img.size) > max_edge:
+        # thumbnail conserva la proporción; reducing_gap reduce primero por bloques (rápido)
+        img = img.copy()
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS, reducing_gap=3.0)
+
+    if img.mode not in ("RGB", "L") and not (formato == "WEBP" and img.mode == "RGBA"):
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            # JPEG no tiene transparencia: fondo blanco, como se ve en pantalla
+            rgba = img.convert("RGBA")
+            fondo = Image.new("RGB", rgba.size, (255, 255, 255))
+            fondo.paste(rgba, mask=rgba.getchannel("A"))
+            img = fondo
+        else:
+            img = img.convert("RGB")
+
+    options = {"quality": quality, "exif": b""}
+    if icc_profile:
+        options["icc_profile"] = icc_profile
+    if formato == "JPEG":
+        options.update(progressive=True, optimize=True)
+    else:
+        options.update(method=4)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format=formato, **options)
+    return buffer.getvalue(), extension, content_type, img.size
+
+def process_evidence(source, filename: str, crop_area: Optional[Dict] = None,
+                     keep_steps: bool = False, normalize: Optional[bool] = None) -> Dict:
+    """
+    Procesa una evidencia: source es un archivo binario abierto o bytes.
+
+    crop_area ({x, y, width, height}, en píxeles de la imagen ya orientada)
+    marca el nombre del estudiante: se elimina todo lo que está ARRIBA del
+    borde inferior del rectángulo. Con keep_steps se devuelven también las
+    codificaciones antes y después del recorte (comparación en DEBUG).
+
+    Con la normalización (settings.image_normalize) la imagen se reduce a
+    settings.image_max_edge y se recodifica en settings.image_format sin
+    metadatos; si no, se guarda en el formato de la extensión original.
+    Si la normalización no reduce las dimensiones y el resultado pesa más que
+    el original (capturas PNG, JPEG ya muy comprimidos), se guarda en el
+    formato original y el resultado lo indica con formato_conservado.
+    El resultado incluye data, extension y content_type del archivo a guardar
+    y los bytes originales y guardados. ValueError (InvalidImage) si el archivo
+    no es una imagen válida.
+    """
+    from PIL import Image, ImageOps
+
+    if normalize is None:
+        normalize = settings.image_normalize
+    bytes_original = source_size(source)
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    extension = os.path.splitext(filename)[1]
+
+    img = open_image(source)
+    formato = img.format
+    original_size = (img.width, img.height)
+
+    # PASO 1: Corregir orientación EXIF primero (exif_transpose cubre también las imágenes espejadas)
+    img = ImageOps.exif_transpose(img) if normalize else correct_image_orientation(img)
+    result = {
+        "formato": formato,
+        "dimension_original": original_size,
+        "dimension_orientada": (img.width, img.height),
+        "recortada": False,
+        "crop_from_y": None,
+        "normalizada": normalize,
+    }
+
+    # PASO 2: Si hay área para recortar
+    if has_crop(crop_area):
+        # Calcular desde dónde cortar: eliminar todo ARRIBA incluyendo el rectángulo
+        crop_from_y = int(crop_area["y"]) + int(crop_area["height"])
+        if crop_from_y >= img.height:
+            raise ValueError("crop_area fuera de la imagen: no queda nada debajo del nombre")
+        if keep_steps:
+            result["antes"] = encode_image(img, extension)
+
+        # Recortar imagen: (left, top, right, bottom)
+        img = img.crop((0, crop_from_y, img.width, img.height))
+
+        if keep_steps:
+            result["despues"] = encode_image(img, extension)
+        result["recortada"] = True
+        result["crop_from_y"] = crop_from_y
+
+    # PASO 3: Normalizar o codificar en el formato de la extensión original
+    result["formato_conservado"] = False
+    if normalize:
+        data, normalized_extension, content_type, size = normalize_image(
+            img, settings.image_max_edge, settings.image_format, settings.image_quality
+        )
+        if len(data) > bytes_original and size == img.size:
+            # Sin reducción, recodificar solo agrandaría el archivo: se conserva el formato original
+            # (ya orientado y recortado, sin metadatos) si pesa menos
+            try:
+                original = encode_image(img, extension)
+            except ValueError:
+                original = None
+            if original is not None and len(original) < len(data):
+                data = original
+                content_type = Image.MIME.get(Image.registered_extensions().get(extension.lower()))
+                result.update(normalizada=False, formato_conservado=True)
+        if not result["formato_conservado"]:
+            extension = normalized_extension
+    else:
+        data, size = encode_image(img, extension), img.size
+        content_type = Image.MIME.get(Image.registered_extensions().get(extension.lower()))
+
+    result.update({
+        "data": data,
+        "extension": extension,
+        "content_type": content_type,
+        "dimension_final": size,
+        "bytes_original": bytes_original,
+        "bytes_guardados": len(data),
+    })
+    return result
@@ -1,5 +1,7 @@
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+from config import settings
+
 # =============== LIMITADOR DE PETICIONES ===============
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=get_remote_address, enabled=settings.rate_limit_enabled)
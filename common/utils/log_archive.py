@@ -0,0 +1,243 @@
+import asyncio
+import gzip
+import hashlib
+import io
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import orjson
+from bson import ObjectId
+
+from database import logs_collection
+
+try:
+    import zstandard
+except ImportError:  # zstd es opcional: sin él los segmentos se escriben con gzip
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# =============== ARCHIVO FRÍO DE LOGS ===============
+# Los logs más viejos que settings.logs_archive_after_days salen de Mongo a
+# segmentos diarios JSONL comprimidos:
+#
+#   <dir>/2026/01/logs-2026-01-15.0.jsonl.zst   (un documento por línea)
+#   <dir>/2026/01/logs-2026-01-15.0.json        (índice del segmento)
+#
+# El índice guarda el rango de fechas, el conteo y el sha256 del archivo
+# comprimido, y si los documentos ya se borraron de Mongo. El orden es siempre
+# escribir segmento -> escribir índice -> borrar por lotes -> marcar borrado,
+# así que un corte a mitad de camino se retoma sin duplicar ni perder logs.
+# Pensado para correr desde tools/archive_logs.py (la escritura es bloqueante).
+
+EXTENSIONS = {"zstd": ".jsonl.zst", "gzip": ".jsonl.gz"}
+
+def default_compression() -> str:
+    return "zstd" if zstandard is not None else "gzip"
+
+class _HashingWriter(io.RawIOBase):
+    """Archivo de solo escritura que va calculando el sha256 de lo escrito"""
+
+    def __init__(self, fh):
+        self._fh = fh
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._fh.write(data)
+        self.sha256.update(data)
+        self.size += len(data)
+        return len(data)
+
+def _open_writer(fh, compression: str):
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Compresión zstd no disponible: instala zstandard o usa gzip")
+        return zstandard.ZstdCompressor(level=10).stream_writer(fh, closefd=False)
+    return gzip.GzipFile(fileobj=fh, mode="wb", compresslevel=6)
+
+def _open_reader(path: Path):
+    if path.name.endswith(EXTENSIONS["zstd"]):
+        if zstandard is None:
+            raise RuntimeError(f"{path.name}: se necesita zstandard para leer segmentos zstd")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(path.open("rb")))
+    return gzip.open(path, "rb")
+
+def _default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+def _write_json(path: Path, data: Dict):
+    tmp = path.with_suffix(".tmp")
+    data = {key: value for key, value in data.items() if key != "_path"}
+    tmp.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    os.replace(tmp, path)
+
+# =============== SEGMENTOS ===============
+
+def day_dir(archive_dir: Path, day: date) -> Path:
+    return archive_dir / f"{day:%Y}" / f"{day:%m}"
+
+def list_indexes(archive_dir: Path, desde: Optional[date] = None, hasta: Optional[date] = None) -> List[Dict]:
+    """Índices de los segmentos (con su ruta en "_path"), ordenados por día y parte"""
+    indexes = []
+    for path in sorted(archive_dir.glob("*/*/logs-*.json")):
+        index = orjson.loads(path.read_bytes())
+        day = date.fromisoformat(index["day"])
+        if (desde and day < desde) or (hasta and day > hasta):
+            continue
+        index["_path"] = path
+        indexes.append(index)
+    indexes.sort(key=lambda index: (index["day"], index["part"]))
+    return indexes
+
+def segment_path(index: Dict) -> Path:
+    return index["_path"].parent / index["segment"]
+
+def verify_segment(index: Dict) -> bool:
+    sha256 = hashlib.sha256()
+    with segment_path(index).open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest() == index["sha256"]
+
+def _read_segment(index: Dict) -> Iterator[Dict]:
+    with _open_reader(segment_path(index)) as fh:
+        for line in fh:
+            if line.strip():
+                yield orjson.loads(line)
+
+async def _delete_archived(index: Dict, batch_size: int, pause: float) -> int:
+    """Borra de Mongo, por lotes, los logs de un segmento ya escrito"""
+    deleted = 0
+    batch = []
+    for doc in _read_segment(index):
+        batch.append(ObjectId(doc["_id"]))
+        if len(batch) >= batch_size:
+            deleted += (await logs_collection.delete_many({"_id": {"$in": batch}})).deleted_count
+            batch = []
+            if pause:
+                await asyncio.sleep(pause)
+    if batch:
+        deleted += (await logs_collection.delete_many({"_id": {"$in": batch}})).deleted_count
+
+    index["deleted"] = True
+    _write_json(index["_path"], index)
+    return deleted
+
+async def archive_day(archive_dir: Path, day: date, *, compression: Optional[str] = None,
+                      batch_size: int = 1000, pause: float = 0.0, dry_run: bool = False) -> Dict:
+    """
+    Archiva los logs de un día (UTC) y los borra de Mongo.
+
+    Primero termina los borrados pendientes de segmentos previos del mismo día;
+    lo que quede en Mongo para ese día va a una parte nueva.
+    """
+    compression = compression or default_compression()
+    start = datetime.combine(day, time.min)
+    filtro = {"fecha": {"$gte": start, "$lt": start + timedelta(days=1)}}
+    result = {"day": day.isoformat(), "archived": 0, "deleted": 0}
+
+    previous = list_indexes(archive_dir, day, day)
+    if dry_run:
+        result["archived"] = await logs_collection.count_documents(filtro)
+        return result
+
+    for index in previous:
+        if not index.get("deleted"):
+            result["deleted"] += await _delete_archived(index, batch_size, pause)
+
+    part = max((index["part"] for index in previous), default=-1) + 1
+    target_dir = day_dir(archive_dir, day)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    name = f"logs-{day.isoformat()}.{part}"
+    segment = target_dir / f"{name}{EXTENSIONS[compression]}"
+    tmp = segment.with_name(segment.name + ".tmp")
+
+    count = 0
+    first = last = None
+    with tmp.open("wb") as raw:
+        hashing = _HashingWriter(raw)
+        with _open_writer(hashing, compression) as writer:
+            async for doc in logs_collection.find(filtro).sort([("fecha", 1), ("_id", 1)]).batch_size(batch_size):
+                writer.write(orjson.dumps(doc, default=_default) + b"\n")
+                count += 1
+                first = first or doc["fecha"]
+                last = doc["fecha"]
+        raw.flush()
+        os.fsync(raw.fileno())
+
+    if not count:
+        tmp.unlink()
+        return result
+
+    os.replace(tmp, segment)
+    index = {
+        "day": day.isoformat(),
+        "part": part,
+        "segment": segment.name,
+        "compression": compression,
+        "desde": first.isoformat(),
+        "hasta": last.isoformat(),
+        "count": count,
+        "bytes": hashing.size,
+        "sha256": hashing.sha256.hexdigest(),
+        "deleted": False,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+    }
+    index["_path"] = target_dir / f"{name}.json"
+    _write_json(index["_path"], index)
+
+    result["archived"] = count
+    result["deleted"] += await _delete_archived(index, batch_size, pause)
+    logger.info("Logs archivados", extra={"dia": result["day"], "documentos": count, "bytes": hashing.size})
+    return result
+
+async def archive_before(archive_dir: Path, cutoff: date, **options) -> List[Dict]:
+    """Archiva día por día todos los logs anteriores a cutoff (exclusivo)"""
+    oldest = await logs_collection.find_one({}, {"fecha": 1}, sort=[("fecha", 1)])
+    if oldest is None:
+        return []
+    results = []
+    day = oldest["fecha"].date()
+    while day < cutoff:
+        results.append(await archive_day(archive_dir, day, **options))
+        day += timedelta(days=1)
+    return results
+
+# =============== LECTURA ===============
+
+def scan_archive(archive_dir: Path, *, desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+                 usuario_id: Optional[str] = None, rol: Optional[str] = None, accion: Optional[str] = None,
+                 verify: bool = False) -> Iterator[Dict]:
+    """
+    Recorre los segmentos archivados sin restaurarlos, en orden cronológico.
+
+    Mismos filtros que utils/audit_store.query_logs ([desde, hasta)); solo se
+    abren los segmentos cuyo rango de fechas del índice se cruza con el pedido.
+    """
+    for index in list_indexes(archive_dir, desde.date() if desde else None, hasta.date() if hasta else None):
+        if (desde and datetime.fromisoformat(index["hasta"]) < desde) or \
+                (hasta and datetime.fromisoformat(index["desde"]) >= hasta):
+            continue
+        if verify and not verify_segment(index):
+            raise ValueError(f"{index['segment']}: el sha256 no coincide con el índice")
+        for doc in _read_segment(index):
+            if usuario_id and doc.get("usuario_id") != usuario_id:
+                continue
+            if rol and doc.get("rol") != rol:
+                continue
+            if accion and doc.get("accion") != accion:
+                continue
+            if desde or hasta:
+                fecha = datetime.fromisoformat(doc["fecha"])
+                if (desde and fecha < desde) or (hasta and fecha >= hasta):
+                    continue
+            yield doc
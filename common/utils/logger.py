@@ -1,7 +1,10 @@
+import logging
 from datetime import datetime
 from database import logs_collection
 from models.schemas import LogCreate
 
+logger = logging.getLogger(__name__)
+
 # =============== REGISTRO DE LOGS ===============
 async def log_action(usuario_id: str, rol: str, accion: str, detalle: str = None, ip: str = None):
     """
@@ -17,6 +20,6 @@ async def log_action(usuario_id: str, rol: str, accion: str, detalle: str = None
             "ip": ip
         }
         await logs_collection.insert_one(log_entry)
-        print(f"📝 LOG: [{rol}] {usuario_id} - {accion}")
-    except Exception as e:
-        print(f"❌ Error al registrar log: {e}")
+        logger.debug("Acción registrada", extra={"usuario_id": usuario_id, "rol": rol, "accion": accion})
+    except Exception:
+        logger.exception("Error al registrar log", extra={"usuario_id": usuario_id, "accion": accion})
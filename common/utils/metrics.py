@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from pymongo import monitoring
+from starlette.responses import Response
+from starlette.routing import Match
+
+# =============== MÉTRICAS (PROMETHEUS) ===============
+# Las etiquetas son de baja cardinalidad: la ruta es la plantilla
+# (/api/docente/recalificaciones/{solicitud_id}/calificar), nunca el path con IDs.
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Duración de las peticiones HTTP",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Peticiones HTTP en curso",
+    ["method"],
+)
+EVENT_LOOP_LAG = Gauge(
+    "event_loop_lag_seconds",
+    "Retraso del event loop respecto del intervalo de muestreo",
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds",
+    "Duración de los comandos enviados a MongoDB",
+    ["command", "collection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+MONGO_COMMANDS = Counter(
+    "mongo_commands_total",
+    "Comandos enviados a MongoDB",
+    ["command", "collection", "outcome"],
+)
+MONGO_POOL_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Espera para obtener una conexión del pool de MongoDB",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+SERVICE_STARTUP = Gauge(
+    "service_startup_seconds",
+    "Duración del arranque del servicio (lifespan y total desde que arrancó el proceso)",
+    ["phase"],
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+def route_template(scope) -> str:
+    """Plantilla de la ruta que atendió la petición (o 'unmatched')"""
+    app = scope.get("app")
+    endpoint = scope.get("endpoint")
+    if app is None:
+        return UNMATCHED_ROUTE
+    routes = app.router.routes
+    if endpoint is not None:
+        for route in routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                return route.path
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED_ROUTE
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide duración y peticiones en curso por ruta"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            REQUEST_DURATION.labels(method, route_template(scope), str(status_code)).observe(
+                time.perf_counter() - start
+            )
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Mide cuánto se atrasa el event loop en despertar de un sleep (bloqueos de CPU/IO)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(0.0, loop.time() - start - interval))
+
+def metrics_response() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """CommandListener de pymongo: latencia y conteo por comando y colección"""
+
+    def __init__(self):
+        # (connection_id, request_id) -> colección del comando en curso
+        self._pending = {}
+
+    @staticmethod
+    def _collection(event) -> str:
+        value = event.command.get(event.command_name)
+        if isinstance(value, str):
+            return value
+        # getMore lleva el id del cursor; la colección viene aparte
+        return event.command.get("collection", "-")
+
+    def started(self, event):
+        self._pending[(event.connection_id, event.request_id)] = self._collection(event)
+
+    def _finish(self, event, outcome: str):
+        collection = self._pending.pop((event.connection_id, event.request_id), "-")
+        MONGO_COMMAND_DURATION.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+        MONGO_COMMANDS.labels(event.command_name, collection, outcome).inc()
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+mongo_command_metrics = MongoCommandMetrics()
@@ -0,0 +1,55 @@
+import time
+
+# =============== MIDDLEWARE ASGI ===============
+# Middleware ASGI puros: solo envuelven `send` y modifican los headers del mensaje
+# http.response.start. A diferencia de BaseHTTPMiddleware no crean una tarea ni
+# re-empaquetan el cuerpo por petición, y no rompen las respuestas en streaming.
+
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+]
+
+class SecurityHeadersMiddleware:
+    """Agrega los headers de seguridad (HSTS, anti-sniff, X-Frame-Options) a cada respuesta"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *SECURITY_HEADERS]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+class TimingMiddleware:
+    """Informa el tiempo de procesamiento hasta el primer byte en el header Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", f"app;dur={elapsed_ms:.2f}".encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
@@ -0,0 +1,101 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict
+
+from pymongo import monitoring
+
+from utils.metrics import MONGO_POOL_WAIT
+
+# =============== MONITOREO DEL POOL DE MONGO ===============
+
+# Límites (segundos) del histograma de espera para obtener una conexión del pool
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class PoolWaitMonitor(monitoring.ConnectionPoolListener):
+    """
+    Mide cuánto espera cada operación para obtener una conexión del pool.
+
+    pymongo emite check_out_started y checked_out/check_out_failed en el mismo
+    hilo (Motor ejecuta pymongo en su executor), así que el inicio se guarda en
+    un threading.local.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.buckets = [0] * (len(WAIT_BUCKETS) + 1)
+            self.open_connections = 0
+
+    def _record_wait(self) -> float:
+        start = getattr(self._local, "start", None)
+        self._local.start = None
+        return time.perf_counter() - start if start is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.start = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait = self._record_wait()
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.buckets[bisect_left(WAIT_BUCKETS, wait)] += 1
+        MONGO_POOL_WAIT.observe(wait)
+
+    def connection_check_out_failed(self, event):
+        self._record_wait()
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            with self._lock:
+                self.timeouts += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self) -> Dict:
+        """Resumen de la espera de checkout (para /health y pruebas de carga)"""
+        with self._lock:
+            histogram = {f"le_{bound}": count for bound, count in zip(WAIT_BUCKETS, self.buckets)}
+            histogram["le_inf"] = self.buckets[-1]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "open_connections": self.open_connections,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "wait_histogram": histogram,
+            }
+
+pool_monitor = PoolWaitMonitor()
@@ -0,0 +1,151 @@
+import io
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# =============== DETECCIÓN DEL ÁREA DEL NOMBRE ===============
+# Propone el crop_area de upload-temp para que el docente solo confirme (o
+# corrija) el rectángulo del nombre en vez de dibujarlo en cada examen.
+#
+# Supone la hoja típica: encabezado (institución, materia, "Nombre: ____")
+# arriba, separado del cuerpo por el mayor espacio en blanco de la parte
+# superior. Sobre la imagen reducida a ANALYSIS_EDGE en escala de grises:
+#   1. tinta = píxeles bastante más oscuros que el papel de su bloque (el
+#      percentil alto de cada bloque estima el papel, así que las sombras y
+#      gradientes de la foto no cuentan como tinta);
+#   2. perfil horizontal: fracción de tinta por fila -> bandas de texto;
+#   3. corte en el mayor hueco entre bandas dentro de SEARCH_FRACTION de la
+#      altura, pesando más los huecos más arriba (POSITION_DECAY): un hueco
+#      entre párrafos del cuerpo puede ser tan grande como el del encabezado.
+# El análisis es NumPy vectorizado sobre unos 300x400 píxeles y cuesta pocos
+# milisegundos. Lo demás es decodificar: con JPEG la decodificación reducida
+# (draft) evita reconstruir la foto completa, pero leer el archivo sigue
+# creciendo con su tamaño (benchmarks/bench_name_region.py mide las dos partes).
+#
+# Las coordenadas se devuelven en píxeles de la imagen ya orientada (EXIF),
+# las mismas del crop_area que dibuja el docente sobre la previsualización.
+
+ANALYSIS_EDGE = 400
+BLOCK = 16
+# Tinta: más oscura que INK_RATIO veces el papel estimado del bloque
+PAPER_PERCENTILE = 90
+INK_RATIO = 0.72
+# Fila de texto: al menos esta fracción de la fila es tinta
+LINE_DENSITY = 0.012
+# Columnas con tinta en más de esta fracción de las filas: bordes de la hoja o del fondo
+EDGE_COLUMN_DENSITY = 0.5
+SEARCH_FRACTION = 0.45
+# Peso de un hueco al final de la zona de búsqueda: 1 - POSITION_DECAY (arriba del todo pesa 1)
+POSITION_DECAY = 0.6
+MIN_GAP = 2
+ORIENTATION_TAG = 0x0112
+
+def load_gray(source, edge: int = ANALYSIS_EDGE):
+    """
+    Imagen orientada, en escala de grises y con el lado mayor ~edge; devuelve
+    (arreglo float32, tamaño de la imagen orientada completa)
+    """
+    import numpy as np
+    from PIL import Image, ImageOps
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    img = Image.open(source)
+    size = img.size
+    if img.getexif().get(ORIENTATION_TAG) in (5, 6, 7, 8):
+        size = size[::-1]
+
+    # JPEG: decodifica directamente a 1/2, 1/4 u 1/8 (no hace nada con otros formatos)
+    scale = edge / max(img.size)
+    if scale < 1:
+        img.draft("L", (max(1, int(img.width * scale)), max(1, int(img.height * scale))))
+    img = ImageOps.exif_transpose(img).convert("L")
+    if max(img.size) > edge:
+        img.thumbnail((edge, edge), Image.BILINEAR)
+    return np.asarray(img, dtype=np.float32), size
+
+def ink_mask(gray):
+    """Píxeles de tinta: más oscuros que INK_RATIO veces el papel de su bloque BLOCKxBLOCK"""
+    import numpy as np
+
+    h, w = gray.shape
+    hb, wb = -(-h // BLOCK), -(-w // BLOCK)
+    padded = np.pad(gray, ((0, hb * BLOCK - h), (0, wb * BLOCK - w)), mode="edge")
+    paper = np.percentile(padded.reshape(hb, BLOCK, wb, BLOCK), PAPER_PERCENTILE, axis=(1, 3))
+    paper = np.repeat(np.repeat(paper, BLOCK, axis=0), BLOCK, axis=1)[:h, :w]
+    ink = gray < paper * INK_RATIO
+    # Bordes verticales (canto de la hoja, mesa de fondo) marcarían todas las filas como texto
+    ink[:, ink.mean(axis=0) > EDGE_COLUMN_DENSITY] = False
+    return ink
+
+def text_bands(ink):
+    """Bandas de filas con texto [(inicio, fin)), uniendo las separadas por menos de MIN_GAP"""
+    import numpy as np
+
+    profile = np.convolve(ink.mean(axis=1), np.ones(3, dtype=np.float32) / 3, mode="same")
+    rows = np.concatenate(([0], (profile > LINE_DENSITY).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(rows)).reshape(-1, 2)
+    if len(edges) == 0:
+        return edges
+    # Huecos de menos de MIN_GAP filas son parte de la misma línea
+    keep = np.concatenate(([True], edges[1:, 0] - edges[:-1, 1] >= MIN_GAP))
+    starts = edges[keep, 0]
+    ends = np.append(edges[np.flatnonzero(keep)[1:] - 1, 1], edges[-1, 1])
+    bands = np.stack([starts, ends], axis=1)
+    # Descarta motas de una sola fila
+    return bands[bands[:, 1] - bands[:, 0] > 1]
+
+def propose_crop(gray) -> Optional[Dict]:
+    """Rectángulo del encabezado en coordenadas del arreglo, con su confianza (0-1); None si no hay"""
+    import numpy as np
+
+    h, w = gray.shape
+    ink = ink_mask(gray)
+    bands = text_bands(ink)
+    if len(bands) < 2:
+        return None
+
+    # Cortes posibles: después de cada banda que empieza en la parte superior
+    gaps = bands[1:, 0] - bands[:-1, 1]
+    candidates = np.flatnonzero(bands[:-1, 0] < h * SEARCH_FRACTION)
+    if len(candidates) == 0:
+        return None
+    scores = gaps * (1.0 - POSITION_DECAY * bands[:-1, 1] / (h * SEARCH_FRACTION))
+    best = candidates[np.argmax(scores[candidates])]
+
+    top = int(bands[0, 0])
+    # Se corta a mitad del hueco: ni el nombre queda visible ni se pierde la primera línea del cuerpo
+    bottom = int(bands[best, 1] + gaps[best] // 2)
+    columns = np.flatnonzero(ink[top:bottom].any(axis=0))
+    left, right = (int(columns[0]), int(columns[-1]) + 1) if len(columns) else (0, w)
+
+    # Confianza: cuánto se destaca el hueco elegido frente al siguiente mejor
+    others = np.delete(scores[candidates], np.argmax(scores[candidates]))
+    runner_up = max(float(others.max()) if len(others) else 0.0, float(np.median(gaps)))
+    confidence = 1.0 - runner_up / float(scores[best]) if scores[best] > 0 else 0.0
+    return {"x": left, "y": top, "width": right - left, "height": bottom - top,
+            "confianza": round(max(0.0, min(1.0, confidence)), 2)}
+
+def scale_area(area: Dict, shape, size) -> Dict:
+    """Pasa la propuesta de coordenadas del arreglo (shape) a píxeles de la imagen completa (size)"""
+    width, height = size
+    sx, sy = width / shape[1], height / shape[0]
+    x, y = int(area["x"] * sx), int(area["y"] * sy)
+    return {
+        "x": x,
+        "y": y,
+        "width": min(width, int(round((area["x"] + area["width"]) * sx))) - x,
+        "height": min(height, int(round((area["y"] + area["height"]) * sy))) - y,
+        "confianza": area["confianza"],
+    }
+
+def detect_name_region(source) -> Optional[Dict]:
+    """
+    Propuesta de crop_area ({x, y, width, height, confianza}) para la imagen
+    (archivo binario abierto o bytes), en píxeles de la imagen orientada.
+    None si no se encuentra un encabezado separado del cuerpo.
+    """
+    gray, size = load_gray(source)
+    area = propose_crop(gray)
+    return scale_area(area, gray.shape, size) if area else None
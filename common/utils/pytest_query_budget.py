@@ -0,0 +1,66 @@
+"""
+Plugin de pytest: falla un test de endpoint si alguna petición que hace supera
+su presupuesto de consultas a Mongo.
+
+Activarlo en el conftest.py del servicio:
+
+    pytest_plugins = ["utils.pytest_query_budget"]
+
+y declarar el presupuesto en cada test:
+
+    @pytest.mark.query_budget(max_queries=3, max_repeated=0)
+    def test_listar_solicitudes(client):
+        client.get("/api/estudiante/solicitudes")
+
+El fixture `mongo_queries` expone [(ruta, QueryStats), ...] para aserciones propias.
+"""
+import pytest
+
+from utils.query_budget import add_observer, remove_observer
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(max_queries, max_repeated=None): máximo de comandos Mongo (y repetidos) por petición",
+    )
+
+@pytest.fixture
+def mongo_queries():
+    records = []
+
+    def observer(route, stats):
+        records.append((route, stats))
+
+    add_observer(observer)
+    yield records
+    remove_observer(observer)
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+
+    max_queries = marker.kwargs.get("max_queries", marker.args[0] if marker.args else None)
+    max_repeated = marker.kwargs.get("max_repeated")
+    violations = []
+
+    def observer(route, stats):
+        if max_queries is not None and stats.commands > max_queries:
+            violations.append(f"{route}: {stats.commands} consultas (presupuesto {max_queries})")
+        if max_repeated is not None and stats.repeated > max_repeated:
+            shape, times = stats.most_repeated() or ("-", 0)
+            violations.append(
+                f"{route}: {stats.repeated} consultas repetidas (presupuesto {max_repeated}); "
+                f"posible N+1 x{times}: {shape}"
+            )
+
+    add_observer(observer)
+    try:
+        result = yield
+    finally:
+        remove_observer(observer)
+
+    if violations:
+        pytest.fail("Presupuesto de consultas excedido:\n  " + "\n  ".join(violations), pytrace=False)
+    return result
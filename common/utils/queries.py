@@ -0,0 +1,123 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+
+from config import settings
+
+# =============== CONSULTAS CON PROYECCIÓN ===============
+# Cada lectura declara los campos que usa. Mongo devuelve solo esos campos
+# (sin hashes de contraseña, arrays de materias ni textos largos innecesarios)
+# y, si existe un índice que los cubra, la consulta puede resolverse sin leer
+# el documento.
+
+class ProjectionError(KeyError):
+    """Un handler accedió a un campo que no declaró en su proyección"""
+
+class Projection:
+    """Conjunto de campos que necesita un punto de lectura (el _id siempre se incluye)"""
+
+    def __init__(self, *fields: str):
+        self.fields = tuple(fields)
+        self.spec: Dict[str, int] = {field: 1 for field in fields}
+        # Campos de primer nivel accesibles en el documento resultante
+        self.allowed = frozenset(field.split(".")[0] for field in fields) | {"_id"}
+
+    def __repr__(self):
+        return f"Projection{self.fields!r}"
+
+    def wrap(self, doc: Optional[dict]):
+        """En modo estricto envuelve el documento para detectar accesos fuera de la proyección"""
+        if doc is None or not settings.strict_projections:
+            return doc
+        return ProjectedDocument(doc, self)
+
+class ProjectedDocument(dict):
+    """
+    Documento que falla al leer un campo que no forma parte de su proyección.
+
+    Solo se usa con settings.strict_projections (desarrollo/CI): un acceso a
+    doc["password"] o doc.get("materias") no declarado lanza ProjectionError en
+    lugar de devolver silenciosamente None o un valor por defecto.
+    """
+    __slots__ = ("_projection",)
+
+    def __init__(self, doc: dict, projection: Projection):
+        super().__init__(doc)
+        self._projection = projection
+
+    def _check(self, key: Any):
+        if key not in self._projection.allowed:
+            raise ProjectionError(
+                f"Campo '{key}' fuera de la proyección declarada {self._projection!r}"
+            )
+
+    def __getitem__(self, key):
+        self._check(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._check(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self._check(key)
+        return super().__contains__(key)
+
+async def find_one(collection, filtro: dict, projection: Projection, **kwargs):
+    """find_one que solo trae los campos de la proyección"""
+    doc = await collection.find_one(filtro, projection.spec, **kwargs)
+    return projection.wrap(doc)
+
+async def find_list(
+    collection,
+    filtro: dict,
+    projection: Projection,
+    sort: Optional[Sequence[Tuple[str, int]]] = None,
+    limit: int = 0,
+    length: Optional[int] = None,
+) -> List[dict]:
+    """find(...).to_list(...) que solo trae los campos de la proyección"""
+    cursor = collection.find(filtro, projection.spec)
+    if sort:
+        cursor = cursor.sort(list(sort))
+    if limit:
+        cursor = cursor.limit(limit)
+    docs = await cursor.to_list(length=length)
+    if not settings.strict_projections:
+        return docs
+    return [projection.wrap(doc) for doc in docs]
+
+def id_variants(value) -> list:
+    """
+    Formas posibles de un _id guardado como string u ObjectId.
+
+    Las referencias a materias se guardan a veces como str(ObjectId) y a veces
+    como ObjectId; buscar ambas variantes evita el reintento por cada fila.
+    """
+    if isinstance(value, ObjectId):
+        return [value, str(value)]
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return [value, ObjectId(value)]
+    return [value]
+
+async def find_by_ids(collection, ids: Iterable, projection: Projection) -> Dict[str, dict]:
+    """
+    Trae en una sola consulta todos los documentos referenciados por `ids`.
+
+    Devuelve un mapa str(_id) -> documento, de modo que un listado resuelve sus
+    referencias con un $in en vez de un find_one por fila (N+1).
+    """
+    candidates = []
+    seen = set()
+    for value in ids:
+        if value is None:
+            continue
+        for variant in id_variants(value):
+            key = (type(variant), variant)
+            if key not in seen:
+                seen.add(key)
+                candidates.append(variant)
+    if not candidates:
+        return {}
+    docs = await find_list(collection, {"_id": {"$in": candidates}}, projection)
+    return {str(doc["_id"]): doc for doc in docs}
@@ -0,0 +1,161 @@
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from pymongo import monitoring
+
+from config import settings
+from utils.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+# =============== PRESUPUESTO DE CONSULTAS POR PETICIÓN ===============
+# Cada petición HTTP lleva un QueryStats en un contextvar. El CommandListener de
+# pymongo cuenta los comandos y su "forma" (comando + colección + estructura del
+# filtro sin valores). Muchas consultas con la misma forma en una petición son
+# la firma de un N+1 (un find_one dentro de un for).
+#
+# Motor ejecuta pymongo en su executor copiando el contexto (contextvars), así
+# que el listener ve el QueryStats de la petición que originó el comando.
+
+# Comandos de infraestructura que no cuentan para el presupuesto
+IGNORED_COMMANDS = frozenset({
+    "hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart",
+    "saslContinue", "buildInfo", "killCursors",
+})
+
+class QueryStats:
+    """Comandos emitidos por una petición, agrupados por forma"""
+    __slots__ = ("commands", "shapes")
+
+    def __init__(self):
+        self.commands = 0
+        self.shapes = Counter()
+
+    def record(self, shape: str):
+        self.commands += 1
+        self.shapes[shape] += 1
+
+    @property
+    def repeated(self) -> int:
+        """Comandos que repiten una forma ya vista en la misma petición"""
+        return sum(count - 1 for count in self.shapes.values() if count > 1)
+
+    def most_repeated(self):
+        """(forma, veces) de la consulta más repetida, o None"""
+        if not self.shapes:
+            return None
+        return self.shapes.most_common(1)[0]
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("mongo_query_stats", default=None)
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+def _value_shape(value) -> str:
+    """Estructura de un filtro con los valores reemplazados por '?'"""
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{key}:{_value_shape(val)}" for key, val in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        # Listas de operadores ($or, $and, pipelines) conservan su estructura
+        if value and all(isinstance(item, dict) for item in value):
+            return "[" + ",".join(_value_shape(item) for item in value) + "]"
+        return "[?]"
+    return "?"
+
+def command_shape(command_name: str, command) -> str:
+    collection = command.get(command_name)
+    if not isinstance(collection, str):
+        collection = command.get("collection", "-")
+
+    if "filter" in command:
+        body = command["filter"]
+    elif "query" in command:
+        body = command["query"]
+    elif "pipeline" in command:
+        body = command["pipeline"]
+    elif command_name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or []
+        body = statements[0].get("q", {}) if statements else {}
+    else:
+        body = None
+    return f"{command_name} {collection} {_value_shape(body) if body is not None else ''}".rstrip()
+
+class QueryBudgetListener(monitoring.CommandListener):
+    """Cuenta los comandos de Mongo de la petición en curso"""
+
+    def started(self, event):
+        stats = _current_stats.get()
+        if stats is None or event.command_name in IGNORED_COMMANDS:
+            return
+        stats.record(command_shape(event.command_name, event.command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+query_budget_listener = QueryBudgetListener()
+
+# Observadores de peticiones terminadas (lo usa el plugin de pytest)
+_observers: List[Callable[[str, QueryStats], None]] = []
+
+def add_observer(observer: Callable[[str, QueryStats], None]):
+    _observers.append(observer)
+
+def remove_observer(observer: Callable[[str, QueryStats], None]):
+    if observer in _observers:
+        _observers.remove(observer)
+
+class QueryBudgetMiddleware:
+    """
+    Middleware ASGI que abre un QueryStats por petición.
+
+    En modo debug agrega los headers X-Mongo-Queries y X-Mongo-Repeated; siempre
+    registra un warning si la petición supera los umbrales configurados.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_with_budget(message):
+            if message["type"] == "http.response.start" and settings.debug:
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-mongo-queries", str(stats.commands).encode()),
+                    (b"x-mongo-repeated", str(stats.repeated).encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_budget)
+        finally:
+            _current_stats.reset(token)
+            self._report(scope, stats)
+
+    @staticmethod
+    def _report(scope, stats: QueryStats):
+        if not _observers and stats.commands <= settings.query_budget_warn_threshold \
+                and stats.repeated < settings.query_budget_repeat_threshold:
+            return
+
+        route = route_template(scope)
+        for observer in list(_observers):
+            observer(route, stats)
+
+        if stats.commands > settings.query_budget_warn_threshold or stats.repeated >= settings.query_budget_repeat_threshold:
+            shape, times = stats.most_repeated() or ("-", 0)
+            logger.warning(
+                "Presupuesto de consultas excedido en %s %s: %d comandos, %d repetidos (más repetida x%d: %s)",
+                scope["method"], route, stats.commands, stats.repeated, times, shape,
+            )
@@ -0,0 +1,113 @@
+import gzip
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Type
+
+import orjson
+from bson import ObjectId
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from config import settings
+
+try:
+    import zstandard
+except ImportError:  # zstd es opcional: si no está instalado solo se negocia gzip
+    zstandard = None
+
+# =============== RESPUESTAS RÁPIDAS (ORJSON) ===============
+
+def _orjson_default(obj: Any):
+    """Serializa los tipos que orjson no conoce (ObjectId de Mongo y modelos sueltos)"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Convierte 'gzip;q=0.8, zstd' en {'gzip': 0.8, 'zstd': 1.0}"""
+    encodings = {}
+    for item in header.split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[name] = q
+    return encodings
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Elige la mejor codificación soportada por el cliente (zstd > gzip)"""
+    encodings = _parse_accept_encoding(accept_encoding or "")
+    if zstandard is not None and encodings.get("zstd", 0) > 0:
+        return "zstd"
+    if encodings.get("gzip", encodings.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+class FastJSONResponse(Response):
+    """
+    Respuesta JSON serializada con orjson y comprimida (gzip/zstd) si el cuerpo
+    supera settings.response_compression_min_size y el cliente lo acepta.
+    """
+    media_type = "application/json"
+
+    def __init__(self, content: Any, status_code: int = 200, headers: Optional[dict] = None, accept_encoding: str = ""):
+        self._accept_encoding = accept_encoding
+        self._content_encoding = None
+        super().__init__(content, status_code=status_code, headers=headers)
+        self.headers["vary"] = "Accept-Encoding"
+        if self._content_encoding:
+            self.headers["content-encoding"] = self._content_encoding
+
+    def render(self, content: Any) -> bytes:
+        body = orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+        if len(body) < settings.response_compression_min_size:
+            return body
+
+        encoding = negotiate_encoding(self._accept_encoding)
+        if encoding == "zstd":
+            body = zstandard.ZstdCompressor(level=3).compress(body)
+        elif encoding == "gzip":
+            body = gzip.compress(body, compresslevel=5)
+        self._content_encoding = encoding
+        return body
+
+@lru_cache(maxsize=None)
+def _model_defaults(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Valores por defecto de los campos opcionales del modelo (para completar filas)"""
+    return {
+        name: field.get_default()
+        for name, field in model.model_fields.items()
+        if not field.is_required()
+    }
+
+def model_rows(request: Request, rows: List[dict], model: Type[BaseModel], headers: Optional[dict] = None):
+    """
+    Devuelve una lista de filas como respuesta de un endpoint con response_model=List[model].
+
+    Con settings.fast_responses las filas se serializan directamente con orjson:
+    FastAPI no vuelve a validar un objeto Response, y el esquema OpenAPI sigue
+    saliendo del response_model del decorador. Sin la opción se construyen los
+    modelos Pydantic como siempre.
+
+    headers solo se aplica a la respuesta rápida: con la lista de modelos el
+    handler debe ponerlos en el Response inyectado (FastAPI no los combina
+    cuando se devuelve un Response propio).
+    """
+    if settings.fast_responses:
+        defaults = _model_defaults(model)
+        return FastJSONResponse(
+            [{**defaults, **row} for row in rows],
+            headers=headers,
+            accept_encoding=request.headers.get("accept-encoding", "")
+        )
+    return [model(**row) for row in rows]
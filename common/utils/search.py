@@ -0,0 +1,96 @@
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, TEXT
+
+from database import docentes_collection, estudiantes_collection
+from utils.queries import Projection, find_list, find_one
+
+# =============== BÚSQUEDA DE PERSONAS ===============
+# Estudiantes y docentes guardan un campo `busqueda` con claves normalizadas
+# (minúsculas, sin tildes) de su nombre y email:
+#
+#   "María José García", "mjgarcia@blindcheck.edu"
+#   -> ["maria jose garcia", "jose garcia", "garcia", "mjgarcia@blindcheck.edu"]
+#
+# Una búsqueda por prefijo es un regex anclado (^garc) sobre ese arreglo, que
+# Mongo resuelve como un rango del índice multikey: cuesta lo mismo con 1.000
+# que con 100.000 estudiantes. Para frases sueltas hay además un índice de
+# texto sobre nombre y email ($text).
+#
+# Los resultados se ordenan por `nombre_orden` (el nombre normalizado) antes
+# del límite: los índices (nombre_orden, _id, busqueda) entregan las
+# coincidencias ya en orden y la búsqueda se corta en las primeras k. Cuando el
+# prefijo es raro, Mongo puede preferir el rango sobre busqueda y ordenar solo
+# esas coincidencias; en los dos casos son las mismas k, estables entre
+# réplicas (_id desempata nombres repetidos).
+
+SEARCH_FIELD = "busqueda"
+SORT_FIELD = "nombre_orden"
+SORT = [(SORT_FIELD, ASCENDING), ("_id", ASCENDING)]
+MAX_RESULTS = 50
+
+NOMBRE_EMAIL = Projection("nombre", "email")
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin tildes ni diéresis y con los espacios colapsados"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+def search_keys(nombre: str, email: str) -> List[str]:
+    """Claves de búsqueda: el nombre desde cada palabra y el email completo"""
+    words = normalize(nombre).split()
+    keys = [" ".join(words[i:]) for i in range(len(words))]
+    if email:
+        keys.append(normalize(email))
+    return keys
+
+def search_fields(nombre: str, email: str) -> Dict:
+    """Campos a incluir al insertar o actualizar un estudiante/docente"""
+    return {SEARCH_FIELD: search_keys(nombre, email), SORT_FIELD: normalize(nombre)}
+
+async def refresh_search_key(collection, _id):
+    """Recalcula la clave tras una actualización parcial (nombre o email)"""
+    doc = await find_one(collection, {"_id": _id}, NOMBRE_EMAIL)
+    if doc:
+        await collection.update_one({"_id": _id}, {"$set": search_fields(doc["nombre"], doc.get("email", ""))})
+
+async def ensure_search_indexes():
+    """Índices de búsqueda de estudiantes y docentes (idempotente; arranque del admin)"""
+    for collection in (estudiantes_collection, docentes_collection):
+        await collection.create_index([(SEARCH_FIELD, ASCENDING)], name="busqueda")
+        await collection.create_index([("carrera", ASCENDING), (SEARCH_FIELD, ASCENDING)], name="carrera_busqueda")
+        # Mismo filtro recorrido en el orden de los resultados: corta en las primeras k
+        await collection.create_index([*SORT, (SEARCH_FIELD, ASCENDING)], name="orden_busqueda")
+        await collection.create_index(
+            [("carrera", ASCENDING), *SORT, (SEARCH_FIELD, ASCENDING)], name="carrera_orden_busqueda"
+        )
+        # language "none": sin stemming ni stop words, los nombres se comparan tal cual
+        await collection.create_index(
+            [("nombre", TEXT), ("email", TEXT)], name="nombre_email_texto", default_language="none"
+        )
+
+async def search_people(collection, q: str, projection: Projection, *, carrera: Optional[str] = None,
+                        texto: bool = False, k: int = 20, filtro: Optional[Dict] = None) -> List[dict]:
+    """
+    Los primeros k estudiantes/docentes que coinciden con q, ordenados por nombre.
+
+    Por defecto q es un prefijo de cualquier palabra del nombre o del email
+    ("garc", "jose g", "est0001"); con texto=True se usa el índice de texto y
+    los resultados vienen por relevancia.
+    """
+    k = max(1, min(k, MAX_RESULTS))
+    consulta = dict(filtro or {})
+    if carrera:
+        consulta["carrera"] = carrera
+
+    if texto and q.strip():
+        consulta["$text"] = {"$search": q}
+        cursor = collection.find(consulta, {**projection.spec, "score": {"$meta": "textScore"}})
+        docs = await cursor.sort([("score", {"$meta": "textScore"})]).limit(k).to_list(length=k)
+        return [projection.wrap(doc) for doc in docs]
+
+    consulta[SEARCH_FIELD] = {"$regex": "^" + re.escape(normalize(q))}
+    return await find_list(collection, consulta, projection, sort=SORT, limit=k, length=k)
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+from config import settings
+from database import staging_collection
+from utils.queries import Projection, find_list, find_one
+from utils.storage import TEMP, get_storage, storage_key
+
+logger = logging.getLogger(__name__)
+
+# =============== SUBIDAS TEMPORALES (STAGING) ===============
+# upload-temp guarda los bytes en el almacenamiento compartido (utils/storage.py)
+# bajo temp/ y registra la subida en evidencias_staging:
+#
+#   {_id: temp_id, docente_id, clave: "temp/<temp_id>.jpg", temp_filename,
+#    content_type, estudiante_id, materia_id, grupo, aporte, creada, expira}
+#
+# Cualquier réplica del teacher service puede servir la previsualización o
+# terminar el recorte. El registro se inserta ANTES de escribir los bytes, así
+# que todo archivo temporal tiene un registro que lo va a limpiar.
+#
+# Las subidas reanudables (sesiones) viven en la misma colección con
+# tipo="sesion": cada bloque recibido es un archivo temp/<id>.<offset>-<n>.chunk
+# y el registro lleva el offset confirmado y la lista de bloques (ver
+# SESIONES más abajo).
+#
+# Al vencer (settings.staging_ttl_seconds) el barrido periódico borra los bytes
+# y el registro. El índice TTL sobre expira es la red de seguridad para
+# registros que el barrido no alcanzó: los borra TTL_GRACE_SECONDS después de
+# vencer, bastante más tarde que el próximo barrido, para no dejar bytes
+# huérfanos.
+
+TTL_INDEX = "expira_ttl"
+TTL_GRACE_SECONDS = 86400
+SWEEP_BATCH = 500
+
+STAGING_CLAVES = Projection("clave", "partes.clave")
+STAGING = Projection("docente_id", "clave", "temp_filename", "content_type", "expira")
+SESION = Projection(
+    "docente_id", "clave", "temp_filename", "content_type", "tamano", "offset", "partes", "estado",
+    "resultado", "estudiante_id", "materia_id", "grupo", "aporte", "descripcion", "crop_area", "expira",
+    "procesando_hasta"
+)
+
+async def ensure_staging_indexes():
+    """Índices de evidencias_staging (idempotente; arranque del teacher service)"""
+    await staging_collection.create_index(
+        [("expira", ASCENDING)], name=TTL_INDEX, expireAfterSeconds=TTL_GRACE_SECONDS
+    )
+    await staging_collection.create_index([("docente_id", ASCENDING)], name="docente_id")
+
+async def create_staging(temp_id: str, temp_filename: str, docente_id: str, content_type: str,
+                         chunks, **metadata) -> Dict:
+    """Registra la subida temporal y guarda sus bytes; devuelve el registro"""
+    ahora = datetime.utcnow()
+    doc = {
+        "_id": temp_id,
+        "docente_id": docente_id,
+        "clave": storage_key(TEMP, temp_filename),
+        "temp_filename": temp_filename,
+        "content_type": content_type,
+        **metadata,
+        "creada": ahora,
+        "expira": ahora + timedelta(seconds=settings.staging_ttl_seconds),
+    }
+    await staging_collection.insert_one(doc)
+    try:
+        await get_storage().put_stream(doc["clave"], chunks, content_type)
+    except BaseException:
+        await discard_staging(doc)
+        raise
+    return doc
+
+async def get_staging(temp_id: str, docente_id: str) -> Optional[Dict]:
+    """Subida temporal vigente del docente; None si no existe, es de otro docente o ya venció"""
+    return await find_one(staging_collection, {
+        "_id": temp_id,
+        "tipo": {"$exists": False},
+        "docente_id": docente_id,
+        # El TTL de Mongo borra con atraso: lo vencido se descarta aquí
+        "expira": {"$gt": datetime.utcnow()},
+    }, STAGING)
+
+def staging_keys(doc: Dict) -> List[str]:
+    """Claves de almacenamiento de un registro: el archivo temporal o los bloques de una sesión"""
+    claves = [doc["clave"]] if doc.get("clave") else []
+    return claves + [parte["clave"] for parte in doc.get("partes") or []]
+
+async def discard_staging(doc: Dict):
+    """Borra los bytes y el registro (recorte terminado, error o vencimiento)"""
+    storage = get_storage()
+    for clave in staging_keys(doc):
+        await storage.delete(clave)
+    await staging_collection.delete_one({"_id": doc["_id"]})
+
+async def sweep_expired() -> int:
+    """Limpia las subidas temporales vencidas; devuelve cuántas borró"""
+    total = 0
+    while True:
+        vencidas = await find_list(
+            staging_collection, {"expira": {"$lte": datetime.utcnow()}}, STAGING_CLAVES,
+            limit=SWEEP_BATCH, length=SWEEP_BATCH,
+        )
+        for doc in vencidas:
+            # Si otra réplica barre a la vez, los dos borrados son idempotentes
+            await discard_staging(doc)
+        total += len(vencidas)
+        if len(vencidas) < SWEEP_BATCH:
+            return total
+
+async def run_staging_sweeper():
+    """Tarea de fondo: barre las subidas vencidas cada settings.staging_sweep_interval_seconds"""
+    if settings.staging_sweep_interval_seconds <= 0:
+        return
+    while True:
+        try:
+            borradas = await sweep_expired()
+            if borradas:
+                logger.info("Subidas temporales vencidas eliminadas", extra={"cantidad": borradas})
+        except Exception:
+            logger.exception("Error al barrer subidas temporales")
+        await asyncio.sleep(settings.staging_sweep_interval_seconds)
+
+# =============== SESIONES (SUBIDAS REANUABLES) ===============
+# Protocolo: crear sesión (tamaño total) -> PUT de bloques con su offset ->
+# consultar el offset confirmado tras un corte -> finalizar. Un bloque se
+# confirma con un update condicionado al offset esperado, así que un reintento
+# duplicado o fuera de orden no corrompe el archivo: recibe ChunkConflict con
+# el offset real y el cliente reenvía solo lo que falta.
+#
+# Estados: subiendo -> procesando (finalizar en curso) -> finalizada. La sesión
+# finalizada conserva el resultado hasta vencer para que un reintento de
+# finalizar (respuesta perdida) devuelva la misma evidencia. Si finalizar falla
+# por algo transitorio la sesión vuelve a subiendo con sus bloques; si el
+# proceso muere a mitad, otro intento la retoma cuando vence FINALIZE_LEASE_SECONDS.
+# El procesando_hasta que fijó begin_finalize identifica a quien tiene el
+# plazo: reopen_session y complete_session se condicionan a él (como
+# append_chunk al offset que leyó), así que un finalizar que se pasó del plazo
+# no pisa al que lo retomó.
+
+FINALIZE_LEASE_SECONDS = 300
+
+class ChunkConflict(Exception):
+    """El bloque no empieza en el offset confirmado de la sesión"""
+
+    def __init__(self, offset: Optional[int]):
+        super().__init__(f"Offset incorrecto: se esperaba {offset}")
+        self.offset = offset
+
+def _session_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=settings.upload_session_ttl_seconds)
+
+async def create_session(sesion_id: str, temp_filename: str, docente_id: str, content_type: str,
+                         tamano: int, **metadata) -> Dict:
+    doc = {
+        "_id": sesion_id,
+        "tipo": "sesion",
+        "docente_id": docente_id,
+        "temp_filename": temp_filename,
+        "content_type": content_type,
+        "tamano": tamano,
+        "offset": 0,
+        "partes": [],
+        "estado": "subiendo",
+        **metadata,
+        "creada": datetime.utcnow(),
+        "expira": _session_expiry(),
+    }
+    await staging_collection.insert_one(doc)
+    return doc
+
+async def get_session(sesion_id: str, docente_id: str) -> Optional[Dict]:
+    """Sesión vigente del docente; None si no existe, es de otro docente o ya venció"""
+    return await find_one(staging_collection, {
+        "_id": sesion_id,
+        "tipo": "sesion",
+        "docente_id": docente_id,
+        "expira": {"$gt": datetime.utcnow()},
+    }, SESION)
+
+async def append_chunk(sesion: Dict, offset: int, length: int, chunks) -> int:
+    """
+    Guarda un bloque de length bytes que empieza en offset; devuelve el nuevo
+    offset confirmado. ChunkConflict si offset no es el confirmado, ValueError
+    si el bloque se pasa del tamaño declarado o llega incompleto.
+    """
+    if sesion["estado"] != "subiendo" or offset != sesion["offset"]:
+        raise ChunkConflict(sesion["offset"])
+    if length <= 0 or offset + length > sesion["tamano"]:
+        raise ValueError("El bloque excede el tamaño declarado")
+
+    # La clave incluye offset y largo: dos envíos del mismo bloque escriben el mismo archivo
+    storage = get_storage()
+    clave = storage_key(TEMP, f"{sesion['_id']}.{offset:012d}-{length}.chunk")
+    escritos = await storage.put_stream(clave, chunks)
+    if escritos != length:
+        await storage.delete(clave)
+        raise ValueError(f"Bloque incompleto: {escritos} de {length} bytes")
+
+    result = await staging_collection.update_one(
+        {"_id": sesion["_id"], "estado": "subiendo", "offset": offset},
+        {
+            "$inc": {"offset": length},
+            "$push": {"partes": {"offset": offset, "tamano": length, "clave": clave}},
+            "$set": {"expira": _session_expiry()},
+        },
+    )
+    if result.modified_count == 0:
+        # Otro envío confirmó primero: el archivo solo se borra si no es el confirmado
+        actual = await get_session(sesion["_id"], sesion["docente_id"])
+        if not actual or clave not in staging_keys(actual):
+            await storage.delete(clave)
+        raise ChunkConflict(actual["offset"] if actual else None)
+    return offset + length
+
+async def begin_finalize(sesion_id: str, docente_id: str) -> Optional[Dict]:
+    """Pasa la sesión completa a 'procesando'; None si falta recibir bytes o ya se está finalizando"""
+    ahora = datetime.utcnow()
+    doc = await staging_collection.find_one_and_update(
+        {
+            "_id": sesion_id, "tipo": "sesion", "docente_id": docente_id,
+            # Un 'procesando' con el plazo vencido es un finalizar que murió a mitad
+            "$or": [{"estado": "subiendo"}, {"estado": "procesando", "procesando_hasta": {"$lte": ahora}}],
+            "expira": {"$gt": ahora},
+            "$expr": {"$eq": ["$offset", "$tamano"]},
+        },
+        {"$set": {
+            "estado": "procesando",
+            "procesando_hasta": ahora + timedelta(seconds=FINALIZE_LEASE_SECONDS),
+            "expira": _session_expiry(),
+        }},
+        projection=SESION.spec,
+        return_document=ReturnDocument.AFTER,
+    )
+    return SESION.wrap(doc)
+
+def _lease_filter(sesion: Dict) -> Dict:
+    """Filtro de la sesión mientras siga en manos del finalizar que la obtuvo de begin_finalize"""
+    return {"_id": sesion["_id"], "estado": "procesando", "procesando_hasta": sesion["procesando_hasta"]}
+
+async def reopen_session(sesion: Dict) -> bool:
+    """
+    Devuelve a 'subiendo' una sesión cuyo finalizar falló por algo transitorio
+    (conserva los bloques); False si otro finalizar ya la retomó.
+    """
+    result = await staging_collection.update_one(
+        _lease_filter(sesion),
+        {"$set": {"estado": "subiendo", "expira": _session_expiry()}, "$unset": {"procesando_hasta": ""}},
+    )
+    return result.modified_count > 0
+
+async def open_session_file(sesion: Dict, max_memory: int = 8 * 1024 * 1024):
+    """Archivo temporal (en memoria hasta max_memory) con los bloques de la sesión en orden"""
+    storage = get_storage()
+    archivo = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    try:
+        for parte in sorted(sesion["partes"], key=lambda parte: parte["offset"]):
+            async for chunk in storage.stream(parte["clave"]):
+                archivo.write(chunk)
+    except BaseException:
+        archivo.close()
+        raise
+    archivo.seek(0)
+    return archivo
+
+async def complete_session(sesion: Dict, resultado: Dict) -> bool:
+    """
+    Guarda el resultado para responder reintentos de finalizar y borra los
+    bloques; False (sin tocar los bloques) si otro finalizar ya la retomó.
+    """
+    result = await staging_collection.update_one(
+        _lease_filter(sesion),
+        {"$set": {"estado": "finalizada", "resultado": resultado},
+         "$unset": {"partes": "", "procesando_hasta": ""}},
+    )
+    if result.modified_count == 0:
+        return False
+    storage = get_storage()
+    for parte in sesion["partes"]:
+        await storage.delete(parte["clave"])
+    return True
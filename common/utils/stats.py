@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from pymongo import UpdateOne
+
+from config import settings
+from database import estadisticas_collection, solicitudes_collection
+
+logger = logging.getLogger(__name__)
+
+# =============== ESTADÍSTICAS DE SOLICITUDES ===============
+# Agregados mantenidos de forma incremental en la colección estadisticas:
+#
+#   {"_id": "global", "estados": {"pendiente": 12, ...}, "total": 40,
+#    "resolucion": {"count": 25, "segundos": 1.2e6}}
+#   {"_id": "materia:<id>", "tipo": "materia", "materia_id": "<id>", ...}
+#
+# Cada cambio de estado hace un $inc sobre el documento global y el de la
+# materia, así el dashboard lee un par de documentos sin importar cuántas
+# solicitudes existan. reconcile() recalcula todo desde solicitudes con $merge
+# y corrige cualquier deriva (un $inc perdido por un corte entre escrituras).
+
+# Estados en los que la solicitud se considera resuelta (cuentan para el tiempo de resolución)
+FINALES = ("calificada", "rechazada")
+GLOBAL_ID = "global"
+
+def _estado(value) -> Optional[str]:
+    # EstadoSolicitud es un str Enum: se normaliza al valor guardado
+    return getattr(value, "value", value)
+
+async def record_transition(materia_id, anterior: Optional[str], nuevo: str,
+                            fecha_creacion: Optional[datetime] = None, fecha: Optional[datetime] = None):
+    """
+    Registra el paso de una solicitud de `anterior` a `nuevo` (anterior=None al crearla).
+
+    Nunca falla la petición: un error se registra y lo corrige la siguiente
+    reconciliación.
+    """
+    anterior, nuevo = _estado(anterior), _estado(nuevo)
+    if anterior == nuevo:
+        return
+    inc: Dict[str, float] = {f"estados.{nuevo}": 1}
+    if anterior is None:
+        inc["total"] = 1
+    else:
+        inc[f"estados.{anterior}"] = -1
+    if nuevo in FINALES and anterior not in FINALES and fecha_creacion is not None:
+        inc["resolucion.count"] = 1
+        inc["resolucion.segundos"] = ((fecha or datetime.utcnow()) - fecha_creacion).total_seconds()
+
+    materia_id = str(materia_id)
+    try:
+        await estadisticas_collection.bulk_write([
+            UpdateOne({"_id": GLOBAL_ID}, {"$inc": inc}, upsert=True),
+            UpdateOne(
+                {"_id": f"materia:{materia_id}"},
+                {"$inc": inc, "$setOnInsert": {"tipo": "materia", "materia_id": materia_id}},
+                upsert=True,
+            ),
+        ], ordered=False)
+    except Exception:
+        logger.exception("Error al actualizar estadísticas", extra={"materia_id": materia_id, "estado": nuevo})
+
+# =============== RECONCILIACIÓN ===============
+
+def _pipeline(clave, doc_id, extra: Dict, corrida: str):
+    """Agrega solicitudes por `clave` y reemplaza los documentos de estadisticas"""
+    resuelta = {"$in": ["$estado", list(FINALES)]}
+    return [
+        {"$group": {
+            "_id": {"k": clave, "estado": "$estado"},
+            "n": {"$sum": 1},
+            "res_n": {"$sum": {"$cond": [resuelta, 1, 0]}},
+            "res_ms": {"$sum": {"$cond": [
+                resuelta, {"$subtract": ["$fecha_actualizacion", "$fecha_creacion"]}, 0
+            ]}},
+        }},
+        {"$group": {
+            "_id": "$_id.k",
+            "estados": {"$push": {"k": "$_id.estado", "v": "$n"}},
+            "total": {"$sum": "$n"},
+            "res_n": {"$sum": "$res_n"},
+            "res_ms": {"$sum": "$res_ms"},
+        }},
+        {"$project": {
+            "_id": doc_id,
+            **extra,
+            "estados": {"$arrayToObject": "$estados"},
+            "total": 1,
+            "resolucion": {"count": "$res_n", "segundos": {"$divide": ["$res_ms", 1000]}},
+            "corrida": corrida,
+            "reconciliado": "$$NOW",
+        }},
+        {"$merge": {
+            "into": estadisticas_collection.name, "on": "_id",
+            "whenMatched": "replace", "whenNotMatched": "insert",
+        }},
+    ]
+
+async def reconcile():
+    """
+    Recalcula las estadísticas desde cero (global y por materia).
+
+    Los $inc que lleguen mientras corre pueden quedar pisados por el reemplazo;
+    la deriva es de a lo sumo esas transiciones y desaparece en la siguiente
+    corrida.
+    """
+    corrida = uuid.uuid4().hex
+    materia = {"$toString": "$materia_id"}
+    await solicitudes_collection.aggregate(_pipeline(
+        materia, {"$concat": ["materia:", "$_id"]}, {"tipo": {"$literal": "materia"}, "materia_id": "$_id"}, corrida
+    )).to_list(None)
+    await solicitudes_collection.aggregate(_pipeline(
+        {"$literal": GLOBAL_ID}, "$_id", {}, corrida
+    )).to_list(None)
+    # Materias que ya no tienen solicitudes (o global si la colección quedó vacía)
+    await estadisticas_collection.delete_many({"corrida": {"$ne": corrida}})
+    logger.info("Estadísticas reconciliadas")
+
+async def run_reconciler():
+    """Tarea de fondo: reconcilia al arrancar y luego cada settings.stats_reconcile_interval_seconds"""
+    if settings.stats_reconcile_interval_seconds <= 0:
+        return
+    while True:
+        try:
+            await reconcile()
+        except Exception:
+            logger.exception("Error al reconciliar estadísticas")
+        await asyncio.sleep(settings.stats_reconcile_interval_seconds)
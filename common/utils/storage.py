@@ -0,0 +1,392 @@
+import asyncio
+import mimetypes
+import os
+import uuid
+from pathlib import Path, PurePosixPath
+from typing import AsyncIterator, Optional
+
+from config import settings
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+    from botocore.exceptions import ClientError
+except ImportError:  # aiobotocore es opcional: solo lo necesita STORAGE_BACKEND=s3
+    get_session = None
+
+# =============== ALMACENAMIENTO DE EVIDENCIAS ===============
+# Los archivos se identifican por una clave lógica "<prefijo>/<nombre>":
+#
+#   evidencias/3f9a0c1b2d4e5f60.jpg   (evidencia final, nombre hasheado)
+#   temp/9c1d2e3f4a5b6c7d.png         (subida temporal para el recorte)
+#
+# En la base se guarda archivo_url = "/uploads/<clave>", independiente de dónde
+# vivan los bytes. Cada driver traduce la clave:
+#
+#   LocalStorage: <root>/<prefijo>/<ab>/<cd>/<nombre> con fanout=2 niveles
+#                 (fanout=0: directorio plano, el layout histórico). Las
+#                 lecturas prueban también el layout plano, así que los
+#                 archivos viejos se leen mientras tools/migrate_fanout.py
+#                 los mueve
+#   S3Storage:    s3://<bucket>/<s3_prefix><clave>; tests/test_storage.py lo
+#                 prueba contra un servidor moto
+#
+# get_storage() devuelve el driver de settings.storage_backend. Todas las
+# operaciones son async; el driver local hace la E/S en un hilo para no
+# bloquear el event loop.
+
+URL_PREFIX = "/uploads/"
+EVIDENCIAS = "evidencias"
+TEMP = "temp"
+
+CHUNK_SIZE = 1024 * 1024
+# S3 exige partes de al menos 5 MiB (salvo la última)
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+def storage_key(prefix: str, name: str) -> str:
+    """Clave de un archivo; ValueError si el nombre no es un nombre de archivo simple"""
+    if not name or "/" in name or "\\" in name or name in (".", ".."):
+        raise ValueError(f"Nombre de archivo inválido: {name!r}")
+    return f"{prefix}/{name}"
+
+def key_to_url(key: str) -> str:
+    """Clave -> archivo_url que se guarda en la base"""
+    return URL_PREFIX + key
+
+def url_to_key(archivo_url: Optional[str]) -> str:
+    """'/uploads/evidencias/x.jpg' -> 'evidencias/x.jpg'; ValueError si no apunta dentro de uploads/"""
+    if not archivo_url or not archivo_url.startswith(URL_PREFIX):
+        raise ValueError(f"URL fuera de uploads: {archivo_url!r}")
+    relative = PurePosixPath(archivo_url[len(URL_PREFIX):])
+    if relative.is_absolute() or ".." in relative.parts or not relative.parts:
+        raise ValueError(f"URL fuera de uploads: {archivo_url!r}")
+    return str(relative)
+
+def guess_content_type(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+def fanout_name(name: str, levels: int) -> str:
+    """'3f9a0c1b.jpg' -> '3f/9a/3f9a0c1b.jpg' con levels=2"""
+    return "/".join([name[2 * i:2 * i + 2] for i in range(levels)] + [name])
+
+async def iter_file(fileobj, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Lee por bloques un archivo con read() async (ej. UploadFile de FastAPI)"""
+    while True:
+        chunk = await fileobj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+async def _single(data: bytes) -> AsyncIterator[bytes]:
+    yield data
+
+class Storage:
+    """Interfaz común de los drivers"""
+
+    async def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> int:
+        return await self.put_stream(key, _single(data), content_type)
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes],
+                         content_type: Optional[str] = None) -> int:
+        """Guarda el archivo a partir de sus bloques; devuelve los bytes escritos"""
+        raise NotImplementedError
+
+    async def get(self, key: str) -> bytes:
+        """Contenido completo; FileNotFoundError si no existe"""
+        raise NotImplementedError
+
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Contenido por bloques; FileNotFoundError si no existe"""
+        raise NotImplementedError
+
+    async def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def size(self, key: str) -> int:
+        """Tamaño en bytes; FileNotFoundError si no existe"""
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        """Borra el archivo (no falla si no existe)"""
+        raise NotImplementedError
+
+    async def presign(self, key: str, *, expires: int, filename: Optional[str] = None,
+                      content_type: Optional[str] = None, cache_control: Optional[str] = None) -> Optional[str]:
+        """URL firmada de descarga directa; None si el driver no las soporta"""
+        return None
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Ruta en disco del archivo; None si el driver no es local"""
+        return None
+
+    async def close(self):
+        pass
+
+# =============== DRIVER LOCAL ===============
+
+class LocalStorage(Storage):
+    def __init__(self, root: str, fanout: int = 0):
+        self.root = Path(root)
+        self.fanout = fanout
+
+    def relative_path(self, key: str, fanout: Optional[int] = None) -> str:
+        """Clave -> ruta relativa a root con el fan-out por prefijo del hash"""
+        prefix, _, name = key.rpartition("/")
+        name = fanout_name(name, self.fanout if fanout is None else fanout)
+        return f"{prefix}/{name}" if prefix else name
+
+    def write_path(self, key: str) -> Path:
+        """Dónde se escribe un archivo nuevo (layout actual)"""
+        return self.root / self.relative_path(key)
+
+    def local_path(self, key: str) -> Path:
+        """Dónde está el archivo: layout actual o plano (aún sin migrar)"""
+        current = self.write_path(key)
+        if self.fanout == 0 or current.is_file():
+            return current
+        flat = self.root / self.relative_path(key, fanout=0)
+        if flat.is_file():
+            return flat
+        # La migración pudo moverlo entre las dos comprobaciones
+        return current
+
+    async def put_stream(self, key, chunks, content_type=None):
+        path = self.write_path(key)
+        await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.part")
+        size = 0
+        fh = await asyncio.to_thread(open, tmp, "wb")
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(fh.write, chunk)
+                size += len(chunk)
+            fh.close()
+            # El archivo aparece completo o no aparece
+            await asyncio.to_thread(os.replace, tmp, path)
+        except BaseException:
+            fh.close()
+            tmp.unlink(missing_ok=True)
+            raise
+        return size
+
+    async def get(self, key):
+        path = await asyncio.to_thread(self.local_path, key)
+        return await asyncio.to_thread(path.read_bytes)
+
+    async def stream(self, key, chunk_size=CHUNK_SIZE):
+        path = await asyncio.to_thread(self.local_path, key)
+        fh = await asyncio.to_thread(open, path, "rb")
+        try:
+            while chunk := await asyncio.to_thread(fh.read, chunk_size):
+                yield chunk
+        finally:
+            fh.close()
+
+    async def exists(self, key):
+        path = await asyncio.to_thread(self.local_path, key)
+        return await asyncio.to_thread(path.is_file)
+
+    async def size(self, key):
+        path = await asyncio.to_thread(self.local_path, key)
+        stat = await asyncio.to_thread(path.stat)
+        return stat.st_size
+
+    async def delete(self, key):
+        path = await asyncio.to_thread(self.local_path, key)
+        await asyncio.to_thread(path.unlink, missing_ok=True)
+
+# =============== DRIVER S3 ===============
+
+class S3Storage(Storage):
+    """
+    Driver para S3 o cualquier servicio compatible (MinIO, moto en modo servidor).
+    Los archivos de más de multipart_threshold bytes se suben con multipart
+    upload en partes de part_size, sin tener el archivo entero en memoria.
+    """
+
+    def __init__(self, bucket: str, *, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, access_key_id: Optional[str] = None,
+                 secret_access_key: Optional[str] = None, multipart_threshold: int = 8 * 1024 * 1024,
+                 part_size: int = 8 * 1024 * 1024, presign_endpoint_url: Optional[str] = None):
+        if get_session is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requiere aiobotocore (pip install aiobotocore)")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.multipart_threshold = max(multipart_threshold, S3_MIN_PART_SIZE)
+        self.part_size = max(part_size, S3_MIN_PART_SIZE)
+        self._client_args = {
+            "region_name": region,
+            "endpoint_url": endpoint_url,
+            "aws_access_key_id": access_key_id,
+            "aws_secret_access_key": secret_access_key,
+            # MinIO y moto no resuelven buckets como subdominio
+            "config": AioConfig(s3={"addressing_style": "path" if endpoint_url else "auto"}),
+        }
+        # La firma incluye el host: si los servicios llegan al bucket por una
+        # dirección interna (http://minio:9000), las URLs para el navegador se
+        # firman con la pública en un cliente aparte
+        self._presign_endpoint_url = presign_endpoint_url
+        self._clients = {}
+        self._lock = asyncio.Lock()
+
+    async def _get_client(self, presign: bool = False):
+        name = "presign" if presign and self._presign_endpoint_url else "default"
+        if name not in self._clients:
+            async with self._lock:
+                if name not in self._clients:
+                    args = dict(self._client_args)
+                    if name == "presign":
+                        args["endpoint_url"] = self._presign_endpoint_url
+                    client_cm = get_session().create_client("s3", **args)
+                    self._clients[name] = (client_cm, await client_cm.__aenter__())
+        return self._clients[name][1]
+
+    def _object_key(self, key: str) -> str:
+        return self.prefix + key
+
+    @staticmethod
+    def _is_missing(error: "ClientError") -> bool:
+        return error.response.get("Error", {}).get("Code") in ("NoSuchKey", "404", "NotFound")
+
+    async def put_stream(self, key, chunks, content_type=None):
+        client = await self._get_client()
+        object_key = self._object_key(key)
+        content_type = content_type or guess_content_type(key)
+        buffer = bytearray()
+        size = 0
+        upload_id = None
+        parts = []
+
+        async def upload_part(data: bytes):
+            result = await client.upload_part(
+                Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                PartNumber=len(parts) + 1, Body=data,
+            )
+            parts.append({"PartNumber": len(parts) + 1, "ETag": result["ETag"]})
+
+        try:
+            async for chunk in chunks:
+                buffer += chunk
+                size += len(chunk)
+                if upload_id is None and len(buffer) < self.multipart_threshold:
+                    continue
+                if upload_id is None:
+                    created = await client.create_multipart_upload(
+                        Bucket=self.bucket, Key=object_key, ContentType=content_type
+                    )
+                    upload_id = created["UploadId"]
+                while len(buffer) >= self.part_size:
+                    await upload_part(bytes(buffer[:self.part_size]))
+                    del buffer[:self.part_size]
+
+            if upload_id is None:
+                await client.put_object(
+                    Bucket=self.bucket, Key=object_key, Body=bytes(buffer), ContentType=content_type
+                )
+                return size
+            if buffer:
+                await upload_part(bytes(buffer))
+            await client.complete_multipart_upload(
+                Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            if upload_id is not None:
+                # Sin abort las partes subidas quedan cobrándose en el bucket
+                await client.abort_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id)
+            raise
+        return size
+
+    async def _get_object(self, key: str):
+        client = await self._get_client()
+        try:
+            return await client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as error:
+            if self._is_missing(error):
+                raise FileNotFoundError(key) from error
+            raise
+
+    async def get(self, key):
+        result = await self._get_object(key)
+        async with result["Body"] as body:
+            return await body.read()
+
+    async def stream(self, key, chunk_size=CHUNK_SIZE):
+        result = await self._get_object(key)
+        async with result["Body"] as body:
+            while chunk := await body.read(chunk_size):
+                yield chunk
+
+    async def exists(self, key):
+        client = await self._get_client()
+        try:
+            await client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as error:
+            if self._is_missing(error):
+                return False
+            raise
+        return True
+
+    async def size(self, key):
+        client = await self._get_client()
+        try:
+            head = await client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as error:
+            if self._is_missing(error):
+                raise FileNotFoundError(key) from error
+            raise
+        return head["ContentLength"]
+
+    async def delete(self, key):
+        client = await self._get_client()
+        await client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    async def presign(self, key, *, expires, filename=None, content_type=None, cache_control=None):
+        client = await self._get_client(presign=True)
+        params = {"Bucket": self.bucket, "Key": self._object_key(key)}
+        if content_type:
+            params["ResponseContentType"] = content_type
+        if filename:
+            params["ResponseContentDisposition"] = f"inline; filename=\"{filename}\""
+        if cache_control:
+            params["ResponseCacheControl"] = cache_control
+        return await client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires)
+
+    async def close(self):
+        clients, self._clients = self._clients, {}
+        for client_cm, _ in clients.values():
+            await client_cm.__aexit__(None, None, None)
+
+# =============== DRIVER CONFIGURADO ===============
+
+_storage: Optional[Storage] = None
+
+def build_storage() -> Storage:
+    if settings.storage_backend == "local":
+        return LocalStorage(settings.storage_local_root, fanout=settings.storage_local_fanout)
+    if settings.storage_backend == "s3":
+        return S3Storage(
+            settings.s3_bucket,
+            prefix=settings.s3_prefix,
+            endpoint_url=settings.s3_endpoint_url,
+            region=settings.s3_region,
+            access_key_id=settings.s3_access_key_id,
+            secret_access_key=settings.s3_secret_access_key,
+            multipart_threshold=settings.s3_multipart_threshold_bytes,
+            part_size=settings.s3_multipart_part_bytes,
+            presign_endpoint_url=settings.s3_presign_endpoint_url,
+        )
+    raise ValueError(f"STORAGE_BACKEND desconocido: {settings.storage_backend!r}")
+
+def get_storage() -> Storage:
+    global _storage
+    if _storage is None:
+        _storage = build_storage()
+    return _storage
+
+async def close_storage():
+    """Cierra las conexiones del driver (apagado del servicio)"""
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
@@ -1,7 +1,7 @@
 import React, { useState, useRef, useEffect } from 'react';
 import './ImagePixelator.css';
 
-const ImagePixelator = ({ imageUrl, onAreaSelected }) => {
+const ImagePixelator = ({ imageUrl, onAreaSelected, initialArea }) => {
   const canvasRef = useRef(null);
   const [isDrawing, setIsDrawing] = useState(false);
   const [startPos, setStartPos] = useState({ x: 0, y: 0 });
@@ -29,6 +29,21 @@ const ImagePixelator = ({ imageUrl, onAreaSelected }) => {
         canvas.height = img.height;
         ctx.drawImage(img, 0, 0);
         setImageLoaded(true);
+
+        // Área propuesta por el servidor: se muestra marcada y el docente la confirma o la redibuja
+        if (initialArea) {
+          const area = {
+            x: initialArea.x,
+            y: initialArea.y,
+            width: initialArea.width,
+            height: initialArea.height
+          };
+          drawSelection({ x: area.x, y: area.y }, { x: area.x + area.width, y: area.y + area.height });
+          setSelection(area);
+          if (onAreaSelected) {
+            onAreaSelected(area);
+          }
+        }
       };
       
       img.src = imageUrl;
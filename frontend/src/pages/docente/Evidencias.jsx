@@ -11,6 +11,7 @@ const Evidencias = () => {
   const [evidencias, setEvidencias] = useState([]);
   const [materias, setMaterias] = useState([]);
   const [estudiantes, setEstudiantes] = useState([]);
+  const [busquedaEstudiante, setBusquedaEstudiante] = useState('');
   const [loading, setLoading] = useState(true);
 
   const [showModal, setShowModal] = useState(false);
@@ -41,16 +42,27 @@ const Evidencias = () => {
     cargarDatos();
   }, []);
 
+  // El selector consulta al backend mientras se escribe (top 20 por prefijo de nombre o email)
+  useEffect(() => {
+    const timer = setTimeout(async () => {
+      try {
+        const res = await api.get('/docente/estudiantes/buscar', { params: { q: busquedaEstudiante, k: 20 } });
+        setEstudiantes(res.data);
+      } catch (error) {
+        console.error('Error al buscar estudiantes:', error);
+      }
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [busquedaEstudiante]);
+
   const cargarDatos = async () => {
     try {
-      const [evidenciasRes, materiasRes, estudiantesRes] = await Promise.all([
+      const [evidenciasRes, materiasRes] = await Promise.all([
         api.get('/docente/evidencias'),
-        api.get('/docente/materias'),
-        api.get('/docente/estudiantes')
+        api.get('/docente/materias')
       ]);
       setEvidencias(evidenciasRes.data);
       setMaterias(materiasRes.data);
-      setEstudiantes(estudiantesRes.data);
     } catch (error) {
       console.error('Error al cargar datos:', error);
       setAlert({ show: true, type: 'error', title: 'Error', message: 'Error al cargar evidencias' });
@@ -336,6 +348,12 @@ const Evidencias = () => {
                 <form onSubmit={handleUploadTemp}>
                   <div className="form-group">
                     <label>Estudiante *</label>
+                    <input
+                      type="text"
+                      placeholder="Buscar por nombre o email"
+                      value={busquedaEstudiante}
+                      onChange={(e) => setBusquedaEstudiante(e.target.value)}
+                    />
                     <select name="estudiante_id" value={formData.estudiante_id} onChange={handleChange} required>
                       <option value="">Selecciona el estudiante</option>
                       {estudiantes.map((est) => (
@@ -410,6 +428,7 @@ const Evidencias = () => {
                   <ImagePixelator
                     imageUrl={buildFileUrl(tempData.preview_url)}
                     onAreaSelected={handleAreaSelected}
+                    initialArea={tempData.crop_propuesto}
                   />
 
                   <div className="modal-actions" style={{
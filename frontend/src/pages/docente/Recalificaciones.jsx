@@ -42,13 +42,8 @@ const Recalificaciones = () => {
     try {
       const response = await api.get(`/docente/recalificaciones/${solicitud.id}/evidencia`);
       if (response.data && response.data.archivo_url) {
-        let archivoUrl = response.data.archivo_url;
-
-        // CORRECCIÓN: Asegurar que la URL empiece con /uploads si no lo tiene
-        // Esto corrige el error 404 GET /evidencias/...
-        if (archivoUrl.startsWith('/evidencias/')) {
-          archivoUrl = `/uploads${archivoUrl}`;
-        }
+        // Endpoint autorizado (/api/docente/evidencias/{id}/archivo); la cookie de sesión viaja con la navegación
+        const archivoUrl = response.data.archivo_url;
 
         const backendBase = import.meta.env.VITE_BACKEND_URL || '/api';
         // Si backendBase es solo /api, lo eliminamos para dejar el path absoluto
@@ -5,9 +5,8 @@ import Layout from '../../components/Layout';
 import api from '../../services/api';
 
 const SubdecanoDashboard = () => {
-  const [solicitudes, setSolicitudes] = useState([]);
-  const [docentes, setDocentes] = useState([]);
-  const [estudiantes, setEstudiantes] = useState([]);
+  const [pendientes, setPendientes] = useState([]);
+  const [estadisticas, setEstadisticas] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -16,15 +15,14 @@ const SubdecanoDashboard = () => {
 
   const cargarDatos = async () => {
     try {
-      const [solicitudesRes, docentesRes, estudiantesRes] = await Promise.all([
-        api.get('/subdecano/solicitudes'),
-        api.get('/subdecano/docentes'),
-        api.get('/subdecano/estudiantes')
+      // Los conteos vienen de los agregados; solo se listan las 5 pendientes más recientes
+      const [estadisticasRes, pendientesRes] = await Promise.all([
+        api.get('/subdecano/estadisticas'),
+        api.get('/subdecano/solicitudes', { params: { estado: 'pendiente', limit: 5 } })
       ]);
 
-      setSolicitudes(solicitudesRes.data);
-      setDocentes(docentesRes.data);
-      setEstudiantes(estudiantesRes.data);
+      setEstadisticas(estadisticasRes.data);
+      setPendientes(pendientesRes.data);
     } catch (error) {
       console.error('Error al cargar datos:', error);
     } finally {
@@ -61,21 +59,19 @@ const SubdecanoDashboard = () => {
           {/* Estadísticas */}
           <div className="dashboard-stats">
             <div className="stat-card">
-              <div className="stat-number">
-                {solicitudes.filter(s => s.estado === 'pendiente').length}
-              </div>
+              <div className="stat-number">{estadisticas?.estados.pendiente || 0}</div>
               <div className="stat-label">Solicitudes Pendientes</div>
             </div>
             <div className="stat-card">
-              <div className="stat-number">{docentes.length}</div>
+              <div className="stat-number">{estadisticas?.docentes || 0}</div>
               <div className="stat-label">Docentes</div>
             </div>
             <div className="stat-card">
-              <div className="stat-number">{estudiantes.length}</div>
+              <div className="stat-number">{estadisticas?.estudiantes || 0}</div>
               <div className="stat-label">Estudiantes</div>
             </div>
             <div className="stat-card">
-              <div className="stat-number">{solicitudes.length}</div>
+              <div className="stat-number">{estadisticas?.total || 0}</div>
               <div className="stat-label">Total Solicitudes</div>
             </div>
           </div>
@@ -113,42 +109,39 @@ const SubdecanoDashboard = () => {
               <h2 className="card-title">Solicitudes Pendientes de Aprobación</h2>
             </div>
             <div className="solicitudes-list">
-              {solicitudes.filter(s => s.estado === 'pendiente').length === 0 ? (
+              {pendientes.length === 0 ? (
                 <p className="text-center text-gray">No hay solicitudes pendientes</p>
               ) : (
-                solicitudes
-                  .filter(s => s.estado === 'pendiente')
-                  .slice(0, 5)
-                  .map((sol) => (
-                    <div key={sol.id} className="solicitud-item">
-                      <div className="solicitud-info">
-                        <h3>{sol.materia_nombre}</h3>
-                        <p className="text-gray">
-                          Estudiante: {sol.estudiante_nombre_anonimo}
-                        </p>
-                        <p className="text-sm text-gray">
-                          Grupo: {sol.grupo} | Aporte: {sol.aporte}
-                        </p>
-                        <p className="text-sm text-gray">
-                          {new Date(sol.fecha_creacion).toLocaleDateString('es-ES')}
-                        </p>
-                      </div>
-                      <div className="solicitud-actions">
-                        <span className={`badge ${getEstadoBadge(sol.estado)}`}>
-                          {sol.estado}
-                        </span>
-                        <Link
-                          to="/subdecano/solicitudes"
-                          className="btn btn-secondary"
-                        >
-                          Gestionar
-                        </Link>
-                      </div>
+                pendientes.map((sol) => (
+                  <div key={sol.id} className="solicitud-item">
+                    <div className="solicitud-info">
+                      <h3>{sol.materia_nombre}</h3>
+                      <p className="text-gray">
+                        Estudiante: {sol.estudiante_nombre_anonimo}
+                      </p>
+                      <p className="text-sm text-gray">
+                        Grupo: {sol.grupo} | Aporte: {sol.aporte}
+                      </p>
+                      <p className="text-sm text-gray">
+                        {new Date(sol.fecha_creacion).toLocaleDateString('es-ES')}
+                      </p>
+                    </div>
+                    <div className="solicitud-actions">
+                      <span className={`badge ${getEstadoBadge(sol.estado)}`}>
+                        {sol.estado}
+                      </span>
+                      <Link
+                        to="/subdecano/solicitudes"
+                        className="btn btn-secondary"
+                      >
+                        Gestionar
+                      </Link>
                     </div>
-                  ))
+                  </div>
+                ))
               )}
             </div>
-            {solicitudes.filter(s => s.estado === 'pendiente').length > 5 && (
+            {(estadisticas?.estados.pendiente || 0) > 5 && (
               <div className="text-center mt-3">
                 <Link to="/subdecano/solicitudes" className="btn btn-outline">
                   Ver todas las solicitudes
@@ -0,0 +1,59 @@
+"""
+Compara dos resultados de run.py endpoint por endpoint.
+
+Muestra p50/p95/p99 y throughput de la corrida base y de la nueva con la
+variación relativa. Sale con código 1 si algún endpoint empeora su p95 más que
+--threshold, así sirve como control en CI.
+
+Uso:
+    python loadtest/compare.py loadtest/results/base.json loadtest/results/nuevo.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from harness import PERCENTILES
+
+def delta(before: float, after: float) -> str:
+    if not before:
+        return "    -"
+    return f"{after / before - 1:>+6.0%}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", type=Path)
+    parser.add_argument("nuevo", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10, help="Regresión tolerada del p95 (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    base = json.loads(args.base.read_text())
+    nuevo = json.loads(args.nuevo.read_text())
+    print(f"base:  {base['meta'].get('label') or args.base.name} ({base['meta']['git']})")
+    print(f"nuevo: {nuevo['meta'].get('label') or args.nuevo.name} ({nuevo['meta']['git']})\n")
+
+    columns = [f"p{p}" for p in PERCENTILES] + ["rps"]
+    print(f"{'endpoint':<58} " + " ".join(f"{name:>22}" for name in columns))
+    regressions = []
+    for endpoint in sorted(set(base["endpoints"]) | set(nuevo["endpoints"])):
+        before = base["endpoints"].get(endpoint)
+        after = nuevo["endpoints"].get(endpoint)
+        if before is None or after is None:
+            print(f"{endpoint:<58} {'(solo en ' + ('nuevo' if before is None else 'base') + ')':>22}")
+            continue
+        cells = []
+        for pct in PERCENTILES:
+            key = f"p{pct}_ms"
+            cells.append(f"{before[key]:>7.1f}->{after[key]:>7.1f} {delta(before[key], after[key])}")
+        cells.append(f"{before['throughput_rps']:>7.1f}->{after['throughput_rps']:>7.1f} "
+                     f"{delta(before['throughput_rps'], after['throughput_rps'])}")
+        print(f"{endpoint:<58} " + " ".join(f"{cell:>22}" for cell in cells))
+        if before["p95_ms"] and after["p95_ms"] / before["p95_ms"] - 1 > args.threshold:
+            regressions.append(endpoint)
+
+    if regressions:
+        print(f"\np95 empeoró más de {args.threshold:.0%} en: " + ", ".join(regressions))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import asyncio
+import io
+import json
+import random
+import secrets
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+from PIL import Image, ImageDraw
+
+from harness import Recorder, Session
+
+# =============== FIXTURES ===============
+# Se crean por la API (como lo haría el subdecano), así sirven igual para el
+# despliegue en proceso y para el stack de docker-compose, donde Mongo no está
+# expuesto. Los correos y códigos llevan una etiqueta por corrida para no chocar
+# con datos existentes.
+
+GRUPOS = ["GR1", "GR2", "GR3"]
+APORTES = ["1", "2", "3", "Examen"]
+# Contraseñas por defecto que asigna el admin al crear usuarios
+PASSWORD_DOCENTE = "docente123"
+PASSWORD_ESTUDIANTE = "estudiante123"
+
+@dataclass
+class Fixtures:
+    tag: str
+    subdecano: Dict[str, str]
+    materias: List[Dict] = field(default_factory=list)
+    docentes: List[Dict] = field(default_factory=list)
+    estudiantes: List[Dict] = field(default_factory=list)
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(asdict(self), indent=2, ensure_ascii=False))
+
+    @classmethod
+    def load(cls, path: Path) -> "Fixtures":
+        return cls(**json.loads(path.read_text()))
+
+def evidence_image(width: int = 1200, height: int = 1600) -> bytes:
+    """JPEG de prueba con el tamaño de una foto de examen (encabezado + renglones)"""
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((60, 60, width - 60, 220), outline="black", width=4)
+    for y in range(300, height - 80, 48):
+        draw.line((80, y, width - 80, y), fill=(90, 90, 90), width=2)
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+async def _bounded(concurrency: int, coros):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros))
+
+async def create_fixtures(client: httpx.AsyncClient, *, students: int, teachers: int, materias: int,
+                          admin_email: str, admin_password: str, concurrency: int = 8) -> Fixtures:
+    """Crea materias, docentes, estudiantes y una evidencia por estudiante"""
+    tag = secrets.token_hex(3)
+    rng = random.Random(tag)
+    # Las peticiones de preparación no entran en las estadísticas de la corrida
+    admin = Session(client, Recorder())
+    await admin.login(admin_email, admin_password, "subdecano")
+    fixtures = Fixtures(tag=tag, subdecano={"email": admin_email, "password": admin_password})
+
+    async def crear_materia(i: int):
+        response = await admin.request("POST", "/api/subdecano/materias", json={
+            "nombre": f"Materia de carga {i:03d}",
+            "codigo": f"LT{tag}-{i:03d}".upper(),
+            "descripcion": "Fixture de prueba de carga",
+        })
+        return response.json()["id"]
+
+    materia_ids = await _bounded(concurrency, (crear_materia(i) for i in range(materias)))
+    fixtures.materias = [{"id": materia_id} for materia_id in materia_ids]
+
+    # Cada materia tiene al menos un docente: el docente i dicta i, i+1 (mod materias)
+    async def crear_docente(i: int):
+        asignadas = sorted({materia_ids[i % materias], materia_ids[(i + 1) % materias]})
+        email = f"lt{tag}-doc{i:04d}@blindcheck.edu"
+        response = await admin.request("POST", "/api/subdecano/docentes", json={
+            "email": email, "nombre": f"Docente Carga {i:04d}", "carrera": "Software",
+            "materias": asignadas, "grupos_asignados": GRUPOS,
+        })
+        return {"id": response.json()["id"], "email": email, "password": PASSWORD_DOCENTE, "materias": asignadas}
+
+    fixtures.docentes = await _bounded(concurrency, (crear_docente(i) for i in range(teachers)))
+
+    async def crear_estudiante(i: int):
+        cursando = rng.sample(materia_ids, k=min(3, materias))
+        email = f"lt{tag}-est{i:04d}@blindcheck.edu"
+        response = await admin.request("POST", "/api/subdecano/estudiantes", json={
+            "email": email, "nombre": f"Estudiante Carga {i:04d}", "carrera": "Software",
+            "materias_cursando": cursando,
+        })
+        return {"id": response.json()["id"], "email": email, "password": PASSWORD_ESTUDIANTE, "materias": cursando}
+
+    fixtures.estudiantes = await _bounded(concurrency, (crear_estudiante(i) for i in range(students)))
+
+    # Una evidencia por estudiante para que pueda crear solicitudes
+    image = evidence_image()
+    docentes_por_materia: Dict[str, List[Dict]] = {}
+    for docente in fixtures.docentes:
+        for materia_id in docente["materias"]:
+            docentes_por_materia.setdefault(materia_id, []).append(docente)
+    sessions: Dict[str, Session] = {}
+
+    async def docente_session(docente: Dict) -> Session:
+        if docente["id"] not in sessions:
+            session = Session(client, admin.recorder)
+            await session.login(docente["email"], docente["password"], "docente")
+            sessions[docente["id"]] = session
+        return sessions[docente["id"]]
+
+    for docente in fixtures.docentes:
+        await docente_session(docente)
+
+    async def subir_evidencia(estudiante: Dict):
+        materia_id = rng.choice(estudiante["materias"])
+        docente = rng.choice(docentes_por_materia[materia_id])
+        session = await docente_session(docente)
+        await session.request("POST", "/api/docente/evidencias", data={
+            "estudiante_id": estudiante["id"], "materia_id": materia_id,
+            "grupo": rng.choice(GRUPOS), "aporte": rng.choice(APORTES), "descripcion": "Fixture",
+        }, files={"archivo": ("examen.jpg", image, "image/jpeg")})
+
+    await _bounded(concurrency, (subir_evidencia(estudiante) for estudiante in fixtures.estudiantes))
+    return fixtures
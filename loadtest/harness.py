@@ -0,0 +1,126 @@
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+# =============== MOTOR DE CARGA ===============
+# Cada escenario corre N usuarios virtuales; cada usuario repite una iteración
+# del escenario hasta que vence el tiempo. Cada petición se registra con el
+# nombre de su plantilla (PUT /api/subdecano/solicitudes/{id}/estado), nunca con
+# el path con IDs, para que las estadísticas por endpoint sean comparables.
+
+PERCENTILES = (50, 95, 99)
+
+class ScenarioError(Exception):
+    """Una petición falló o respondió un status inesperado; la iteración se aborta"""
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+class Recorder:
+    """Latencias y status por endpoint, e iteraciones por escenario"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.iterations: Counter = Counter()
+        self.failures: Counter = Counter()
+
+    def record(self, endpoint: str, seconds: float, status):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][str(status)] += 1
+
+    def summary(self, elapsed: float) -> Dict:
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            statuses = self.statuses[endpoint]
+            errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+            stats = {
+                "count": len(ordered),
+                "errors": errors,
+                "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+                "statuses": dict(statuses),
+            }
+            for pct in PERCENTILES:
+                stats[f"p{pct}_ms"] = round(percentile(ordered, pct) * 1000, 2)
+            endpoints[endpoint] = stats
+        return {
+            "endpoints": endpoints,
+            "scenarios": {
+                name: {"iterations": self.iterations[name], "failed": self.failures[name]}
+                for name in sorted(set(self.iterations) | set(self.failures))
+            },
+        }
+
+class Session:
+    """Cliente HTTP de un usuario virtual: agrega el token y registra cada petición"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, token: Optional[str] = None):
+        self.client = client
+        self.recorder = recorder
+        self.token = token
+        # Estado propio del escenario (ids creados, usuario asignado, ...)
+        self.state: Dict = {}
+
+    async def request(self, method: str, path: str, *, name: Optional[str] = None,
+                      expect=(200,), **kwargs) -> httpx.Response:
+        endpoint = f"{method} {name or path}"
+        headers = kwargs.pop("headers", {})
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, headers=headers, **kwargs)
+        except httpx.HTTPError as exc:
+            self.recorder.record(endpoint, time.perf_counter() - start, type(exc).__name__)
+            raise ScenarioError(f"{endpoint}: {exc!r}") from exc
+        self.recorder.record(endpoint, time.perf_counter() - start, response.status_code)
+        if response.status_code not in expect:
+            raise ScenarioError(f"{endpoint}: {response.status_code} {response.text[:200]}")
+        return response
+
+    async def login(self, email: str, password: str, role: str):
+        response = await self.request(
+            "POST", "/api/auth/login", json={"email": email, "password": password, "role": role}
+        )
+        # La cookie es Secure: sobre http no se reenviaría, se usa como Bearer
+        self.token = response.cookies.get("access_token")
+        if not self.token:
+            raise ScenarioError("login sin cookie access_token")
+
+Iteration = Callable[[Session, int], Awaitable[None]]
+
+async def run_users(name: str, iteration: Iteration, users: int, deadline: float,
+                    make_session: Callable[[], Session], recorder: Recorder,
+                    think_time: float = 0.0, ramp_up: float = 0.0):
+    """
+    Corre `users` usuarios virtuales de un escenario hasta `deadline` (perf_counter).
+
+    Cada usuario recibe su índice (para elegir credenciales de los fixtures), entra
+    escalonado durante `ramp_up` segundos y espera ~`think_time` entre iteraciones.
+    """
+
+    async def user(index: int):
+        if ramp_up:
+            await asyncio.sleep(ramp_up * index / max(users, 1))
+        session = make_session()
+        while time.perf_counter() < deadline:
+            try:
+                await iteration(session, index)
+                recorder.iterations[name] += 1
+            except ScenarioError:
+                recorder.failures[name] += 1
+            if think_time:
+                await asyncio.sleep(random.uniform(0.5, 1.5) * think_time)
+
+    await asyncio.gather(*(user(index) for index in range(users)))
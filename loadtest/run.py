@@ -0,0 +1,175 @@
+"""
+Prueba de carga de extremo a extremo con escenarios de fin de periodo.
+
+Destinos:
+  - inprocess (por defecto): levanta los cuatro servicios en un proceso
+    (serve.py) contra el Mongo de MONGODB_URL, en la base DATABASE_NAME
+    (por defecto blindcheck_loadtest) y con el rate limiting apagado.
+  - una URL (ej. https://localhost): el stack de docker-compose a través del
+    gateway. Para que el login storm no termine en 429, el .env del stack debe
+    tener RATE_LIMIT_ENABLED=false.
+
+Escenarios: login-storm, student-requests, teacher-evidence,
+teacher-evidence-oneshot, subdecano-approve, dashboards. Sin --scenario corre
+la mezcla completa (term-end) en paralelo.
+
+Uso:
+    python loadtest/run.py --duration 60 --out loadtest/results/base.json
+    python loadtest/run.py --scenario login-storm --users login-storm=200
+    python loadtest/run.py --target https://localhost --insecure
+    python loadtest/compare.py loadtest/results/base.json loadtest/results/nuevo.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from fixtures import Fixtures, create_fixtures
+from harness import PERCENTILES, Recorder, Session, run_users
+from scenarios import build_scenarios
+
+HERE = Path(__file__).resolve().parent
+
+def parse_users(values):
+    overrides = {}
+    for value in values or []:
+        name, _, count = value.partition("=")
+        overrides[name] = int(count)
+    return overrides
+
+def start_inprocess(port: int) -> subprocess.Popen:
+    env = {**os.environ, "RATE_LIMIT_ENABLED": os.environ.get("RATE_LIMIT_ENABLED", "false")}
+    env.setdefault("DATABASE_NAME", "blindcheck_loadtest")
+    return subprocess.Popen([sys.executable, str(HERE / "serve.py"), "--port", str(port)], env=env)
+
+async def wait_healthy(client: httpx.AsyncClient, path: str, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            if (await client.get(path)).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.perf_counter() > deadline:
+            raise SystemExit(f"El destino no respondió {path} en {timeout:.0f} s")
+        await asyncio.sleep(0.5)
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "-"
+
+def print_table(summary):
+    header = f"{'endpoint':<58} {'n':>7} {'rps':>8} " + " ".join(f"{'p' + str(p):>9}" for p in PERCENTILES) + f" {'err':>6}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, stats in summary["endpoints"].items():
+        pcts = " ".join(f"{stats[f'p{p}_ms']:>7.1f}ms" for p in PERCENTILES)
+        print(f"{endpoint:<58} {stats['count']:>7} {stats['throughput_rps']:>8.1f} {pcts} {stats['errors']:>6}")
+    print()
+    for name, stats in summary["scenarios"].items():
+        print(f"{name:<20} iteraciones={stats['iterations']} fallidas={stats['failed']}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="inprocess", help="inprocess o la URL base del gateway")
+    parser.add_argument("--port", type=int, default=8900, help="Puerto del servidor en proceso")
+    parser.add_argument("--insecure", action="store_true", help="No verificar el certificado TLS del destino")
+    parser.add_argument("--scenario", action="append", help="Escenario a correr (repetible); por defecto todos")
+    parser.add_argument("--users", action="append", metavar="ESCENARIO=N", help="Usuarios de un escenario")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplica los usuarios por defecto")
+    parser.add_argument("--duration", type=float, default=60.0, help="Segundos de carga")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Segundos para que entren todos los usuarios")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--materias", type=int, default=10)
+    parser.add_argument("--admin-email", default="admin@blindcheck.edu")
+    parser.add_argument("--admin-password", default=os.environ.get("LOADTEST_ADMIN_PASSWORD", "Admin2026!"))
+    parser.add_argument("--fixtures", type=Path, help="JSON de fixtures: se reutiliza si existe, si no se crea")
+    parser.add_argument("--label", default="", help="Etiqueta libre guardada en el resultado")
+    parser.add_argument("--out", type=Path, help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.target
+    if args.target == "inprocess":
+        server = start_inprocess(args.port)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=1000)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, verify=not args.insecure, limits=limits,
+                                     timeout=httpx.Timeout(30.0)) as client:
+            await wait_healthy(client, "/health" if server is not None else "/")
+
+            if args.fixtures and args.fixtures.exists():
+                fixtures = Fixtures.load(args.fixtures)
+            else:
+                print(f"Creando fixtures: {args.students} estudiantes, {args.teachers} docentes, {args.materias} materias")
+                fixtures = await create_fixtures(
+                    client, students=args.students, teachers=args.teachers, materias=args.materias,
+                    admin_email=args.admin_email, admin_password=args.admin_password,
+                )
+                if args.fixtures:
+                    fixtures.save(args.fixtures)
+
+            scenarios = build_scenarios(fixtures)
+            selected = args.scenario or list(scenarios)
+            unknown = set(selected) - set(scenarios)
+            if unknown:
+                raise SystemExit(f"Escenarios desconocidos: {', '.join(sorted(unknown))}")
+            overrides = parse_users(args.users)
+            users = {name: overrides.get(name, max(1, round(scenarios[name].users * args.scale))) for name in selected}
+
+            print(f"Carga contra {base_url} durante {args.duration:.0f} s: "
+                  + ", ".join(f"{name}={count}" for name, count in users.items()))
+            recorder = Recorder()
+            start = time.perf_counter()
+            deadline = start + args.duration
+            await asyncio.gather(*(
+                run_users(name, scenarios[name].iteration, users[name], deadline,
+                          lambda: Session(client, recorder), recorder,
+                          think_time=scenarios[name].think_time, ramp_up=args.ramp_up)
+                for name in selected
+            ))
+            elapsed = time.perf_counter() - start
+            # El gateway no enruta /health a los servicios: el pool solo se reporta en proceso
+            pool = (await client.get("/health")).json().get("mongo_pool") if server is not None else None
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    summary = recorder.summary(elapsed)
+    result = {
+        "meta": {
+            "label": args.label,
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "target": args.target,
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "duration_s": round(elapsed, 2),
+            "users": users,
+            "fixtures": {"students": len(fixtures.estudiantes), "teachers": len(fixtures.docentes),
+                         "materias": len(fixtures.materias)},
+        },
+        **summary,
+        "mongo_pool": pool,
+    }
+    print_table(summary)
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+        print(f"\nResultados en {args.out}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Dict
+
+from fixtures import APORTES, GRUPOS, Fixtures, evidence_image
+from harness import Iteration, Session
+
+# =============== ESCENARIOS DE FIN DE PERIODO ===============
+# Cada escenario es una iteración que un usuario virtual repite. Los usuarios
+# toman credenciales de los fixtures según su índice.
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    iteration: Iteration
+    # Usuarios por defecto en la mezcla term-end
+    users: int
+    # Pausa media entre iteraciones (segundos)
+    think_time: float
+
+def _user(fixtures_list, index: int) -> Dict:
+    return fixtures_list[index % len(fixtures_list)]
+
+async def _ensure_login(session: Session, user: Dict, role: str):
+    if session.token is None:
+        await session.login(user["email"], user["password"], role)
+
+def build_scenarios(fixtures: Fixtures, approve_batch: int = 20) -> Dict[str, Scenario]:
+    image = evidence_image()
+
+    async def login_storm(session: Session, index: int):
+        """Inicio de jornada: cada iteración es un login nuevo seguido de /me"""
+        estudiante = random.choice(fixtures.estudiantes)
+        session.token = None
+        await session.login(estudiante["email"], estudiante["password"], "estudiante")
+        await session.request("GET", "/api/auth/me")
+
+    async def student_requests(session: Session, index: int):
+        """El estudiante revisa sus opciones, crea una solicitud y mira su bandeja"""
+        estudiante = _user(fixtures.estudiantes, index)
+        await _ensure_login(session, estudiante, "estudiante")
+        opciones = (await session.request("GET", "/api/estudiante/opciones-solicitud")).json()
+        if opciones:
+            opcion = random.choice(opciones)
+            await session.request("POST", "/api/estudiante/solicitudes", json={
+                "materia_id": opcion["materia_id"],
+                "docente_id": opcion["docente_id"],
+                "grupo": opcion["grupo"],
+                "aporte": opcion["aporte"],
+                "calificacion_actual": round(random.uniform(2, 7), 1),
+                "motivo": "Prueba de carga: revisión de la pregunta 3",
+            })
+        await session.request("GET", "/api/estudiante/solicitudes")
+        await session.request("GET", "/api/estudiante/mensajes")
+
+    async def teacher_evidence(session: Session, index: int):
+        """El docente sube una foto, la recorta (oculta el nombre) y revisa su lista"""
+        docente = _user(fixtures.docentes, index)
+        await _ensure_login(session, docente, "docente")
+        materia_id = random.choice(docente["materias"])
+        estudiante = random.choice(fixtures.estudiantes)
+        campos = {
+            "estudiante_id": estudiante["id"],
+            "materia_id": materia_id,
+            "grupo": random.choice(GRUPOS),
+            "aporte": random.choice(APORTES),
+        }
+        temp = (await session.request(
+            "POST", "/api/docente/evidencias/upload-temp",
+            data=campos, files={"archivo": ("examen.jpg", image, "image/jpeg")},
+        )).json()
+        await session.request("POST", "/api/docente/evidencias/recortar", json={
+            **campos,
+            "temp_filename": temp["temp_filename"],
+            "descripcion": "Prueba de carga",
+            "crop_area": {"x": 60, "y": 60, "width": 1080, "height": 160},
+        })
+        await session.request("GET", "/api/docente/evidencias")
+
+    async def teacher_evidence_oneshot(session: Session, index: int):
+        """Igual que teacher-evidence pero con subida y recorte en una sola petición"""
+        docente = _user(fixtures.docentes, index)
+        await _ensure_login(session, docente, "docente")
+        await session.request(
+            "POST", "/api/docente/evidencias/subir-recortada",
+            data={
+                "estudiante_id": random.choice(fixtures.estudiantes)["id"],
+                "materia_id": random.choice(docente["materias"]),
+                "grupo": random.choice(GRUPOS),
+                "aporte": random.choice(APORTES),
+                "descripcion": "Prueba de carga",
+                "crop_area": '{"x": 60, "y": 60, "width": 1080, "height": 160}',
+            },
+            files={"archivo": ("examen.jpg", image, "image/jpeg")},
+        )
+        await session.request("GET", "/api/docente/evidencias")
+
+    async def subdecano_bulk_approve(session: Session, index: int):
+        """El subdecano aprueba en lote las solicitudes pendientes (asignación automática)"""
+        await _ensure_login(session, fixtures.subdecano, "subdecano")
+        solicitudes = (await session.request("GET", "/api/subdecano/solicitudes")).json()
+        pendientes = [sol["id"] for sol in solicitudes if sol["estado"] == "pendiente"][:approve_batch]
+        await asyncio.gather(*(
+            session.request(
+                "PUT", f"/api/subdecano/solicitudes/{solicitud_id}/estado",
+                name="/api/subdecano/solicitudes/{id}/estado",
+                json={"estado": "aprobada"},
+            )
+            for solicitud_id in pendientes
+        ))
+
+    async def dashboards(session: Session, index: int):
+        """Paneles abiertos que refrescan sus listados periódicamente"""
+        role = ("subdecano", "docente", "estudiante")[index % 3]
+        if role == "subdecano":
+            await _ensure_login(session, fixtures.subdecano, role)
+            for path in ("/api/subdecano/estadisticas", "/api/subdecano/solicitudes", "/api/subdecano/materias",
+                         "/api/subdecano/docentes", "/api/subdecano/logs"):
+                await session.request("GET", path)
+        elif role == "docente":
+            await _ensure_login(session, _user(fixtures.docentes, index), role)
+            for path in ("/api/docente/recalificaciones", "/api/docente/materias"):
+                await session.request("GET", path)
+        else:
+            await _ensure_login(session, _user(fixtures.estudiantes, index), role)
+            for path in ("/api/estudiante/solicitudes", "/api/estudiante/mensajes"):
+                await session.request("GET", path)
+
+    scenarios = [
+        Scenario("login-storm", "Logins concurrentes de estudiantes", login_storm, users=50, think_time=0.0),
+        Scenario("student-requests", "Estudiantes creando solicitudes", student_requests, users=40, think_time=1.0),
+        Scenario("teacher-evidence", "Docentes subiendo y recortando evidencias", teacher_evidence, users=10, think_time=2.0),
+        Scenario("teacher-evidence-oneshot", "Docentes subiendo evidencias ya recortadas", teacher_evidence_oneshot,
+                 users=10, think_time=2.0),
+        Scenario("subdecano-approve", "Aprobación en lote del subdecano", subdecano_bulk_approve, users=2, think_time=3.0),
+        Scenario("dashboards", "Paneles refrescando listados", dashboards, users=30, think_time=5.0),
+    ]
+    return {scenario.name: scenario for scenario in scenarios}
@@ -0,0 +1,118 @@
+"""
+Levanta los cuatro microservicios en un solo proceso, detrás de un despachador
+ASGI que enruta por prefijo igual que el gateway de nginx:
+
+    /api/auth        -> auth
+    /api/estudiante  -> student
+    /api/docente     -> teacher
+    /api/subdecano   -> admin
+
+Cada main.py se carga con un nombre de módulo propio. Los routers no tienen
+__init__.py, así que `routers` es un namespace package que abarca los cuatro
+directorios de servicio.
+
+Uso (normalmente lo lanza run.py):
+    python loadtest/serve.py --port 8900 --workdir loadtest/.work
+"""
+import argparse
+import importlib.util
+import os
+import sys
+from contextlib import AsyncExitStack
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# (servicio, prefijos que atiende)
+SERVICES = [
+    ("admin", ("/api/subdecano",)),
+    ("auth", ("/api/auth",)),
+    ("student", ("/api/estudiante",)),
+    ("teacher", ("/api/docente",)),
+]
+
+def load_service(name: str):
+    """Importa microservices/<name>/main.py como `<name>_main` y devuelve su app"""
+    spec = importlib.util.spec_from_file_location(f"{name}_main", ROOT / "microservices" / name / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module.app
+
+class PrefixDispatcher:
+    """
+    App ASGI que reparte cada petición al servicio dueño del prefijo.
+
+    El lifespan abre los lifespans de todos los servicios (conexión a Mongo,
+    seed del admin, monitor del event loop) y los cierra en orden inverso.
+    """
+
+    def __init__(self, routes, default):
+        self.routes = routes
+        self.default = default
+        self.apps = list(dict.fromkeys(app for _, app in routes))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        path = scope.get("path", "")
+        for prefix, app in self.routes:
+            if path == prefix or path.startswith(prefix + "/"):
+                await app(scope, receive, send)
+                return
+        await self.default(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        await receive()  # lifespan.startup
+        async with AsyncExitStack() as stack:
+            try:
+                for app in self.apps:
+                    await stack.enter_async_context(app.router.lifespan_context(app))
+            except BaseException as exc:
+                await send({"type": "lifespan.startup.failed", "message": repr(exc)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+            await receive()  # lifespan.shutdown
+        await send({"type": "lifespan.shutdown.complete"})
+
+def build_app() -> PrefixDispatcher:
+    # admin primero: su seed_db.py es el que se importa como `seed_db`
+    for name, _ in reversed(SERVICES):
+        sys.path.insert(0, str(ROOT / "microservices" / name))
+    sys.path.insert(0, str(ROOT / "common"))
+
+    routes = []
+    apps = {}
+    for name, prefixes in SERVICES:
+        apps[name] = load_service(name)
+        routes.extend((prefix, apps[name]) for prefix in prefixes)
+    # /health y /metrics sin prefijo los atiende auth (las métricas son del proceso)
+    return PrefixDispatcher(routes, default=apps["auth"])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--workdir", default=str(ROOT / "loadtest" / ".work"),
+                        help="Directorio de trabajo (uploads/ se crea aquí)")
+    args = parser.parse_args()
+
+    # uploads/ es relativo al directorio de trabajo, como en los contenedores (/app/uploads)
+    workdir = Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    os.chdir(workdir)
+
+    os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DATABASE_NAME", "blindcheck_loadtest")
+    os.environ.setdefault("SECRET_KEY", "loadtest")
+    os.environ.setdefault("ENCRYPTION_KEY", "loadtest")
+    # Los límites por IP (5 logins/minuto) cortarían cualquier escenario
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    import uvicorn
+
+    uvicorn.run(build_app(), host=args.host, port=args.port, log_level="warning", access_log=False)
+
+if __name__ == "__main__":
+    main()
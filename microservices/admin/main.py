@@ -1,55 +1,19 @@
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
+from app_factory import create_app
 from routers import subdecano
-from config import settings
-from utils.limiter import limiter
-from slowapi.errors import RateLimitExceeded
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi.responses import JSONResponse
 from seed_db import seed_data
+from utils.audit_store import ensure_log_indexes
+from utils.search import ensure_search_indexes
+from utils.stats import run_reconciler
 
-app = FastAPI(
+app = create_app(
+    service="admin",
     title="Admin Service",
     description="Microservicio de Administración (Subdecano)",
-    version="1.0.0",
+    routers=[subdecano.router],
+    on_startup=[seed_data, ensure_log_indexes, ensure_search_indexes],
+    background_tasks=[run_reconciler],
 )
 
-@app.on_event("startup")
-async def startup_event():
-    await seed_data()
-
-# Security Headers Middleware
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        return response
-
-app.add_middleware(SecurityHeadersMiddleware)
-
-# Rate Limiting
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, lambda request, exc: JSONResponse({"detail": "Rate limit exceeded"}, status_code=429))
-
-# Configuración de CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.allowed_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Incluir router
-app.include_router(subdecano.router)
-
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy", "service": "admin"}
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000)
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List, Dict
+import logging
+from fastapi import APIRouter, HTTPException, Depends, status, Request, Response, Query
+from typing import List, Dict, Optional
 from bson import ObjectId
 from datetime import datetime
 from models.schemas import (
@@ -7,16 +8,47 @@ from models.schemas import (
     EstudianteCreate, EstudianteResponse,
     SolicitudResponse, SolicitudUpdateEstado, EstadoSolicitud,
     MateriaCreate, MateriaResponse,
-    DocenteCreateBySubdecano, EstudianteCreateBySubdecano
+    DocenteCreateBySubdecano, EstudianteCreateBySubdecano,
+    EstadisticasResponse
 )
 from database import (
     docentes_collection, estudiantes_collection, subdecanos_collection,
-    solicitudes_collection, materias_collection, mensajes_collection
+    solicitudes_collection, materias_collection, mensajes_collection,
+    estadisticas_collection, routed
 )
 from utils.auth import get_current_user
 from utils.encryption import hash_password, anonymize_name
+from utils.responses import model_rows
+from utils.queries import Projection, find_one, find_list, find_by_ids
+from utils.stats import record_transition
+from utils.search import MAX_RESULTS, refresh_search_key, search_fields, search_people
+from utils.etags import bump, conditional
 
 router = APIRouter(prefix="/api/subdecano", tags=["Subdecano"])
+logger = logging.getLogger(__name__)
+
+# Proyecciones: campos que lee cada handler
+SOLO_ID = Projection()
+DOCENTE_LISTA = Projection("email", "nombre", "carrera", "materias", "activo", "primer_login", "fecha_registro")
+DOCENTE_NOMBRE = Projection("nombre")
+DOCENTE_DISPONIBLE = Projection("nombre", "email", "materias")
+DOCENTE_ASIGNACION = Projection("estado", "materias")
+PERSONA_BUSQUEDA = Projection("email", "nombre", "carrera", "activo")
+ESTUDIANTE_LISTA = Projection("email", "nombre", "carrera", "materias_cursando", "activo", "primer_login", "fecha_registro")
+MATERIA_NOMBRE = Projection("nombre")
+MATERIA_CATALOGO = Projection("nombre", "codigo", "descripcion")
+SOLICITUD_LISTA = Projection(
+    "estudiante_id", "estudiante_nombre_anonimo", "materia_id", "docente_id",
+    "docente_nombre_anonimo", "grupo", "aporte", "calificacion_actual", "motivo",
+    "estado", "fecha_creacion", "fecha_actualizacion"
+)
+SOLICITUD_PARTES = Projection("estudiante_id", "materia_id", "docente_id", "estado")
+# Estado previo que devuelve find_one_and_update para las estadísticas
+SOLICITUD_TRANSICION = Projection("materia_id", "estado", "fecha_creacion")
+ESTADISTICA = Projection("materia_id", "estados", "total", "resolucion", "reconciliado")
+RESET_LISTA = Projection("email", "rol", "estado", "fecha_solicitud", "fecha_completacion")
+RESET_USUARIO = Projection("email", "rol", "user_id")
+LOG = Projection("usuario_id", "rol", "accion", "detalle", "fecha", "ip")
 
 # =============== GESTIÓN DE DOCENTES ===============
 
@@ -30,14 +62,14 @@ async def crear_docente(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
     # Verificar si ya existe
-    existe = await docentes_collection.find_one({"email": docente.email})
+    existe = await find_one(docentes_collection, {"email": docente.email}, SOLO_ID)
     if existe:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El email ya está registrado")
     
     # Generar ID único para el docente
     import secrets
     docente_id = f"DOC{secrets.randbelow(10000):04d}"
-    while await docentes_collection.find_one({"_id": docente_id}):
+    while await find_one(docentes_collection, {"_id": docente_id}, SOLO_ID):
         docente_id = f"DOC{secrets.randbelow(10000):04d}"
     
     # Contraseña por defecto: docente123
@@ -53,10 +85,12 @@ async def crear_docente(
         "materias": docente.materias,
         "activo": True,
         "primer_login": True,  # Debe cambiar contraseña en primer login
-        "fecha_registro": datetime.utcnow()
+        "fecha_registro": datetime.utcnow(),
+        **search_fields(docente.nombre, docente.email)
     }
     
     await docentes_collection.insert_one(nuevo_docente)
+    await bump("docentes", f"docente:{docente_id}")
     
     return {
         "id": docente_id,
@@ -74,7 +108,7 @@ async def listar_docentes(current_user: Dict = Depends(get_current_user)):
     if current_user["role"] != "subdecano":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    docentes = await docentes_collection.find().to_list(length=1000)
+    docentes = await find_list(routed(docentes_collection, "primary"), {}, DOCENTE_LISTA, length=1000)
     
     return [
         {
@@ -90,6 +124,32 @@ async def listar_docentes(current_user: Dict = Depends(get_current_user)):
         for doc in docentes
     ]
 
+@router.get("/docentes/buscar")
+async def buscar_docentes(
+    q: str = "",
+    carrera: Optional[str] = None,
+    texto: bool = False,
+    k: int = Query(20, ge=1, le=MAX_RESULTS),
+    current_user: Dict = Depends(get_current_user)
+):
+    """Busca docentes por prefijo de nombre o email (sin distinguir mayúsculas ni tildes)"""
+    if current_user["role"] != "subdecano":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    
+    docentes = await search_people(
+        routed(docentes_collection, "listing"), q, PERSONA_BUSQUEDA, carrera=carrera, texto=texto, k=k
+    )
+    return [
+        {
+            "id": str(doc["_id"]),
+            "email": doc["email"],
+            "nombre": doc["nombre"],
+            "carrera": doc.get("carrera", ""),
+            "activo": doc.get("activo", True)
+        }
+        for doc in docentes
+    ]
+
 @router.put("/docentes/{docente_id}")
 async def actualizar_docente(
     docente_id: str,
@@ -114,6 +174,9 @@ async def actualizar_docente(
     if result.matched_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Docente no encontrado")
     
+    await refresh_search_key(docentes_collection, docente_id)
+    await bump("docentes", f"docente:{docente_id}")
+    
     return {"message": "Docente actualizado exitosamente"}
 
 @router.put("/docentes/{docente_id}/desactivar")
@@ -133,6 +196,8 @@ async def desactivar_docente(
     if result.matched_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Docente no encontrado")
     
+    await bump("docentes", f"docente:{docente_id}")
+    
     return {"message": "Docente desactivado exitosamente"}
 
 @router.delete("/docentes/{docente_id}")
@@ -149,6 +214,8 @@ async def eliminar_docente(
     if result.deleted_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Docente no encontrado")
     
+    await bump("docentes", f"docente:{docente_id}")
+    
     return {"message": "Docente eliminado permanentemente"}
 
 # =============== GESTIÓN DE ESTUDIANTES ===============
@@ -162,14 +229,14 @@ async def crear_estudiante(
     if current_user["role"] != "subdecano":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    existe = await estudiantes_collection.find_one({"email": estudiante.email})
+    existe = await find_one(estudiantes_collection, {"email": estudiante.email}, SOLO_ID)
     if existe:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El email ya está registrado")
     
     # Generar ID único para el estudiante
     import secrets
     estudiante_id = f"EST{secrets.randbelow(10000):04d}"
-    while await estudiantes_collection.find_one({"_id": estudiante_id}):
+    while await find_one(estudiantes_collection, {"_id": estudiante_id}, SOLO_ID):
         estudiante_id = f"EST{secrets.randbelow(10000):04d}"
     
     # Contraseña por defecto: estudiante123
@@ -185,10 +252,12 @@ async def crear_estudiante(
         "materias_cursando": estudiante.materias_cursando,
         "activo": True,
         "primer_login": True,  # Debe cambiar contraseña en primer login
-        "fecha_registro": datetime.utcnow()
+        "fecha_registro": datetime.utcnow(),
+        **search_fields(estudiante.nombre, estudiante.email)
     }
     
     await estudiantes_collection.insert_one(nuevo_estudiante)
+    await bump(f"estudiante:{estudiante_id}")
     
     return {
         "id": estudiante_id,
@@ -206,7 +275,7 @@ async def listar_estudiantes(current_user: Dict = Depends(get_current_user)):
     if current_user["role"] != "subdecano":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    estudiantes = await estudiantes_collection.find().to_list(length=1000)
+    estudiantes = await find_list(routed(estudiantes_collection, "primary"), {}, ESTUDIANTE_LISTA, length=1000)
     
     return [
         {
@@ -222,6 +291,32 @@ async def listar_estudiantes(current_user: Dict = Depends(get_current_user)):
         for est in estudiantes
     ]
 
+@router.get("/estudiantes/buscar")
+async def buscar_estudiantes(
+    q: str = "",
+    carrera: Optional[str] = None,
+    texto: bool = False,
+    k: int = Query(20, ge=1, le=MAX_RESULTS),
+    current_user: Dict = Depends(get_current_user)
+):
+    """Busca estudiantes por prefijo de nombre o email (sin distinguir mayúsculas ni tildes)"""
+    if current_user["role"] != "subdecano":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    
+    estudiantes = await search_people(
+        routed(estudiantes_collection, "listing"), q, PERSONA_BUSQUEDA, carrera=carrera, texto=texto, k=k
+    )
+    return [
+        {
+            "id": str(est["_id"]),
+            "email": est["email"],
+            "nombre": est["nombre"],
+            "carrera": est.get("carrera", ""),
+            "activo": est.get("activo", True)
+        }
+        for est in estudiantes
+    ]
+
 @router.put("/estudiantes/{estudiante_id}")
 async def actualizar_estudiante(
     estudiante_id: str,
@@ -246,6 +341,9 @@ async def actualizar_estudiante(
     if result.matched_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Estudiante no encontrado")
     
+    await refresh_search_key(estudiantes_collection, estudiante_id)
+    await bump(f"estudiante:{estudiante_id}")
+    
     return {"message": "Estudiante actualizado exitosamente"}
 
 @router.put("/estudiantes/{estudiante_id}/desactivar")
@@ -265,6 +363,8 @@ async def desactivar_estudiante(
     if result.matched_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Estudiante no encontrado")
     
+    await bump(f"estudiante:{estudiante_id}")
+    
     return {"message": "Estudiante desactivado exitosamente"}
 
 @router.delete("/estudiantes/{estudiante_id}")
@@ -281,41 +381,96 @@ async def eliminar_estudiante(
     if result.deleted_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Estudiante no encontrado")
     
+    await bump(f"estudiante:{estudiante_id}")
+    
     return {"message": "Estudiante eliminado permanentemente"}
 
 # =============== GESTIÓN DE SOLICITUDES ===============
 
+@router.get("/estadisticas", response_model=EstadisticasResponse)
+async def obtener_estadisticas(current_user: Dict = Depends(get_current_user)):
+    """
+    Resumen del dashboard: solicitudes por estado (global y por materia) y
+    tiempo promedio de resolución. Lee los agregados de utils/stats.py, no las
+    solicitudes.
+    """
+    if current_user["role"] != "subdecano":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    
+    stats = routed(estadisticas_collection, "listing")
+    resumen = await find_one(stats, {"_id": "global"}, ESTADISTICA) or {}
+    por_materia = await find_list(stats, {"tipo": "materia"}, ESTADISTICA, sort=[("total", -1)])
+    materias = await find_by_ids(
+        routed(materias_collection, "listing"), (doc["materia_id"] for doc in por_materia), MATERIA_NOMBRE
+    )
+    
+    resolucion = resumen.get("resolucion") or {}
+    resueltas = int(resolucion.get("count", 0))
+    return {
+        "estados": {estado: n for estado, n in (resumen.get("estados") or {}).items() if n},
+        "total": resumen.get("total", 0),
+        "tiempo_resolucion_promedio_horas": (
+            round(resolucion["segundos"] / resueltas / 3600, 1) if resueltas else None
+        ),
+        "resueltas": resueltas,
+        # Conteos desde los metadatos de la colección (no recorren documentos)
+        "docentes": await docentes_collection.estimated_document_count(),
+        "estudiantes": await estudiantes_collection.estimated_document_count(),
+        "por_materia": [
+            {
+                "materia_id": doc["materia_id"],
+                "materia_nombre": materias[doc["materia_id"]]["nombre"] if doc["materia_id"] in materias else "Desconocida",
+                "estados": {estado: n for estado, n in (doc.get("estados") or {}).items() if n},
+                "total": doc.get("total", 0),
+            }
+            for doc in por_materia
+        ],
+        "reconciliado": resumen.get("reconciliado"),
+    }
+
 @router.get("/solicitudes", response_model=List[SolicitudResponse])
-async def listar_solicitudes(current_user: Dict = Depends(get_current_user)):
-    """Lista todas las solicitudes con datos anonimizados"""
+async def listar_solicitudes(
+    request: Request,
+    estado: Optional[EstadoSolicitud] = None,
+    limit: int = Query(1000, ge=1, le=1000),
+    current_user: Dict = Depends(get_current_user)
+):
+    """Lista las solicitudes (opcionalmente de un estado) con datos anonimizados"""
     if current_user["role"] != "subdecano":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    solicitudes = await solicitudes_collection.find().sort("fecha_creacion", -1).to_list(length=1000)
+    # Del primario: el frontend lo vuelve a pedir justo después de cambiar un estado
+    solicitudes = await find_list(
+        routed(solicitudes_collection, "primary"), {"estado": estado.value} if estado else {}, SOLICITUD_LISTA,
+        sort=[("fecha_creacion", -1)], limit=limit, length=limit
+    )
     
+    # Una sola consulta para las materias de todo el listado
+    materias = await find_by_ids(
+        routed(materias_collection, "primary"), (sol["materia_id"] for sol in solicitudes), MATERIA_NOMBRE
+    )
     resultado = []
     for sol in solicitudes:
-        materia = await materias_collection.find_one({"_id": sol["materia_id"]})
-        docente = await docentes_collection.find_one({"_id": sol["docente_id"]})
+        materia = materias.get(str(sol["materia_id"]))
         
-        resultado.append(SolicitudResponse(
-            id=str(sol["_id"]),
-            estudiante_id=str(sol["estudiante_id"]),
-            estudiante_nombre_anonimo=sol.get("estudiante_nombre_anonimo", "Anónimo"),
-            materia_id=str(sol["materia_id"]),
-            materia_nombre=materia["nombre"] if materia else "Desconocida",
-            docente_id=str(sol["docente_id"]),
-            docente_nombre_anonimo=sol.get("docente_nombre_anonimo", "Anónimo"),
-            grupo=sol["grupo"],
-            aporte=sol["aporte"],
-            calificacion_actual=sol.get("calificacion_actual", 0),
-            motivo=sol.get("motivo", ""),
-            estado=sol["estado"],
-            fecha_creacion=sol["fecha_creacion"],
-            fecha_actualizacion=sol["fecha_actualizacion"]
-        ))
+        resultado.append({
+            "id": str(sol["_id"]),
+            "estudiante_id": str(sol["estudiante_id"]),
+            "estudiante_nombre_anonimo": sol.get("estudiante_nombre_anonimo", "Anónimo"),
+            "materia_id": str(sol["materia_id"]),
+            "materia_nombre": materia["nombre"] if materia else "Desconocida",
+            "docente_id": str(sol["docente_id"]),
+            "docente_nombre_anonimo": sol.get("docente_nombre_anonimo", "Anónimo"),
+            "grupo": sol["grupo"],
+            "aporte": sol["aporte"],
+            "calificacion_actual": sol.get("calificacion_actual", 0),
+            "motivo": sol.get("motivo", ""),
+            "estado": sol["estado"],
+            "fecha_creacion": sol["fecha_creacion"],
+            "fecha_actualizacion": sol["fecha_actualizacion"]
+        })
     
-    return resultado
+    return model_rows(request, resultado, SolicitudResponse)
 
 @router.put("/solicitudes/{solicitud_id}/estado")
 async def actualizar_estado_solicitud(
@@ -327,7 +482,7 @@ async def actualizar_estado_solicitud(
     if current_user["role"] != "subdecano":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    solicitud = await solicitudes_collection.find_one({"_id": ObjectId(solicitud_id)})
+    solicitud = await find_one(solicitudes_collection, {"_id": ObjectId(solicitud_id)}, SOLICITUD_PARTES)
     if not solicitud:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada")
     
@@ -345,23 +500,16 @@ async def actualizar_estado_solicitud(
     
     # Si se aprueba, asignar AUTOMÁTICAMENTE un docente aleatorio
     if estado == "aprobada":
-        print(f"\n🎲 ASIGNACIÓN AUTOMÁTICA DE DOCENTE:")
-        print(f"   Solicitud ID: {solicitud_id}")
-        print(f"   Materia ID: {solicitud['materia_id']}")
-        print(f"   Docente Original: {solicitud['docente_id']}")
-        
         # Buscar TODOS los docentes disponibles (NO el docente original, Y QUE ESTÉN ACTIVOS)
         # Ya no se requiere que sea la misma materia
         import random
-        docentes_disponibles = await docentes_collection.find({
+        docentes_disponibles = await find_list(docentes_collection, {
             "_id": {"$ne": solicitud["docente_id"]},
             "$or": [
                 {"activo": True},
                 {"activo": {"$exists": False}}  # Si no tienen el campo, asumir que están activos
             ]
-        }).to_list(length=100)
-        
-        print(f"   👥 Docentes disponibles en la carrera: {len(docentes_disponibles)}")
+        }, DOCENTE_NOMBRE, length=100)
         
         if not docentes_disponibles:
             raise HTTPException(
@@ -371,12 +519,31 @@ async def actualizar_estado_solicitud(
         
         # Seleccionar uno ALEATORIO
         docente_seleccionado = random.choice(docentes_disponibles)
-        print(f"   ✅ Docente asignado aleatoriamente: {docente_seleccionado['nombre']}")
+        logger.info("Docente recalificador asignado", extra={
+            "solicitud_id": solicitud_id,
+            "docente_original_id": solicitud["docente_id"],
+            "docente_recalificador_id": docente_seleccionado["_id"],
+            "docentes_disponibles": len(docentes_disponibles),
+        })
         
         update_data["docente_recalificador_id"] = docente_seleccionado["_id"]
         update_data["estado"] = "en_revision"
         update_data["fecha_asignacion"] = datetime.utcnow()
-        
+    
+    # Condicionado al estado leído: otra petición pudo cambiarla entretanto
+    anterior = await solicitudes_collection.find_one_and_update(
+        {"_id": ObjectId(solicitud_id), "estado": solicitud.get("estado")},
+        {"$set": update_data},
+        projection=SOLICITUD_TRANSICION.spec
+    )
+    if anterior is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La solicitud cambió de estado, recarga e intenta de nuevo")
+    await record_transition(
+        anterior["materia_id"], anterior["estado"], update_data["estado"],
+        anterior.get("fecha_creacion"), update_data["fecha_actualizacion"]
+    )
+    
+    if estado == "aprobada":
         # Notificar al docente recalificador
         await mensajes_collection.insert_one({
             "destinatario_id": docente_seleccionado["_id"],
@@ -388,11 +555,6 @@ async def actualizar_estado_solicitud(
             "fecha_envio": datetime.utcnow()
         })
     
-    await solicitudes_collection.update_one(
-        {"_id": ObjectId(solicitud_id)},
-        {"$set": update_data}
-    )
-    
     # Notificar al estudiante
     if estado == "aprobada":
         mensaje_contenido = "Tu solicitud ha sido aprobada y se ha asignado automáticamente a un docente para su revisión."
@@ -425,7 +587,7 @@ async def crear_materia(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
     # Validar que código no exista
-    existe = await materias_collection.find_one({"codigo": materia.codigo})
+    existe = await find_one(materias_collection, {"codigo": materia.codigo}, SOLO_ID)
     if existe:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El código de materia ya existe")
     
@@ -435,6 +597,7 @@ async def crear_materia(
     }
     
     result = await materias_collection.insert_one(nueva_materia)
+    await bump("materias")
     
     return MateriaResponse(
         id=str(result.inserted_id),
@@ -444,22 +607,30 @@ async def crear_materia(
     )
 
 @router.get("/materias", response_model=List[MateriaResponse])
-async def listar_materias(current_user: Dict = Depends(get_current_user)):
-    """Lista todas las materias"""
+async def listar_materias(request: Request, response: Response, current_user: Dict = Depends(get_current_user)):
+    """Lista todas las materias (con ETag: un If-None-Match vigente recibe 304)"""
     if current_user["role"] != "subdecano":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    materias = await materias_collection.find().sort("codigo", 1).to_list(length=1000)
+    cache = await conditional(request, response, "materias")
+    if cache.not_modified:
+        return cache.not_modified_response()
     
-    return [
-        MateriaResponse(
-            id=str(mat["_id"]),
-            nombre=mat["nombre"],
-            codigo=mat["codigo"],
-            descripcion=mat.get("descripcion")
-        )
+    # Del primario: el ETag es la versión recién escrita y el cuerpo tiene que estar al día con ella
+    materias = await find_list(
+        routed(materias_collection, "primary"), {}, MATERIA_CATALOGO,
+        sort=[("codigo", 1)], length=1000
+    )
+    
+    return cache.apply(model_rows(request, [
+        {
+            "id": str(mat["_id"]),
+            "nombre": mat["nombre"],
+            "codigo": mat["codigo"],
+            "descripcion": mat.get("descripcion")
+        }
         for mat in materias
-    ]
+    ], MateriaResponse))
 
 @router.get("/materias/{materia_id}", response_model=MateriaResponse)
 async def obtener_materia(
@@ -470,7 +641,7 @@ async def obtener_materia(
     if current_user["role"] != "subdecano":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    materia = await materias_collection.find_one({"_id": ObjectId(materia_id)})
+    materia = await find_one(materias_collection, {"_id": ObjectId(materia_id)}, MATERIA_CATALOGO)
     if not materia:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Materia no encontrada")
     
@@ -491,7 +662,7 @@ async def actualizar_materia(
     if current_user["role"] != "subdecano":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    materia = await materias_collection.find_one({"_id": ObjectId(materia_id)})
+    materia = await find_one(materias_collection, {"_id": ObjectId(materia_id)}, SOLO_ID)
     if not materia:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Materia no encontrada")
     
@@ -514,6 +685,8 @@ async def actualizar_materia(
     if result.matched_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Materia no encontrada")
     
+    await bump("materias")
+    
     return {"message": "Materia actualizada exitosamente"}
 
 @router.delete("/materias/{materia_id}")
@@ -538,6 +711,8 @@ async def eliminar_materia(
     if result.deleted_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Materia no encontrada")
     
+    await bump("materias")
+    
     return {"message": "Materia eliminada exitosamente"}
 
 # =============== ASIGNACIÓN DE DOCENTES RECALIFICADORES ===============
@@ -552,39 +727,32 @@ async def obtener_docentes_disponibles(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
     # Obtener la solicitud
-    solicitud = await solicitudes_collection.find_one({"_id": ObjectId(solicitud_id)})
+    solicitud = await find_one(solicitudes_collection, {"_id": ObjectId(solicitud_id)}, SOLICITUD_PARTES)
     if not solicitud:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada")
     
-    print(f"\n🔍 DEBUG DOCENTES DISPONIBLES:")
-    print(f"   Solicitud ID: {solicitud_id}")
-    print(f"   Materia ID: {solicitud['materia_id']}")
-    print(f"   Docente Original ID: {solicitud['docente_id']}")
-    
     # Buscar TODOS los docentes EXCEPTO el docente original Y QUE ESTÉN ACTIVOS
     # Ya no se requiere que tengan la misma materia asignada
-    docentes = await docentes_collection.find({
+    docentes = await find_list(docentes_collection, {
         "_id": {"$ne": solicitud["docente_id"]},  # Excluir docente original
         "$or": [
             {"activo": True},
             {"activo": {"$exists": False}}  # Si no tienen el campo, asumir que están activos
         ]
-    }).to_list(length=100)
+    }, DOCENTE_DISPONIBLE, length=100)
     
-    print(f"   👥 Docentes disponibles en la carrera: {len(docentes)}")
+    logger.debug("Docentes disponibles", extra={"solicitud_id": solicitud_id, "total": len(docentes)})
+    
+    # Nombres de las materias de todos los docentes en una sola consulta
+    materias = await find_by_ids(
+        materias_collection, {m_id for doc in docentes for m_id in doc.get("materias") or []}, MATERIA_NOMBRE
+    )
     
     resultado = []
     for doc in docentes:
-        # Obtener nombres de las materias asignadas
-        materias_nombres = []
-        if doc.get("materias"):
-            for materia_id_str in doc["materias"]:
-                try:
-                    materia = await materias_collection.find_one({"_id": materia_id_str})
-                    if materia:
-                        materias_nombres.append(materia["nombre"])
-                except:
-                    pass
+        materias_nombres = [
+            materias[str(m_id)]["nombre"] for m_id in doc.get("materias") or [] if str(m_id) in materias
+        ]
         
         resultado.append({
             "id": str(doc["_id"]),
@@ -610,7 +778,7 @@ async def asignar_docente_recalificador(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ID del docente requerido")
     
     # Obtener la solicitud
-    solicitud = await solicitudes_collection.find_one({"_id": ObjectId(solicitud_id)})
+    solicitud = await find_one(solicitudes_collection, {"_id": ObjectId(solicitud_id)}, SOLICITUD_PARTES)
     if not solicitud:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada")
     
@@ -622,7 +790,7 @@ async def asignar_docente_recalificador(
         )
     
     # Verificar que el docente tenga esta materia asignada
-    docente = await docentes_collection.find_one({"_id": docente_recalificador_id})
+    docente = await find_one(docentes_collection, {"_id": docente_recalificador_id}, DOCENTE_ASIGNACION)
     if not docente:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Docente no encontrado")
     
@@ -640,16 +808,21 @@ async def asignar_docente_recalificador(
         )
     
     # Actualizar la solicitud
-    await solicitudes_collection.update_one(
-        {"_id": ObjectId(solicitud_id)},
+    anterior = await solicitudes_collection.find_one_and_update(
+        # Condicionado al estado leído: otra petición pudo cambiarla entretanto
+        {"_id": ObjectId(solicitud_id), "estado": solicitud.get("estado")},
         {
             "$set": {
                 "docente_recalificador_id": docente_recalificador_id,
                 "estado": "en_revision",
                 "fecha_asignacion": datetime.utcnow()
             }
-        }
+        },
+        projection=SOLICITUD_TRANSICION.spec
     )
+    if anterior is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La solicitud cambió de estado, recarga e intenta de nuevo")
+    await record_transition(anterior["materia_id"], anterior["estado"], "en_revision")
     
     # Notificar al docente recalificador
     await mensajes_collection.insert_one({
@@ -685,7 +858,10 @@ async def listar_solicitudes_reset(current_user: Dict = Depends(get_current_user
     
     from database import reset_password_collection
     
-    solicitudes = await reset_password_collection.find().sort("fecha_solicitud", -1).to_list(length=1000)
+    solicitudes = await find_list(
+        routed(reset_password_collection, "primary"), {}, RESET_LISTA,
+        sort=[("fecha_solicitud", -1)], length=1000
+    )
     
     return [
         {
@@ -713,7 +889,7 @@ async def generar_password_reset(
     import string
     
     # Obtener la solicitud
-    solicitud = await reset_password_collection.find_one({"_id": ObjectId(solicitud_id)})
+    solicitud = await find_one(reset_password_collection, {"_id": ObjectId(solicitud_id)}, RESET_USUARIO)
     if not solicitud:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada")
     
@@ -769,30 +945,52 @@ async def generar_password_reset(
 # =============== LOGS DEL SISTEMA ===============
 
 from models.schemas import LogResponse
+from utils.audit_store import MAX_PAGE_SIZE, query_logs
 
 @router.get("/logs", response_model=List[LogResponse])
 async def obtener_logs(
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    usuario_id: Optional[str] = None,
+    rol: Optional[str] = None,
+    accion: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_user: Dict = Depends(get_current_user)
 ):
-    """Obtiene los logs del sistema (últimos 100 por defecto)"""
+    """
+    Obtiene los logs del sistema, más recientes primero (100 por defecto).
+
+    Filtros opcionales por usuario, rol, acción y rango [desde, hasta). Si hay
+    más resultados, el header X-Next-Cursor trae el cursor de la página
+    siguiente (se pasa tal cual en ?cursor=).
+    """
     if current_user["role"] != "subdecano":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    from database import logs_collection
-    
-    logs = await logs_collection.find().sort("fecha", -1).limit(limit).to_list(length=limit)
+    try:
+        logs, next_cursor = await query_logs(
+            LOG, limit=limit, cursor=cursor,
+            usuario_id=usuario_id, rol=rol, accion=accion, desde=desde, hasta=hasta
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     
     resultado = []
     for log in logs:
-        resultado.append(LogResponse(
-            id=str(log["_id"]),
-            usuario_id=log["usuario_id"],
-            rol=log["rol"],
-            accion=log["accion"],
-            detalle=log.get("detalle"),
-            fecha=log["fecha"],
-            ip=log.get("ip")
-        ))
+        resultado.append({
+            "id": str(log["_id"]),
+            "usuario_id": log["usuario_id"],
+            "rol": log["rol"],
+            "accion": log["accion"],
+            "detalle": log.get("detalle"),
+            "fecha": log["fecha"],
+            "ip": log.get("ip")
+        })
     
-    return resultado
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    if headers:
+        response.headers.update(headers)
+    return model_rows(request, resultado, LogResponse, headers=headers)
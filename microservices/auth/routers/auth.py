@@ -9,9 +9,14 @@ from utils.encryption import verify_password, decrypt_data, hash_password
 from utils.auth import create_access_token, get_current_user
 from config import settings
 from utils.logger import log_action
+from utils.queries import Projection, find_one
 
 router = APIRouter(prefix="/api/auth", tags=["Autenticación"])
 
+# Proyecciones: campos que lee cada handler
+CREDENCIALES = Projection("email", "password", "activo", "primer_login")
+SOLO_ID = Projection()
+
 @router.post("/login", response_model=LoginResponse)
 @limiter.limit("5/minute")
 async def login(login_data: LoginRequest, request: Request, response: Response):
@@ -31,7 +36,7 @@ async def login(login_data: LoginRequest, request: Request, response: Response):
         )
     
     # Buscar usuario por email
-    user = await collection.find_one({"email": login_data.email})
+    user = await find_one(collection, {"email": login_data.email}, CREDENCIALES)
     
     if not user or not verify_password(login_data.password, user["password"]):
         raise HTTPException(
@@ -151,17 +156,17 @@ async def solicitar_reset_password(datos: SolicitudResetPassword, request: Reque
     rol = None
     
     # Buscar en estudiantes
-    user = await estudiantes_collection.find_one({"email": datos.email})
+    user = await find_one(estudiantes_collection, {"email": datos.email}, SOLO_ID)
     if user:
         rol = "estudiante"
     else:
         # Buscar en docentes
-        user = await docentes_collection.find_one({"email": datos.email})
+        user = await find_one(docentes_collection, {"email": datos.email}, SOLO_ID)
         if user:
             rol = "docente"
         else:
             # Buscar en subdecanos
-            user = await subdecanos_collection.find_one({"email": datos.email})
+            user = await find_one(subdecanos_collection, {"email": datos.email}, SOLO_ID)
             if user:
                 rol = "subdecano"
     
@@ -170,10 +175,10 @@ async def solicitar_reset_password(datos: SolicitudResetPassword, request: Reque
         return {"message": "Si el email existe, se enviará una solicitud al subdecano"}
     
     # Verificar si ya existe una solicitud pendiente
-    solicitud_pendiente = await reset_password_collection.find_one({
+    solicitud_pendiente = await find_one(reset_password_collection, {
         "email": datos.email,
         "estado": "pendiente"
-    })
+    }, SOLO_ID)
     
     if solicitud_pendiente:
         return {"message": "Ya existe una solicitud pendiente para este email"}
@@ -3,15 +3,21 @@ from database import (
     subdecanos_collection,
     docentes_collection,
     estudiantes_collection,
-    materias_collection
+    materias_collection,
+    meta_collection
 )
-from passlib.context import CryptContext
 from datetime import datetime
 from bson import ObjectId
 
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+# Subir este número cuando cambien los datos sembrados: el arranque solo siembra
+# si el marcador guardado en la colección meta es menor.
+SEED_VERSION = 1
 
 async def seed_data():
+    marcador = await meta_collection.find_one({"_id": "seed"}, {"version": 1})
+    if marcador and marcador.get("version", 0) >= SEED_VERSION:
+        return
+
     print("🌱 Iniciando proceso de siembra de base de datos con nuevos formatos...")
 
     # ==========================================
@@ -21,17 +27,21 @@ async def seed_data():
     # o usamos uno específico si se desea. En el screenshot tiene un ObjectId.
     subdecano_data = {
         "email": "admin@blindcheck.edu",
-        "password": pwd_context.hash("Admin2026!"),
         "nombre": "Administrador",
         "apellido": "BlindCheck",
         "cedula": "1700000001",
-        "fecha_registro": datetime.utcnow()
     }
     
-    # Buscamos por email para no duplicar
-    existing_sub = await subdecanos_collection.find_one({"email": subdecano_data["email"]})
+    # Buscamos por email para no duplicar. La contraseña solo se hashea (bcrypt)
+    # al crear la cuenta: una re-siembra no pisa una contraseña ya cambiada.
+    existing_sub = await subdecanos_collection.find_one({"email": subdecano_data["email"]}, {"_id": 1})
     if not existing_sub:
-        await subdecanos_collection.insert_one(subdecano_data)
+        from utils.encryption import hash_password
+        await subdecanos_collection.insert_one({
+            **subdecano_data,
+            "password": hash_password("Admin2026!"),
+            "fecha_registro": datetime.utcnow()
+        })
         print("✅ Subdecano creado: admin@blindcheck.edu")
     else:
         await subdecanos_collection.update_one(
@@ -40,7 +50,12 @@ async def seed_data():
         )
         print("ℹ️ Subdecano actualizado: admin@blindcheck.edu")
 
+    await meta_collection.update_one(
+        {"_id": "seed"},
+        {"$set": {"version": SEED_VERSION, "fecha": datetime.utcnow()}},
+        upsert=True
+    )
     print("🏁 Datos actualizados con éxito según los nuevos formatos.")
 
 if __name__ == "__main__":
-    asyncio.run(seed_data())
\ No newline at end of file
+    asyncio.run(seed_data())
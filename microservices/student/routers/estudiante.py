@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+import logging
+from fastapi import APIRouter, HTTPException, Depends, status, Request, Response
 from typing import List, Dict
 from bson import ObjectId
 from datetime import datetime
@@ -10,31 +11,67 @@ from models.schemas import (
 from database import (
     solicitudes_collection, estudiantes_collection, 
     mensajes_collection, materias_collection, calificaciones_collection,
-    docentes_collection, evidencias_collection
+    docentes_collection, evidencias_collection,
+    routed
 )
 from utils.auth import get_current_user
 from utils.logger import log_action
 from utils.encryption import anonymize_name, anonymize_profesor
+from utils.responses import model_rows
+from utils.queries import Projection, find_one, find_list, find_by_ids
+from utils.stats import record_transition
+from utils.search import refresh_search_key
+from utils.etags import bump, conditional
+from utils.downloads import send_upload
 
 router = APIRouter(prefix="/api/estudiante", tags=["Estudiante"])
+logger = logging.getLogger(__name__)
+
+# Proyecciones: campos que lee cada handler
+PERFIL = Projection("email", "nombre", "carrera", "fecha_registro")
+ESTUDIANTE_NOMBRE = Projection("nombre")
+ESTUDIANTE_MATERIAS = Projection("materias_cursando")
+SOLO_ID = Projection()
+MATERIA_NOMBRE = Projection("nombre")
+MATERIA_CATALOGO = Projection("nombre", "codigo", "descripcion")
+DOCENTE_NOMBRE = Projection("nombre")
+DOCENTE_CATALOGO = Projection("nombre", "materias")
+SOLICITUD_LISTA = Projection(
+    "estudiante_id", "estudiante_nombre_anonimo", "materia_id", "docente_id",
+    "docente_nombre_anonimo", "grupo", "aporte", "calificacion_actual", "motivo",
+    "estado", "fecha_creacion", "fecha_actualizacion", "calificacion_nueva",
+    "comentario_docente", "motivo_rechazo"
+)
+SOLICITUD_DETALLE = Projection(
+    "estudiante_id", "materia_id", "grupo", "aporte", "mensaje", "evidencia_url",
+    "estado", "fecha_creacion", "fecha_actualizacion", "motivo_rechazo"
+)
+CALIFICACION = Projection("docente_id", "nota", "comentario", "fecha_calificacion")
+MENSAJE = Projection("destinatario_id", "remitente", "asunto", "contenido", "tipo", "leido", "fecha_envio")
+EVIDENCIA_ARCHIVO = Projection("archivo_url", "content_type")
+EVIDENCIA_OPCION = Projection("docente_id", "materia_id", "grupo", "aporte", "archivo_url")
 
 @router.get("/perfil", response_model=EstudianteResponse)
-async def get_perfil(current_user: Dict = Depends(get_current_user)):
-    """Obtiene el perfil del estudiante actual"""
+async def get_perfil(request: Request, response: Response, current_user: Dict = Depends(get_current_user)):
+    """Obtiene el perfil del estudiante actual (con ETag: un If-None-Match vigente recibe 304)"""
     if current_user["role"] != "estudiante":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    estudiante = await estudiantes_collection.find_one({"_id": current_user["user_id"]})
+    cache = await conditional(request, response, f"estudiante:{current_user['user_id']}")
+    if cache.not_modified:
+        return cache.not_modified_response()
+    
+    estudiante = await find_one(estudiantes_collection, {"_id": current_user["user_id"]}, PERFIL)
     if not estudiante:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Estudiante no encontrado")
     
-    return EstudianteResponse(
+    return cache.apply(EstudianteResponse(
         id=str(estudiante["_id"]),
         email=estudiante["email"],
         nombre=estudiante["nombre"],
         carrera=estudiante["carrera"],
         fecha_registro=estudiante["fecha_registro"]
-    )
+    ))
 
 @router.put("/perfil", response_model=EstudianteResponse)
 async def actualizar_perfil(
@@ -52,8 +89,11 @@ async def actualizar_perfil(
             {"_id": current_user["user_id"]},
             {"$set": update_data}
         )
+        if "nombre" in update_data or "email" in update_data:
+            await refresh_search_key(estudiantes_collection, current_user["user_id"])
+        await bump(f"estudiante:{current_user['user_id']}")
     
-    estudiante = await estudiantes_collection.find_one({"_id": current_user["user_id"]})
+    estudiante = await find_one(estudiantes_collection, {"_id": current_user["user_id"]}, PERFIL)
     
     return EstudianteResponse(
         id=str(estudiante["_id"]),
@@ -75,37 +115,36 @@ async def crear_solicitud(
     # Verificar que la materia existe (convertir a ObjectId)
     try:
         materia_oid = ObjectId(solicitud.materia_id)
-        materia = await materias_collection.find_one({"_id": materia_oid})
+        materia = await find_one(materias_collection, {"_id": materia_oid}, MATERIA_NOMBRE)
     except:
-        materia = await materias_collection.find_one({"_id": solicitud.materia_id})
+        materia = await find_one(materias_collection, {"_id": solicitud.materia_id}, MATERIA_NOMBRE)
     
     if not materia:
-        # Debug para ver por qué falla
-        print(f"❌ Materia no encontrada: {solicitud.materia_id}")
+        logger.info("Solicitud con materia inexistente", extra={"materia_id": solicitud.materia_id})
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Materia no encontrada")
     
     # Verificar que el docente existe
     # Los docentes pueden tener ID string (DOC123) o ObjectId
-    docente = await docentes_collection.find_one({"_id": solicitud.docente_id})
+    docente = await find_one(docentes_collection, {"_id": solicitud.docente_id}, DOCENTE_NOMBRE)
     if not docente:
         # Intentar con ObjectId por si acaso
         try:
-             docente = await docentes_collection.find_one({"_id": ObjectId(solicitud.docente_id)})
+             docente = await find_one(docentes_collection, {"_id": ObjectId(solicitud.docente_id)}, DOCENTE_NOMBRE)
         except:
              pass
              
     if not docente:
-        print(f"❌ Docente no encontrado: {solicitud.docente_id}")
+        logger.info("Solicitud con docente inexistente", extra={"docente_id": solicitud.docente_id})
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Docente no encontrado")
     
     # ✅ VALIDACIÓN CRÍTICA: Verificar que exista una evidencia subida para esta combinación
     # docente_id, materia_id, grupo, aporte
-    evidencia = await evidencias_collection.find_one({
+    evidencia = await find_one(evidencias_collection, {
         "docente_id": solicitud.docente_id,
         "materia_id": solicitud.materia_id,
         "grupo": solicitud.grupo,
         "aporte": solicitud.aporte
-    })
+    }, SOLO_ID)
     
     if not evidencia:
         raise HTTPException(
@@ -114,7 +153,7 @@ async def crear_solicitud(
         )
     
     # Obtener datos del estudiante para anonimización
-    estudiante = await estudiantes_collection.find_one({"_id": current_user["user_id"]})
+    estudiante = await find_one(estudiantes_collection, {"_id": current_user["user_id"]}, ESTUDIANTE_NOMBRE)
     
     nueva_solicitud = {
         "estudiante_id": current_user["user_id"],
@@ -132,6 +171,9 @@ async def crear_solicitud(
     }
     
     result = await solicitudes_collection.insert_one(nueva_solicitud)
+    await record_transition(
+        solicitud.materia_id, None, EstadoSolicitud.PENDIENTE, nueva_solicitud["fecha_creacion"]
+    )
     
     # Crear notificación
     await mensajes_collection.insert_one({
@@ -170,66 +212,47 @@ async def crear_solicitud(
     )
 
 @router.get("/solicitudes", response_model=List[SolicitudResponse])
-async def listar_solicitudes(current_user: Dict = Depends(get_current_user)):
+async def listar_solicitudes(request: Request, current_user: Dict = Depends(get_current_user)):
     """Lista todas las solicitudes del estudiante"""
     if current_user["role"] != "estudiante":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    solicitudes = await solicitudes_collection.find(
-        {"estudiante_id": current_user["user_id"]}
-    ).sort("fecha_creacion", -1).to_list(length=100)
+    solicitudes = await find_list(
+        solicitudes_collection,
+        {"estudiante_id": current_user["user_id"]},
+        SOLICITUD_LISTA,
+        sort=[("fecha_creacion", -1)],
+        length=100
+    )
+    
+    # Una sola consulta para todas las materias (el _id puede ser string u ObjectId)
+    materias = await find_by_ids(materias_collection, (sol["materia_id"] for sol in solicitudes), MATERIA_NOMBRE)
     
     resultado = []
     for sol in solicitudes:
-        # Buscar materia - puede ser string o ObjectId
-        materia_id = sol["materia_id"]
-        print(f"🔍 DEBUG: Buscando materia con ID: {materia_id} (tipo: {type(materia_id)})")
-        
-        # Intentar buscar como está
-        materia = await materias_collection.find_one({"_id": materia_id})
-        
-        # Si no se encuentra y es string, intentar como ObjectId
-        if not materia and isinstance(materia_id, str):
-            try:
-                materia = await materias_collection.find_one({"_id": ObjectId(materia_id)})
-                print(f"   ✅ Materia encontrada como ObjectId")
-            except:
-                print(f"   ❌ No se pudo convertir a ObjectId")
-        
-        # Si no se encuentra y es ObjectId, intentar como string
-        if not materia and isinstance(materia_id, ObjectId):
-            materia = await materias_collection.find_one({"_id": str(materia_id)})
-            if materia:
-                print(f"   ✅ Materia encontrada como string")
+        materia = materias.get(str(sol["materia_id"]))
         
-        if materia:
-            print(f"   ✅ Materia encontrada: {materia['nombre']}")
-        else:
-            print(f"   ❌ Materia NO encontrada")
-        
-        docente = await docentes_collection.find_one({"_id": sol["docente_id"]})
-        
-        resultado.append(SolicitudResponse(
-            id=str(sol["_id"]),
-            estudiante_id=str(sol["estudiante_id"]),
-            estudiante_nombre_anonimo=sol.get("estudiante_nombre_anonimo", "Anónimo"),
-            materia_id=str(sol["materia_id"]),
-            materia_nombre=materia["nombre"] if materia else "Desconocida",
-            docente_id=str(sol["docente_id"]),
-            docente_nombre_anonimo=sol.get("docente_nombre_anonimo", "Anónimo"),
-            grupo=sol["grupo"],
-            aporte=sol["aporte"],
-            calificacion_actual=sol.get("calificacion_actual", 0),
-            motivo=sol.get("motivo", ""),
-            estado=sol["estado"],
-            fecha_creacion=sol["fecha_creacion"],
-            fecha_actualizacion=sol["fecha_actualizacion"],
-            calificacion_nueva=sol.get("calificacion_nueva"),
-            comentario_docente=sol.get("comentario_docente"),
-            motivo_rechazo=sol.get("motivo_rechazo")
-        ))
-    
-    return resultado
+        resultado.append({
+            "id": str(sol["_id"]),
+            "estudiante_id": str(sol["estudiante_id"]),
+            "estudiante_nombre_anonimo": sol.get("estudiante_nombre_anonimo", "Anónimo"),
+            "materia_id": str(sol["materia_id"]),
+            "materia_nombre": materia["nombre"] if materia else "Desconocida",
+            "docente_id": str(sol["docente_id"]),
+            "docente_nombre_anonimo": sol.get("docente_nombre_anonimo", "Anónimo"),
+            "grupo": sol["grupo"],
+            "aporte": sol["aporte"],
+            "calificacion_actual": sol.get("calificacion_actual", 0),
+            "motivo": sol.get("motivo", ""),
+            "estado": sol["estado"],
+            "fecha_creacion": sol["fecha_creacion"],
+            "fecha_actualizacion": sol["fecha_actualizacion"],
+            "calificacion_nueva": sol.get("calificacion_nueva"),
+            "comentario_docente": sol.get("comentario_docente"),
+            "motivo_rechazo": sol.get("motivo_rechazo")
+        })
+    
+    return model_rows(request, resultado, SolicitudResponse)
 
 @router.get("/solicitudes/{solicitud_id}", response_model=SolicitudResponse)
 async def obtener_solicitud(
@@ -240,23 +263,26 @@ async def obtener_solicitud(
     if current_user["role"] != "estudiante":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    solicitud = await solicitudes_collection.find_one({
+    solicitud = await find_one(solicitudes_collection, {
         "_id": ObjectId(solicitud_id),
         "estudiante_id": current_user["user_id"]
-    })
+    }, SOLICITUD_DETALLE)
     
     if not solicitud:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada")
     
-    materia = await materias_collection.find_one({"_id": solicitud["materia_id"]})
+    materia = await find_one(materias_collection, {"_id": solicitud["materia_id"]}, MATERIA_NOMBRE)
     
     # Obtener calificaciones
     calificaciones = []
     nota_final = None
     
-    califs = await calificaciones_collection.find(
-        {"solicitud_id": ObjectId(solicitud_id)}
-    ).to_list(length=10)
+    califs = await find_list(
+        calificaciones_collection,
+        {"solicitud_id": ObjectId(solicitud_id)},
+        CALIFICACION,
+        length=10
+    )
     
     for calif in califs:
         calificaciones.append({
@@ -288,28 +314,32 @@ async def obtener_solicitud(
     )
 
 @router.get("/mensajes", response_model=List[MensajeResponse])
-async def listar_mensajes(current_user: Dict = Depends(get_current_user)):
+async def listar_mensajes(request: Request, current_user: Dict = Depends(get_current_user)):
     """Lista todos los mensajes del estudiante"""
     if current_user["role"] != "estudiante":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    mensajes = await mensajes_collection.find(
-        {"destinatario_id": current_user["user_id"]}
-    ).sort("fecha_envio", -1).to_list(length=100)
-    
-    return [
-        MensajeResponse(
-            id=str(msg["_id"]),
-            destinatario_id=str(msg["destinatario_id"]),
-            remitente=msg["remitente"],
-            asunto=msg["asunto"],
-            contenido=msg["contenido"],
-            tipo=msg["tipo"],
-            leido=msg["leido"],
-            fecha_envio=msg["fecha_envio"]
-        )
+    mensajes = await find_list(
+        mensajes_collection,
+        {"destinatario_id": current_user["user_id"]},
+        MENSAJE,
+        sort=[("fecha_envio", -1)],
+        length=100
+    )
+    
+    return model_rows(request, [
+        {
+            "id": str(msg["_id"]),
+            "destinatario_id": str(msg["destinatario_id"]),
+            "remitente": msg["remitente"],
+            "asunto": msg["asunto"],
+            "contenido": msg["contenido"],
+            "tipo": msg["tipo"],
+            "leido": msg["leido"],
+            "fecha_envio": msg["fecha_envio"]
+        }
         for msg in mensajes
-    ]
+    ], MensajeResponse)
 
 @router.put("/mensajes/{mensaje_id}/leer")
 async def marcar_mensaje_leido(
@@ -336,37 +366,44 @@ async def marcar_mensaje_leido(
 # =============== DATOS AUXILIARES ===============
 
 @router.get("/materias")
-async def obtener_materias(current_user: Dict = Depends(get_current_user)):
-    """Obtiene las materias que está cursando el estudiante"""
+async def obtener_materias(request: Request, response: Response, current_user: Dict = Depends(get_current_user)):
+    """Obtiene las materias que está cursando el estudiante (con ETag)"""
     if current_user["role"] != "estudiante":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    print(f"\n📚 DEBUG MATERIAS ESTUDIANTE:")
-    print(f"   Estudiante ID: {current_user['user_id']}")
+    # Depende del catálogo y de las materias_cursando del estudiante
+    cache = await conditional(request, response, "materias", f"estudiante:{current_user['user_id']}")
+    if cache.not_modified:
+        return cache.not_modified_response()
     
     # Obtener el estudiante
-    estudiante = await estudiantes_collection.find_one({"_id": current_user["user_id"]})
+    estudiante = await find_one(estudiantes_collection, {"_id": current_user["user_id"]}, ESTUDIANTE_MATERIAS)
     if not estudiante:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Estudiante no encontrado")
     
     materias_cursando = estudiante.get("materias_cursando", [])
-    print(f"   Materias cursando: {materias_cursando}")
     
     if not materias_cursando:
-        print(f"   ⚠️ Estudiante no tiene materias asignadas")
-        return []
+        logger.debug("Estudiante sin materias asignadas", extra={"estudiante_id": current_user["user_id"]})
+        return cache.apply([])
     
     # Los IDs en MongoDB son strings como 'CS-301', no ObjectIds
-    print(f"   IDs a buscar: {materias_cursando}")
     
     # Obtener solo las materias que está cursando
-    materias = await materias_collection.find(
-        {"_id": {"$in": materias_cursando}}
-    ).to_list(100)
+    materias = await find_list(
+        materias_collection,
+        {"_id": {"$in": materias_cursando}},
+        MATERIA_CATALOGO,
+        length=100
+    )
     
-    print(f"   Materias encontradas: {len(materias)}")
+    logger.debug("Materias del estudiante", extra={
+        "estudiante_id": current_user["user_id"],
+        "solicitadas": len(materias_cursando),
+        "encontradas": len(materias),
+    })
     
-    return [
+    return cache.apply([
         {
             "id": str(mat["_id"]),
             "nombre": mat["nombre"],
@@ -374,24 +411,29 @@ async def obtener_materias(current_user: Dict = Depends(get_current_user)):
             "descripcion": mat.get("descripcion", "")
         }
         for mat in materias
-    ]
+    ])
 
 @router.get("/docentes")
-async def obtener_docentes(current_user: Dict = Depends(get_current_user)):
-    """Obtiene todos los docentes disponibles con sus materias asignadas"""
+async def obtener_docentes(request: Request, response: Response, current_user: Dict = Depends(get_current_user)):
+    """Obtiene todos los docentes disponibles con sus materias asignadas (con ETag)"""
     if current_user["role"] != "estudiante":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    docentes = await docentes_collection.find().to_list(100)
+    cache = await conditional(request, response, "docentes")
+    if cache.not_modified:
+        return cache.not_modified_response()
     
-    return [
+    # Del primario: el ETag es la versión recién escrita y el cuerpo tiene que estar al día con ella
+    docentes = await find_list(routed(docentes_collection, "primary"), {}, DOCENTE_CATALOGO, length=100)
+    
+    return cache.apply([
         {
             "id": str(doc["_id"]),
             "nombre": doc["nombre"],
             "materias": [str(mat_id) for mat_id in doc.get("materias", [])]
         }
         for doc in docentes
-    ]
+    ])
 
 @router.get("/opciones-solicitud")
 async def obtener_opciones_solicitud(current_user: Dict = Depends(get_current_user)):
@@ -403,61 +445,64 @@ async def obtener_opciones_solicitud(current_user: Dict = Depends(get_current_us
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
     # Obtener el estudiante
-    estudiante = await estudiantes_collection.find_one({"_id": current_user["user_id"]})
+    estudiante = await find_one(estudiantes_collection, {"_id": current_user["user_id"]}, SOLO_ID)
     if not estudiante:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Estudiante no encontrado")
     
-    materias_cursando = estudiante.get("materias_cursando", [])
-    
     # Obtener SOLO las evidencias del estudiante actual
-    evidencias = await evidencias_collection.find({
-        "estudiante_id": current_user["user_id"]
-    }).to_list(1000)
+    evidencias = await find_list(
+        evidencias_collection,
+        {"estudiante_id": current_user["user_id"]},
+        EVIDENCIA_OPCION,
+        length=1000
+    )
+    
+    # Docentes y materias referenciados, en una consulta por colección
+    docentes = await find_by_ids(docentes_collection, {ev["docente_id"] for ev in evidencias}, DOCENTE_NOMBRE)
+    materias = await find_by_ids(materias_collection, {ev["materia_id"] for ev in evidencias}, MATERIA_NOMBRE)
     
     opciones = []
+    vistas = set()
     
     for evidencia in evidencias:
-        # Obtener datos del docente
-        docente_id = evidencia["docente_id"]
-        docente = await docentes_collection.find_one({"_id": docente_id})
-        
-        # Obtener datos de la materia (convertir a ObjectId si es necesario)
-        materia_id_str = evidencia["materia_id"]
-        try:
-            materia_oid = ObjectId(materia_id_str)
-            materia = await materias_collection.find_one({"_id": materia_oid})
-        except:
-            # Si falla la conversión, intentar buscar como string (backup)
-            materia = await materias_collection.find_one({"_id": materia_id_str})
+        docente = docentes.get(str(evidencia["docente_id"]))
+        materia = materias.get(str(evidencia["materia_id"]))
         
         if not docente or not materia:
             continue
         
-        # Crear la opción de solicitud
-        opcion = {
+        # Evitar duplicados (misma combinación docente-materia-grupo-aporte)
+        opcion_key = (str(evidencia["docente_id"]), str(evidencia["materia_id"]), evidencia["grupo"], evidencia["aporte"])
+        if opcion_key in vistas:
+            continue
+        vistas.add(opcion_key)
+        
+        opciones.append({
             "docente_id": str(evidencia["docente_id"]),
             "docente_nombre": docente["nombre"],
             "materia_id": str(evidencia["materia_id"]),
             "materia_nombre": materia["nombre"],
             "grupo": evidencia["grupo"],
             "aporte": evidencia["aporte"],
-            "evidencia_url": evidencia.get("archivo_url")
-        }
-        
-        # Evitar duplicados
-        # Hacemos una clave única para verificar duplicados
-        opcion_key = f"{opcion['docente_id']}-{opcion['materia_id']}-{opcion['grupo']}-{opcion['aporte']}"
-        
-        # Verificar si ya existe en la lista (basado en contenido, no referencia)
-        exists = False
-        for op in opciones:
-            k = f"{op['docente_id']}-{op['materia_id']}-{op['grupo']}-{op['aporte']}"
-            if k == opcion_key:
-                exists = True
-                break
-        
-        if not exists:
-            opciones.append(opcion)
+            "evidencia_url": f"/api/estudiante/evidencias/{evidencia['_id']}/archivo"
+        })
     
     return opciones
 
+@router.get("/evidencias/{evidencia_id}/archivo")
+async def descargar_evidencia(evidencia_id: str, current_user: Dict = Depends(get_current_user)):
+    """Descarga el archivo de una evidencia propia; la transferencia la hace el gateway (utils/downloads.py)"""
+    if current_user["role"] != "estudiante":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    
+    if not ObjectId.is_valid(evidencia_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Evidencia no encontrada")
+    evidencia = await find_one(evidencias_collection, {
+        "_id": ObjectId(evidencia_id),
+        "estudiante_id": current_user["user_id"]
+    }, EVIDENCIA_ARCHIVO)
+    if not evidencia:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Evidencia no encontrada")
+    
+    return await send_upload(evidencia["archivo_url"], media_type=evidencia.get("content_type"))
+
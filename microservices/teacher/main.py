@@ -1,57 +1,18 @@
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
+from app_factory import create_app
+from utils.staging import ensure_staging_indexes, run_staging_sweeper
+from utils.storage import close_storage
 from routers import docente
-from config import settings
-from utils.limiter import limiter
-from slowapi.errors import RateLimitExceeded
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi.responses import JSONResponse
-from pathlib import Path
-from fastapi.staticfiles import StaticFiles
 
-app = FastAPI(
+app = create_app(
+    service="teacher",
     title="Teacher Service",
     description="Microservicio de Docentes",
-    version="1.0.0",
+    routers=[docente.router],
+    on_startup=[ensure_staging_indexes],
+    background_tasks=[run_staging_sweeper],
+    on_shutdown=[close_storage],
 )
 
-# Security Headers Middleware
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        return response
-
-app.add_middleware(SecurityHeadersMiddleware)
-
-# Rate Limiting
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, lambda request, exc: JSONResponse({"detail": "Rate limit exceeded"}, status_code=429))
-
-# Configuración de CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.allowed_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Uploads needed for evidence viewing?
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-
-# Incluir router
-app.include_router(docente.router)
-
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy", "service": "teacher"}
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000)
@@ -1,93 +1,101 @@
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form, Body
-from typing import List, Dict
+import logging
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form, Body, Request, Response, Query
+from typing import List, Dict, Optional
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 from datetime import datetime
+import asyncio
 import hashlib
+import json
 import os
-from pathlib import Path
-from PIL import Image, ImageFilter, ExifTags
-import io
-import base64
 from models.schemas import (
     DocenteUpdate, DocenteResponse,
     EvidenciaCreate, EvidenciaResponse,
     CalificacionCreate, CalificacionResponse,
     SolicitudResponse, EstadoSolicitud
 )
+from config import settings
 from database import (
     docentes_collection, evidencias_collection,
     calificaciones_collection, solicitudes_collection,
-    materias_collection, mensajes_collection, estudiantes_collection
+    materias_collection, mensajes_collection, estudiantes_collection,
+    routed
 )
 from utils.auth import get_current_user
 from utils.logger import log_action
 from utils.encryption import anonymize_name, anonymize_profesor
+from utils.responses import model_rows
+from utils.queries import Projection, find_one, find_list, find_by_ids, id_variants
+from utils.stats import record_transition
+from utils.search import MAX_RESULTS, refresh_search_key, search_people
+from utils.etags import bump, conditional
+from utils.downloads import send_upload
+from utils.storage import EVIDENCIAS, TEMP, get_storage, iter_file, key_to_url, storage_key
+from utils.staging import (
+    ChunkConflict, append_chunk, begin_finalize, complete_session, create_session,
+    create_staging, discard_staging, get_session, get_staging, open_session_file, reopen_session
+)
+from utils.images import has_crop, parse_crop_area, process_evidence, run_in_image_pool
+from utils.name_region import detect_name_region
 
 router = APIRouter(prefix="/api/docente", tags=["Docente"])
+logger = logging.getLogger(__name__)
 
-# Directorios para guardar evidencias
-UPLOAD_DIR = Path("uploads/evidencias")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-TEMP_DIR = Path("uploads/temp")
-TEMP_DIR.mkdir(parents=True, exist_ok=True)
-
-# Función para corregir orientación EXIF
-def correct_image_orientation(img):
-    """Corrige la orientación de la imagen según metadatos EXIF"""
-    try:
-        # Obtener información EXIF
-        exif = img._getexif()
-        if exif is None:
-            return img
-        
-        # Buscar el tag de orientación
-        orientation_key = None
-        for tag, value in ExifTags.TAGS.items():
-            if value == 'Orientation':
-                orientation_key = tag
-                break
-        
-        if orientation_key is None:
-            return img
-            
-        orientation = exif.get(orientation_key)
-        
-        # Aplicar rotación según orientación EXIF
-        if orientation == 3:
-            img = img.rotate(180, expand=True)
-        elif orientation == 6:
-            img = img.rotate(270, expand=True)
-        elif orientation == 8:
-            img = img.rotate(90, expand=True)
-            
-        print(f"   📐 Orientación EXIF corregida: {orientation}")
-        
-    except (AttributeError, KeyError, IndexError, TypeError) as e:
-        # Si no hay EXIF o hay error, devolver imagen original
-        print(f"   ℹ️ No se pudo leer EXIF o no tiene orientación: {e}")
-        pass
-    return img
+# Proyecciones: campos que lee cada handler
+SOLO_ID = Projection()
+PERFIL = Projection("email", "nombre", "materias", "grupos_asignados", "fecha_registro")
+DOCENTE_MATERIAS = Projection("materias", "grupos_asignados")
+DOCENTE_ASIGNADAS = Projection("materias")
+ESTUDIANTE_PICKER = Projection("nombre", "carrera")
+MATERIA_NOMBRE = Projection("nombre")
+MATERIA_RESUMEN = Projection("nombre", "codigo")
+EVIDENCIA_LISTA = Projection(
+    "materia_id", "grupo", "aporte", "descripcion", "archivo_nombre_hash",
+    "archivo_url", "fecha_subida", "codigo_interno", "recortada"
+)
+EVIDENCIA_ARCHIVO = Projection(
+    "docente_id", "estudiante_id", "materia_id", "grupo", "aporte", "archivo_url", "content_type"
+)
+EVIDENCIA_DETALLE = Projection(
+    "archivo_url", "archivo_nombre_hash", "descripcion", "recortada",
+    "codigo_interno", "fecha_subida"
+)
+SOLICITUD_LISTA = Projection(
+    "estudiante_id", "estudiante_nombre_anonimo", "materia_id", "docente_id",
+    "docente_nombre_anonimo", "grupo", "aporte", "calificacion_actual", "motivo",
+    "estado", "fecha_creacion", "fecha_actualizacion"
+)
+SOLICITUD_CALIFICAR = Projection("estado", "estudiante_id")
+# Estado previo que devuelve find_one_and_update para las estadísticas
+SOLICITUD_TRANSICION = Projection("materia_id", "estado", "fecha_creacion")
+SOLICITUD_EVIDENCIA = Projection(
+    "docente_recalificador_id", "estudiante_id", "docente_id", "materia_id", "grupo", "aporte"
+)
 
 # =============== PERFIL DEL DOCENTE ===============
 
 @router.get("/perfil", response_model=DocenteResponse)
-async def get_perfil(current_user: Dict = Depends(get_current_user)):
-    """Obtiene el perfil del docente actual"""
+async def get_perfil(request: Request, response: Response, current_user: Dict = Depends(get_current_user)):
+    """Obtiene el perfil del docente actual (con ETag: un If-None-Match vigente recibe 304)"""
     if current_user["role"] != "docente":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    docente = await docentes_collection.find_one({"_id": current_user["user_id"]})
+    cache = await conditional(request, response, f"docente:{current_user['user_id']}")
+    if cache.not_modified:
+        return cache.not_modified_response()
+    
+    docente = await find_one(docentes_collection, {"_id": current_user["user_id"]}, PERFIL)
     if not docente:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Docente no encontrado")
     
-    return DocenteResponse(
+    return cache.apply(DocenteResponse(
         id=str(docente["_id"]),
         email=docente["email"],
         nombre=docente["nombre"],
         materias=docente.get("materias", []),
         grupos_asignados=docente.get("grupos_asignados", []),
         fecha_registro=docente["fecha_registro"]
-    )
+    ))
 
 @router.put("/perfil", response_model=DocenteResponse)
 async def actualizar_perfil(
@@ -108,8 +116,11 @@ async def actualizar_perfil(
             {"_id": current_user["user_id"]},
             {"$set": update_data}
         )
+        if "nombre" in update_data or "email" in update_data:
+            await refresh_search_key(docentes_collection, current_user["user_id"])
+        await bump("docentes", f"docente:{current_user['user_id']}")
     
-    docente = await docentes_collection.find_one({"_id": current_user["user_id"]})
+    docente = await find_one(docentes_collection, {"_id": current_user["user_id"]}, PERFIL)
     
     return DocenteResponse(
         id=str(docente["_id"]),
@@ -128,15 +139,10 @@ async def listar_materias_asignadas(current_user: Dict = Depends(get_current_use
     if current_user["role"] != "docente":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    docente = await docentes_collection.find_one({"_id": current_user["user_id"]})
+    docente = await find_one(docentes_collection, {"_id": current_user["user_id"]}, DOCENTE_MATERIAS)
     if not docente:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Docente no encontrado")
     
-    print(f"\n📚 DEBUG MATERIAS:")
-    print(f"   Docente: {docente.get('nombre')}")
-    print(f"   materias en BD: {docente.get('materias', [])}")
-    print(f"   Tipo: {type(docente.get('materias', []))}")
-    
     materias_ids_str = docente.get("materias", [])
     materias_object_ids = []
     
@@ -144,24 +150,32 @@ async def listar_materias_asignadas(current_user: Dict = Depends(get_current_use
     for m_id in materias_ids_str:
         try:
             materias_object_ids.append(ObjectId(m_id))
-        except Exception as e:
-            print(f"   ⚠️ ID inválido ignorado: {m_id} - Error: {e}")
-
-    print(f"   IDs a buscar (ObjectId): {len(materias_object_ids)}")
+        except Exception:
+            logger.warning("ID de materia inválido ignorado", extra={"docente_id": current_user["user_id"], "materia_id": m_id})
     
-    materias = await materias_collection.find(
-        {"_id": {"$in": materias_object_ids}}
-    ).to_list(length=100)
+    materias = await find_list(
+        materias_collection,
+        {"_id": {"$in": materias_object_ids}},
+        MATERIA_RESUMEN,
+        length=100
+    )
     
-    print(f"   Materias encontradas: {len(materias)}")
+    # Evidencias subidas por materia en una sola agregación (materia_id puede ser string u ObjectId)
+    conteos = {}
+    if materias:
+        pipeline = [
+            {"$match": {
+                "docente_id": current_user["user_id"],
+                "materia_id": {"$in": [variant for materia in materias for variant in id_variants(materia["_id"])]}
+            }},
+            {"$group": {"_id": {"$toString": "$materia_id"}, "total": {"$sum": 1}}}
+        ]
+        async for fila in evidencias_collection.aggregate(pipeline):
+            conteos[fila["_id"]] = fila["total"]
     
     resultado = []
     for materia in materias:
-        # Contar evidencias subidas para esta materia
-        count_evidencias = await evidencias_collection.count_documents({
-            "docente_id": current_user["user_id"],
-            "materia_id": materia["_id"]
-        })
+        count_evidencias = conteos.get(str(materia["_id"]), 0)
         
         resultado.append({
             "id": str(materia["_id"]),
@@ -179,7 +193,10 @@ async def listar_estudiantes(current_user: Dict = Depends(get_current_user)):
     if current_user["role"] != "docente":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    estudiantes = await estudiantes_collection.find().sort("nombre", 1).to_list(length=1000)
+    estudiantes = await find_list(
+        routed(estudiantes_collection, "listing"), {}, ESTUDIANTE_PICKER,
+        sort=[("nombre", 1)], length=1000
+    )
     
     resultado = []
     for est in estudiantes:
@@ -191,6 +208,29 @@ async def listar_estudiantes(current_user: Dict = Depends(get_current_user)):
     
     return resultado
 
+@router.get("/estudiantes/buscar")
+async def buscar_estudiantes(
+    q: str = "",
+    carrera: Optional[str] = None,
+    k: int = Query(20, ge=1, le=MAX_RESULTS),
+    current_user: Dict = Depends(get_current_user)
+):
+    """Busca estudiantes por prefijo de nombre o email para el selector de evidencias"""
+    if current_user["role"] != "docente":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    
+    estudiantes = await search_people(
+        routed(estudiantes_collection, "listing"), q, ESTUDIANTE_PICKER, carrera=carrera, k=k
+    )
+    return [
+        {
+            "id": str(est["_id"]),
+            "nombre": est["nombre"],
+            "carrera": est.get("carrera", "")
+        }
+        for est in estudiantes
+    ]
+
 @router.post("/evidencias")
 async def subir_evidencia(
     archivo: UploadFile = File(...),
@@ -206,7 +246,7 @@ async def subir_evidencia(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
     # Verificar que el docente tenga asignada esta materia
-    docente = await docentes_collection.find_one({"_id": current_user["user_id"]})
+    docente = await find_one(docentes_collection, {"_id": current_user["user_id"]}, DOCENTE_ASIGNADAS)
     if str(materia_id) not in docente.get("materias", []):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes asignada esta materia")
     
@@ -219,18 +259,34 @@ async def subir_evidencia(
     hash_input = f"{current_user['user_id']}{materia_id}{grupo}{aporte}{datetime.utcnow().isoformat()}"
     file_hash = hashlib.sha256(hash_input.encode()).hexdigest()[:16]
     
-    # Obtener extensión del archivo original
-    file_extension = os.path.splitext(archivo.filename)[1]
+    if settings.image_normalize:
+        # Normalizar (orientación, tamaño máximo, sin metadatos) antes de guardar
+        try:
+            procesada = await run_in_image_pool(process_evidence, archivo.file, archivo.filename)
+        except Exception as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Imagen no válida: {str(e)}")
+        file_extension, content_type = procesada["extension"], procesada["content_type"]
+        normalizacion = {
+            "normalizada": procesada["normalizada"],
+            "formato_conservado": procesada["formato_conservado"],
+            "bytes_original": procesada["bytes_original"],
+            "bytes_almacenados": procesada["bytes_guardados"],
+        }
+    else:
+        # Obtener extensión del archivo original
+        file_extension, content_type = os.path.splitext(archivo.filename)[1], archivo.content_type
+        normalizacion = {"normalizada": False}
     hashed_filename = f"{file_hash}{file_extension}"
     
-    # Guardar archivo
-    file_path = UPLOAD_DIR / hashed_filename
-    with open(file_path, "wb") as buffer:
-        content = await archivo.read()
-        buffer.write(content)
+    # Guardar archivo (sin normalizar va por bloques: con S3 los archivos grandes van en multipart)
+    file_key = storage_key(EVIDENCIAS, hashed_filename)
+    if settings.image_normalize:
+        await get_storage().put(file_key, procesada["data"], content_type)
+    else:
+        await get_storage().put_stream(file_key, iter_file(archivo), content_type)
     
     # Guardar metadata en la base de datos
-    materia = await materias_collection.find_one({"_id": materia_id})
+    materia = await find_one(materias_collection, {"_id": materia_id}, MATERIA_NOMBRE)
     
     nueva_evidencia = {
         "estudiante_id": estudiante_id,
@@ -241,8 +297,9 @@ async def subir_evidencia(
         "descripcion": descripcion,
         "archivo_nombre_original": archivo.filename,
         "archivo_nombre_hash": hashed_filename,
-        "archivo_url": f"/uploads/evidencias/{hashed_filename}",
-        "content_type": archivo.content_type,
+        "archivo_url": key_to_url(file_key),
+        "content_type": content_type,
+        **normalizacion,
         "fecha_subida": datetime.utcnow()
     }
     
@@ -273,14 +330,15 @@ async def subir_evidencia_temporal(
     current_user: Dict = Depends(get_current_user)
 ):
     """Sube evidencia temporal para previsualización y recorte"""
-    print(f"\n🔍 DEBUG UPLOAD-TEMP:")
-    print(f"   archivo: {archivo.filename if archivo else 'None'}")
-    print(f"   content_type: {archivo.content_type if archivo else 'None'}")
-    print(f"   estudiante_id: {estudiante_id}")
-    print(f"   materia_id: {materia_id}")
-    print(f"   grupo: {grupo}")
-    print(f"   aporte: {aporte}")
-    print(f"   current_user: {current_user.get('user_id')}")
+    logger.debug("Evidencia temporal recibida", extra={
+        "archivo": archivo.filename if archivo else None,
+        "content_type": archivo.content_type if archivo else None,
+        "estudiante_id": estudiante_id,
+        "materia_id": materia_id,
+        "grupo": grupo,
+        "aporte": aporte,
+        "docente_id": current_user.get("user_id"),
+    })
     
     if current_user["role"] != "docente":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
@@ -294,19 +352,45 @@ async def subir_evidencia_temporal(
     file_extension = os.path.splitext(archivo.filename)[1]
     temp_filename = f"{temp_id}{file_extension}"
     
-    # Guardar archivo temporal
-    temp_path = TEMP_DIR / temp_filename
-    with open(temp_path, "wb") as buffer:
-        content = await archivo.read()
-        buffer.write(content)
+    # Proponer el área del nombre: el docente solo la confirma o la corrige
+    crop_propuesto = None
+    if settings.name_region_detect:
+        try:
+            crop_propuesto = await asyncio.to_thread(detect_name_region, archivo.file)
+        except Exception as e:
+            # Sin propuesta el docente dibuja el área como siempre
+            logger.debug("No se pudo proponer el área del nombre", extra={"error": str(e)})
+        await archivo.seek(0)
+    
+    # Guardar archivo temporal en el almacenamiento compartido: cualquier réplica puede terminar el recorte
+    staging = await create_staging(
+        temp_id, temp_filename, current_user["user_id"], archivo.content_type, iter_file(archivo),
+        estudiante_id=estudiante_id, materia_id=materia_id, grupo=grupo, aporte=aporte,
+    )
     
     return {
         "temp_id": temp_id,
         "temp_filename": temp_filename,
-        "preview_url": f"/uploads/temp/{temp_filename}",
-        "message": "Imagen cargada. Marca el área del nombre para recortar."
+        "preview_url": f"/api/docente/evidencias/temp/{temp_id}/preview",
+        "expira": staging["expira"],
+        "crop_propuesto": crop_propuesto,
+        "message": "Imagen cargada. Revisa el área del nombre propuesta o márcala para recortar."
+        if crop_propuesto else "Imagen cargada. Marca el área del nombre para recortar."
     }
 
+@router.get("/evidencias/temp/{temp_id}/preview")
+async def previsualizar_evidencia_temporal(temp_id: str, current_user: Dict = Depends(get_current_user)):
+    """Imagen de una subida temporal, solo para el docente que la subió"""
+    if current_user["role"] != "docente":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    
+    staging = await get_staging(temp_id, current_user["user_id"])
+    if not staging:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Archivo temporal no encontrado")
+    return await send_upload(
+        key_to_url(staging["clave"]), media_type=staging.get("content_type"), cache_control="private, no-store"
+    )
+
 @router.post("/evidencias/recortar")
 async def recortar_area_y_guardar(
     datos: Dict = Body(...),
@@ -327,125 +411,307 @@ async def recortar_area_y_guardar(
     # Validar datos
     if not all([temp_filename, estudiante_id, materia_id, grupo, aporte]):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Faltan datos requeridos")
+    if not isinstance(temp_filename, str):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="temp_filename inválido")
     
-    temp_path = TEMP_DIR / temp_filename
-    if not temp_path.exists():
+    # La subida puede venir de otra réplica: se busca en el staging compartido
+    storage = get_storage()
+    staging = await get_staging(os.path.splitext(temp_filename)[0], current_user["user_id"])
+    if not staging:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Archivo temporal no encontrado")
+    temp_filename = staging["temp_filename"]
+    try:
+        contenido = await storage.get(staging["clave"])
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Archivo temporal no encontrado")
+    
+    # Copias ANTES/DESPUÉS para comparar: solo con DEBUG activo en este módulo
+    guardar_comparacion = logger.isEnabledFor(logging.DEBUG) and has_crop(crop_area)
     
     try:
-        # Abrir imagen
-        img = Image.open(temp_path)
-        
-        print(f"\n📷 DEBUG PROCESAMIENTO IMAGEN:")
-        print(f"   Dimensión original: {img.width}x{img.height}")
-        print(f"   Formato: {img.format}")
-        
-        # PASO 1: Corregir orientación EXIF primero
-        img = correct_image_orientation(img)
-        print(f"   Dimensión después de orientación: {img.width}x{img.height}")
-        
-        print(f"\n✂️ DEBUG RECORTE:")
-        print(f"   crop_area recibido: {crop_area}")
-        print(f"   Tipo: {type(crop_area)}")
-        if crop_area:
-            print(f"   x: {crop_area.get('x', 'N/A')}")
-            print(f"   y: {crop_area.get('y', 'N/A')}")
-            print(f"   Width: {crop_area.get('width', 0)}")
-            print(f"   Height: {crop_area.get('height', 0)}")
-        else:
-            print(f"   ⚠️ crop_area es None o vacío")
-        
-        # PASO 2: Si hay área para recortar
-        if crop_area and crop_area.get("width", 0) > 0 and crop_area.get("height", 0) > 0:
-            x = int(crop_area["x"])
-            y = int(crop_area["y"])
-            width = int(crop_area["width"])
-            height = int(crop_area["height"])
-            
-            print(f"   ✅ RECORTANDO - Eliminando área seleccionada y todo arriba")
-            print(f"   📏 Imagen original: {img.width}x{img.height}")
-            print(f"   📐 Área seleccionada para eliminar: x={x}, y={y}, width={width}, height={height}")
-            
-            # Calcular desde dónde cortar: eliminar todo ARRIBA incluyendo el rectángulo
-            crop_from_y = y + height
-            print(f"   ✂️ Cortando desde Y={crop_from_y} hasta el final")
-            print(f"   📍 Coordenadas de recorte: left=0, top={crop_from_y}, right={img.width}, bottom={img.height}")
-            
-            # Guardar imagen ANTES del recorte para comparar (temporal)
-            temp_before = TEMP_DIR / f"before_{temp_filename}"
-            img.save(temp_before)
-            print(f"   💾 Imagen ANTES guardada en: {temp_before}")
-            
-            # Recortar imagen: (left, top, right, bottom)
-            # Eliminar todo desde arriba (0) hasta el borde inferior del rectángulo
-            img = img.crop((0, crop_from_y, img.width, img.height))
-            
-            # Guardar imagen DESPUÉS del recorte para comparar (temporal)
-            temp_after = TEMP_DIR / f"after_{temp_filename}"
-            img.save(temp_after)
-            print(f"   💾 Imagen DESPUÉS guardada en: {temp_after}")
-            
-            print(f"   ✅ Recorte completado. Nueva dimensión: {img.width}x{img.height}")
-        else:
-            print(f"   ⚠️ NO se recortará (área vacía o width=0)")
-        
-        # Generar nombre hasheado final
-        hash_input = f"{current_user['user_id']}{estudiante_id}{materia_id}{grupo}{aporte}{datetime.utcnow().isoformat()}"
-        file_hash = hashlib.sha256(hash_input.encode()).hexdigest()[:16]
-        file_extension = os.path.splitext(temp_filename)[1]
-        hashed_filename = f"{file_hash}{file_extension}"
+        procesada = await asyncio.to_thread(
+            process_evidence, contenido, temp_filename, crop_area, guardar_comparacion
+        )
+        log_procesada(temp_filename, crop_area, procesada)
+        if guardar_comparacion:
+            await storage.put(storage_key(TEMP, f"before_{temp_filename}"), procesada["antes"])
+            await storage.put(storage_key(TEMP, f"after_{temp_filename}"), procesada["despues"])
         
-        # Guardar imagen procesada
-        final_path = UPLOAD_DIR / hashed_filename
-        img.save(final_path)
+        resultado = await guardar_evidencia_procesada(
+            current_user, estudiante_id, materia_id, grupo, aporte, descripcion, procesada
+        )
         
         # Eliminar archivo temporal
-        temp_path.unlink()
-        
-        # Obtener datos del estudiante y materia
-        materia = await materias_collection.find_one({"_id": ObjectId(materia_id)})
-        
-        if not materia:
-             # Fallback si no se encuentra la materia
-             codigo_materia = "UNK"
-             nombre_materia = "Desconocida"
-        else:
-             codigo_materia = materia.get('codigo', 'MAT')
-             nombre_materia = materia.get('nombre', 'Desconocida')
-
-        # Generar código de vinculación único
-        codigo_interno = f"{codigo_materia[:4].upper()}-{aporte.upper()[:3]}-{file_hash[:6].upper()}"
-        
-        # Guardar metadata en BD
-        nueva_evidencia = {
-            "codigo_interno": codigo_interno,
-            "estudiante_id": estudiante_id,
-            "docente_id": current_user["user_id"],
-            "materia_id": materia_id,
-            "grupo": grupo,
-            "aporte": aporte,
-            "descripcion": descripcion,
-            "archivo_nombre_hash": hashed_filename,
-            "archivo_url": f"/uploads/evidencias/{hashed_filename}",
-            "recortada": crop_area is not None and crop_area.get("width", 0) > 0,
-            "fecha_subida": datetime.utcnow()
-        }
-        
-        result = await evidencias_collection.insert_one(nueva_evidencia)
-        
-        return {
-            "id": str(result.inserted_id),
-            "codigo_interno": codigo_interno,
-            "message": "Evidencia procesada y guardada exitosamente",
-            "archivo_hash": hashed_filename,
-            "materia_nombre": materia["nombre"] if materia else "Desconocida"
-        }
+        await discard_staging(staging)
+        return resultado
         
     except Exception as e:
         # Limpiar archivo temporal en caso de error
-        if temp_path.exists():
-            temp_path.unlink()
+        await discard_staging(staging)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error al procesar imagen: {str(e)}")
+
+@router.post("/evidencias/subir-recortada")
+async def subir_evidencia_recortada(
+    archivo: UploadFile = File(...),
+    estudiante_id: str = Form(...),
+    materia_id: str = Form(...),
+    grupo: str = Form(...),
+    aporte: str = Form(...),
+    descripcion: str = Form(""),
+    crop_area: Optional[str] = Form(None),
+    current_user: Dict = Depends(get_current_user)
+):
+    """
+    Sube, recorta y guarda una evidencia en una sola petición. crop_area es el
+    JSON {x, y, width, height} del área del nombre (vacío = sin recorte). La
+    imagen pasa directo por el pipeline: solo se escribe el archivo final.
+    El flujo upload-temp + recortar sigue disponible para la previsualización.
+    """
+    if current_user["role"] != "docente":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    
+    if not archivo.content_type or not archivo.content_type.startswith('image/'):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Solo se permiten archivos de imagen")
+    
+    try:
+        area = parse_crop_area(json.loads(crop_area)) if crop_area else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="crop_area inválido")
+    if not ObjectId.is_valid(materia_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="materia_id inválido")
+    
+    docente = await find_one(docentes_collection, {"_id": current_user["user_id"]}, DOCENTE_ASIGNADAS)
+    if str(materia_id) not in docente.get("materias", []):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes asignada esta materia")
+    
+    try:
+        # PIL lee directo del archivo temporal de la subida, sin copiarlo a memoria
+        procesada = await asyncio.to_thread(process_evidence, archivo.file, archivo.filename, area)
+    except ValueError as e:
+        # Imagen corrupta o recorte fuera de la imagen: error del cliente, como en finalizar
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    log_procesada(archivo.filename, area, procesada)
+    try:
+        resultado = await guardar_evidencia_procesada(
+            current_user, estudiante_id, materia_id, grupo, aporte, descripcion, procesada
+        )
+    except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error al procesar imagen: {str(e)}")
+    
+    # REGISTRAR LOG
+    await log_action(
+        current_user["user_id"],
+        "docente",
+        "SUBIR_EVIDENCIA",
+        f"Evidencia subida: {resultado['materia_nombre']} - {grupo} - {aporte}"
+    )
+    return resultado
+
+@router.post("/evidencias/lote")
+async def subir_evidencias_lote(
+    archivos: List[UploadFile] = File(...),
+    items: str = Form(...),
+    materia_id: str = Form(...),
+    grupo: str = Form(...),
+    aporte: str = Form(...),
+    current_user: Dict = Depends(get_current_user)
+):
+    """
+    Sube las evidencias de un grupo completo en una petición. items es un JSON
+    con un objeto por archivo y en el mismo orden: {estudiante_id, descripcion,
+    crop_area}. El docente y la materia se validan una vez, las imágenes se
+    procesan en paralelo (pool acotado), los documentos se insertan con un solo
+    insert_many y se registra un solo log. Devuelve el resultado de cada archivo.
+    """
+    if current_user["role"] != "docente":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    
+    try:
+        items = json.loads(items)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="items inválido")
+    if not isinstance(items, list) or len(items) != len(archivos):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="items debe tener un objeto por archivo")
+    if len(archivos) > settings.evidence_batch_max_files:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo {settings.evidence_batch_max_files} archivos por lote"
+        )
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("estudiante_id"), str) or not item["estudiante_id"]:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cada item necesita estudiante_id")
+        if item.get("crop_area") is not None and not isinstance(item["crop_area"], dict):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="crop_area inválido")
+    if not ObjectId.is_valid(materia_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="materia_id inválido")
+    
+    # Validaciones y lecturas compartidas: una vez por lote
+    docente = await find_one(docentes_collection, {"_id": current_user["user_id"]}, DOCENTE_ASIGNADAS)
+    if str(materia_id) not in docente.get("materias", []):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes asignada esta materia")
+    materia = await find_one(materias_collection, {"_id": ObjectId(materia_id)}, MATERIA_RESUMEN)
+    storage = get_storage()
+    
+    async def procesar(indice: int, archivo: UploadFile, item: Dict) -> Dict:
+        if not archivo.content_type or not archivo.content_type.startswith('image/'):
+            raise ValueError("Solo se permiten archivos de imagen")
+        procesada = await run_in_image_pool(process_evidence, archivo.file, archivo.filename, item.get("crop_area"))
+        nueva_evidencia = nueva_evidencia_procesada(
+            current_user, item["estudiante_id"], materia_id, grupo, aporte, item.get("descripcion", ""),
+            procesada, materia, sal=str(indice)
+        )
+        await storage.put(
+            storage_key(EVIDENCIAS, nueva_evidencia["archivo_nombre_hash"]), procesada["data"], procesada["content_type"]
+        )
+        return nueva_evidencia
+    
+    salidas = await asyncio.gather(
+        *(procesar(indice, archivo, item) for indice, (archivo, item) in enumerate(zip(archivos, items))),
+        return_exceptions=True
+    )
+    
+    resultados = [
+        {"indice": indice, "archivo": archivo.filename, "estudiante_id": item["estudiante_id"]}
+        for indice, (archivo, item) in enumerate(zip(archivos, items))
+    ]
+    listas = []
+    for resultado, salida in zip(resultados, salidas):
+        if isinstance(salida, Exception):
+            resultado["error"] = f"Error al procesar imagen: {str(salida)}"
+        else:
+            listas.append((resultado, salida))
+    
+    fallidas_bd = set()
+    if listas:
+        try:
+            await evidencias_collection.insert_many([doc for _, doc in listas], ordered=False)
+        except BulkWriteError as e:
+            fallidas_bd = {error["index"] for error in e.details.get("writeErrors", [])}
+        except Exception:
+            # Red, AutoReconnect, timeout: con ordered=False pudo insertarse una parte
+            logger.exception("Error al guardar el lote de evidencias")
+            fallidas_bd = await posiciones_sin_insertar([doc for _, doc in listas])
+
+    guardadas = 0
+    for posicion, (resultado, doc) in enumerate(listas):
+        if posicion in fallidas_bd:
+            await storage.delete(storage_key(EVIDENCIAS, doc["archivo_nombre_hash"]))
+            resultado["error"] = "No se pudo guardar la evidencia"
+            continue
+        guardadas += 1
+        resultado.update({
+            "id": str(doc["_id"]),
+            "codigo_interno": doc["codigo_interno"],
+            "archivo_hash": doc["archivo_nombre_hash"],
+        })
+    
+    materia_nombre = materia["nombre"] if materia else "Desconocida"
+    if guardadas:
+        # REGISTRAR LOG (uno por lote)
+        await log_action(
+            current_user["user_id"],
+            "docente",
+            "SUBIR_EVIDENCIA",
+            f"Lote de evidencias: {materia_nombre} - {grupo} - {aporte} ({guardadas} de {len(archivos)})"
+        )
+    
+    return {
+        "total": len(archivos),
+        "guardadas": guardadas,
+        "fallidas": len(archivos) - guardadas,
+        "materia_nombre": materia_nombre,
+        "resultados": resultados
+    }
+
+async def posiciones_sin_insertar(docs: List[Dict]) -> set:
+    """
+    Posiciones de docs que no quedaron en evidencias tras un insert_many con
+    resultado incierto (insert_many les asigna el _id antes de enviarlos). Si
+    tampoco se puede consultar, se dan todas por fallidas.
+    """
+    try:
+        insertadas = await find_list(
+            evidencias_collection, {"_id": {"$in": [doc["_id"] for doc in docs if "_id" in doc]}}, SOLO_ID
+        )
+    except Exception:
+        logger.exception("No se pudo verificar qué evidencias del lote se guardaron")
+        return set(range(len(docs)))
+    ids = {doc["_id"] for doc in insertadas}
+    return {posicion for posicion, doc in enumerate(docs) if doc.get("_id") not in ids}
+
+def log_procesada(nombre: str, crop_area: Optional[Dict], procesada: Dict):
+    logger.debug("Evidencia procesada", extra={
+        "archivo": nombre,
+        "formato": procesada["formato"],
+        "dimension_original": procesada["dimension_original"],
+        "dimension_orientada": procesada["dimension_orientada"],
+        "crop_area": crop_area,
+        "crop_from_y": procesada["crop_from_y"],
+        "dimension_final": procesada["dimension_final"],
+    })
+
+def nueva_evidencia_procesada(current_user: Dict, estudiante_id: str, materia_id: str, grupo: str, aporte: str,
+                              descripcion: str, procesada: Dict, materia: Optional[Dict], sal: str = "") -> Dict:
+    """Documento de la evidencia con nombre hasheado y código de vinculación (sin guardar nada)"""
+    # Generar nombre hasheado final (sal: distingue archivos de un mismo lote)
+    hash_input = f"{current_user['user_id']}{estudiante_id}{materia_id}{grupo}{aporte}{datetime.utcnow().isoformat()}{sal}"
+    file_hash = hashlib.sha256(hash_input.encode()).hexdigest()[:16]
+    hashed_filename = f"{file_hash}{procesada['extension']}"
+    
+    if not materia:
+         # Fallback si no se encuentra la materia
+         codigo_materia = "UNK"
+    else:
+         codigo_materia = materia.get('codigo', 'MAT')
+
+    # Generar código de vinculación único
+    codigo_interno = f"{codigo_materia[:4].upper()}-{aporte.upper()[:3]}-{file_hash[:6].upper()}"
+    
+    return {
+        "codigo_interno": codigo_interno,
+        "estudiante_id": estudiante_id,
+        "docente_id": current_user["user_id"],
+        "materia_id": materia_id,
+        "grupo": grupo,
+        "aporte": aporte,
+        "descripcion": descripcion,
+        "archivo_nombre_hash": hashed_filename,
+        "archivo_url": key_to_url(storage_key(EVIDENCIAS, hashed_filename)),
+        "content_type": procesada["content_type"],
+        "recortada": procesada["recortada"],
+        "normalizada": procesada["normalizada"],
+        "formato_conservado": procesada["formato_conservado"],
+        "bytes_original": procesada["bytes_original"],
+        "bytes_almacenados": procesada["bytes_guardados"],
+        "fecha_subida": datetime.utcnow()
+    }
+
+async def guardar_evidencia_procesada(current_user: Dict, estudiante_id: str, materia_id: str, grupo: str,
+                                      aporte: str, descripcion: str, procesada: Dict) -> Dict:
+    """Guarda la imagen procesada con nombre hasheado y su metadata; devuelve la respuesta del endpoint"""
+    materia = await find_one(materias_collection, {"_id": ObjectId(materia_id)}, MATERIA_RESUMEN)
+    nueva_evidencia = nueva_evidencia_procesada(
+        current_user, estudiante_id, materia_id, grupo, aporte, descripcion, procesada, materia
+    )
+    
+    # Guardar imagen procesada y luego su metadata
+    storage = get_storage()
+    file_key = storage_key(EVIDENCIAS, nueva_evidencia["archivo_nombre_hash"])
+    await storage.put(file_key, procesada["data"], procesada["content_type"])
+    try:
+        result = await evidencias_collection.insert_one(nueva_evidencia)
+    except BaseException:
+        # Sin documento el archivo queda huérfano (un reintento genera otro nombre)
+        await storage.delete(file_key)
+        raise
+    
+    return {
+        "id": str(result.inserted_id),
+        "codigo_interno": nueva_evidencia["codigo_interno"],
+        "message": "Evidencia procesada y guardada exitosamente",
+        "archivo_hash": nueva_evidencia["archivo_nombre_hash"],
+        "materia_nombre": materia["nombre"] if materia else "Desconocida"
+    }
 
 @router.get("/evidencias")
 async def listar_evidencias(current_user: Dict = Depends(get_current_user)):
@@ -453,29 +719,20 @@ async def listar_evidencias(current_user: Dict = Depends(get_current_user)):
     if current_user["role"] != "docente":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    evidencias = await evidencias_collection.find(
-        {"docente_id": current_user["user_id"]}
-    ).sort("fecha_subida", -1).to_list(length=1000)
+    evidencias = await find_list(
+        evidencias_collection,
+        {"docente_id": current_user["user_id"]},
+        EVIDENCIA_LISTA,
+        sort=[("fecha_subida", -1)],
+        length=1000
+    )
+    
+    # Una sola consulta para las materias de todo el listado
+    materias = await find_by_ids(materias_collection, (ev["materia_id"] for ev in evidencias), MATERIA_NOMBRE)
     
     resultado = []
     for ev in evidencias:
-        # Buscar materia - puede ser string o ObjectId
-        materia_id = ev["materia_id"]
-        print(f"🔍 DEBUG EVIDENCIAS: Buscando materia {materia_id} (tipo: {type(materia_id)})")
-        
-        materia = await materias_collection.find_one({"_id": materia_id})
-        
-        # Si no se encuentra, intentar con el otro tipo
-        if not materia and isinstance(materia_id, str):
-            try:
-                materia = await materias_collection.find_one({"_id": ObjectId(materia_id)})
-            except:
-                pass
-        
-        if not materia and isinstance(materia_id, ObjectId):
-            materia = await materias_collection.find_one({"_id": str(materia_id)})
-        
-        print(f"   {'✅' if materia else '❌'} Materia: {materia['nombre'] if materia else 'NO ENCONTRADA'}")
+        materia = materias.get(str(ev["materia_id"]))
         
         resultado.append({
             "id": str(ev["_id"]),
@@ -484,7 +741,7 @@ async def listar_evidencias(current_user: Dict = Depends(get_current_user)):
             "aporte": ev["aporte"],
             "descripcion": ev["descripcion"],
             "archivo_nombre_hash": ev["archivo_nombre_hash"],
-            "archivo_url": ev["archivo_url"],
+            "archivo_url": archivo_url(ev["_id"]),
             "fecha_subida": ev["fecha_subida"],
             "codigo_interno": ev.get("codigo_interno", ""),
             "recortada": ev.get("recortada", False)
@@ -492,63 +749,235 @@ async def listar_evidencias(current_user: Dict = Depends(get_current_user)):
     
     return resultado
 
+def archivo_url(evidencia_id) -> str:
+    """URL de descarga autorizada de una evidencia (el archivo nunca se expone por /uploads)"""
+    return f"/api/docente/evidencias/{evidencia_id}/archivo"
+
+@router.get("/evidencias/{evidencia_id}/archivo")
+async def descargar_evidencia(evidencia_id: str, current_user: Dict = Depends(get_current_user)):
+    """
+    Descarga el archivo de una evidencia. Solo para el docente que la subió o
+    el recalificador asignado a una solicitud sobre esa evidencia; la
+    transferencia la hace el gateway (utils/downloads.py).
+    """
+    if current_user["role"] != "docente":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    
+    if not ObjectId.is_valid(evidencia_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Evidencia no encontrada")
+    evidencia = await find_one(evidencias_collection, {"_id": ObjectId(evidencia_id)}, EVIDENCIA_ARCHIVO)
+    if not evidencia:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Evidencia no encontrada")
+    
+    if evidencia["docente_id"] != current_user["user_id"]:
+        asignada = await find_one(solicitudes_collection, {
+            "docente_recalificador_id": current_user["user_id"],
+            "estudiante_id": evidencia["estudiante_id"],
+            "docente_id": evidencia["docente_id"],
+            "materia_id": evidencia["materia_id"],
+            "grupo": evidencia["grupo"],
+            "aporte": evidencia["aporte"]
+        }, SOLO_ID)
+        if not asignada:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permiso para ver esta evidencia")
+    
+    return await send_upload(evidencia["archivo_url"], media_type=evidencia.get("content_type"))
+
+# =============== SUBIDAS REANUDABLES ===============
+# Para conexiones inestables (fotos desde el celular): el archivo se sube por
+# bloques y tras un corte solo se reenvía lo que falta (ver utils/staging.py).
+#
+#   POST /evidencias/sesiones                 -> {sesion_id, offset: 0, chunk_size}
+#   PUT  /evidencias/sesiones/{id}?offset=N   cuerpo = bytes del bloque -> {offset}
+#   GET  /evidencias/sesiones/{id}            -> {offset, tamano, estado}
+#   POST /evidencias/sesiones/{id}/finalizar  -> igual que subir-recortada
+
+def sesion_estado(sesion: Dict) -> Dict:
+    return {
+        "sesion_id": sesion["_id"],
+        "offset": sesion["offset"],
+        "tamano": sesion["tamano"],
+        "estado": sesion["estado"],
+        "expira": sesion["expira"],
+    }
+
+@router.post("/evidencias/sesiones")
+async def crear_sesion_subida(datos: Dict = Body(...), current_user: Dict = Depends(get_current_user)):
+    """
+    Abre una subida reanudable. Recibe nombre_archivo, content_type, tamano
+    (bytes), estudiante_id, materia_id, grupo, aporte y opcionalmente
+    descripcion y crop_area, que se usan al finalizar.
+    """
+    if current_user["role"] != "docente":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    
+    nombre_archivo = datos.get("nombre_archivo")
+    content_type = datos.get("content_type")
+    tamano = datos.get("tamano")
+    campos = {campo: datos.get(campo) for campo in ("estudiante_id", "materia_id", "grupo", "aporte")}
+    crop_area = datos.get("crop_area")
+    
+    if not all([nombre_archivo, content_type, tamano, *campos.values()]):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Faltan datos requeridos")
+    if not all(isinstance(valor, str) for valor in [nombre_archivo, content_type, *campos.values()]):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Datos inválidos")
+    if not content_type.startswith('image/'):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Solo se permiten archivos de imagen")
+    if not isinstance(tamano, int) or not 0 < tamano <= settings.upload_session_max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"tamano debe estar entre 1 y {settings.upload_session_max_bytes} bytes"
+        )
+    if crop_area is not None and not isinstance(crop_area, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="crop_area inválido")
+    
+    # La asignación se valida al abrir la sesión, antes de recibir los bytes
+    docente = await find_one(docentes_collection, {"_id": current_user["user_id"]}, DOCENTE_ASIGNADAS)
+    if str(campos["materia_id"]) not in docente.get("materias", []):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes asignada esta materia")
+    
+    sesion_id = hashlib.sha256(f"{current_user['user_id']}{datetime.utcnow().isoformat()}".encode()).hexdigest()[:16]
+    sesion = await create_session(
+        sesion_id, f"{sesion_id}{os.path.splitext(nombre_archivo)[1]}", current_user["user_id"],
+        content_type, tamano, descripcion=datos.get("descripcion", ""), crop_area=crop_area, **campos
+    )
+    return {**sesion_estado(sesion), "chunk_size": settings.upload_session_chunk_bytes}
+
+@router.get("/evidencias/sesiones/{sesion_id}")
+async def consultar_sesion_subida(sesion_id: str, current_user: Dict = Depends(get_current_user)):
+    """Offset confirmado de una subida: el cliente reanuda desde ahí"""
+    if current_user["role"] != "docente":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    
+    sesion = await get_session(sesion_id, current_user["user_id"])
+    if not sesion:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sesión de subida no encontrada")
+    return sesion_estado(sesion)
+
+@router.put("/evidencias/sesiones/{sesion_id}")
+async def subir_bloque(
+    sesion_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    current_user: Dict = Depends(get_current_user)
+):
+    """Recibe un bloque (cuerpo crudo) que empieza en offset; 409 con el offset esperado si no coincide"""
+    if current_user["role"] != "docente":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    
+    content_length = request.headers.get("content-length", "")
+    if not content_length.isdigit():
+        raise HTTPException(status_code=status.HTTP_411_LENGTH_REQUIRED, detail="Falta Content-Length")
+    if int(content_length) > settings.upload_session_max_chunk_bytes:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Bloque demasiado grande")
+    
+    sesion = await get_session(sesion_id, current_user["user_id"])
+    if not sesion:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sesión de subida no encontrada")
+    
+    try:
+        nuevo_offset = await append_chunk(sesion, offset, int(content_length), request.stream())
+    except ChunkConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"sesion_id": sesion_id, "offset": nuevo_offset, "tamano": sesion["tamano"]}
+
+@router.post("/evidencias/sesiones/{sesion_id}/finalizar")
+async def finalizar_sesion_subida(sesion_id: str, current_user: Dict = Depends(get_current_user)):
+    """Procesa el archivo completo (orientación, recorte) y guarda la evidencia; idempotente"""
+    if current_user["role"] != "docente":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
+    
+    sesion = await get_session(sesion_id, current_user["user_id"])
+    if not sesion:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sesión de subida no encontrada")
+    if sesion["estado"] == "finalizada":
+        # Reintento tras perder la respuesta: misma evidencia
+        return sesion["resultado"]
+    
+    sesion = await begin_finalize(sesion_id, current_user["user_id"])
+    if not sesion:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La subida no está completa o ya se está procesando")
+    
+    try:
+        archivo = await open_session_file(sesion)
+        try:
+            procesada = await asyncio.to_thread(
+                process_evidence, archivo, sesion["temp_filename"], sesion.get("crop_area")
+            )
+        except ValueError as e:
+            # La imagen no se puede procesar: reintentar no sirve, se descarta la subida
+            await discard_staging(sesion)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        finally:
+            archivo.close()
+        log_procesada(sesion["temp_filename"], sesion.get("crop_area"), procesada)
+        resultado = await guardar_evidencia_procesada(
+            current_user, sesion["estudiante_id"], sesion["materia_id"], sesion["grupo"], sesion["aporte"],
+            sesion.get("descripcion", ""), procesada
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Falla transitoria (almacenamiento, Mongo): se conservan los bloques y se puede volver a finalizar
+        await reopen_session(sesion)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error al procesar imagen: {str(e)}")
+    
+    if not await complete_session(sesion, resultado):
+        # Se pasó de FINALIZE_LEASE_SECONDS y otro finalizar retomó la sesión: vale la evidencia de ese
+        await evidencias_collection.delete_one({"_id": ObjectId(resultado["id"])})
+        await get_storage().delete(storage_key(EVIDENCIAS, resultado["archivo_hash"]))
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La subida ya se está procesando")
+    
+    # REGISTRAR LOG
+    await log_action(
+        current_user["user_id"],
+        "docente",
+        "SUBIR_EVIDENCIA",
+        f"Evidencia subida: {resultado['materia_nombre']} - {sesion['grupo']} - {sesion['aporte']}"
+    )
+    return resultado
+
 # =============== RECALIFICACIONES ===============
 
 @router.get("/recalificaciones", response_model=List[SolicitudResponse])
-async def listar_recalificaciones_asignadas(current_user: Dict = Depends(get_current_user)):
+async def listar_recalificaciones_asignadas(request: Request, current_user: Dict = Depends(get_current_user)):
     """Lista todas las solicitudes de recalificación asignadas al docente"""
     if current_user["role"] != "docente":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
-    print(f"\n🔄 DEBUG RECALIFICACIONES ASIGNADAS:")
-    print(f"   Docente ID: {current_user['user_id']}")
-    
     # Buscar solicitudes donde este docente esté asignado como RECALIFICADOR
-    solicitudes = await solicitudes_collection.find({
+    solicitudes = await find_list(solicitudes_collection, {
         "docente_recalificador_id": current_user["user_id"],
         "estado": {"$in": ["en_revision", "calificada"]}
-    }).sort("fecha_creacion", -1).to_list(length=1000)
+    }, SOLICITUD_LISTA, sort=[("fecha_creacion", -1)], length=1000)
     
-    print(f"   Solicitudes encontradas: {len(solicitudes)}")
+    # Una sola consulta para las materias de todo el listado
+    materias = await find_by_ids(materias_collection, (sol["materia_id"] for sol in solicitudes), MATERIA_NOMBRE)
     
     resultado = []
     for sol in solicitudes:
-        # Buscar materia - puede ser string o ObjectId
-        materia_id = sol["materia_id"]
-        print(f"🔍 DEBUG RECALIFICACION: Buscando materia {materia_id} (tipo: {type(materia_id)})")
+        materia = materias.get(str(sol["materia_id"]))
         
-        materia = await materias_collection.find_one({"_id": materia_id})
-        
-        # Si no se encuentra, intentar con el otro tipo
-        if not materia and isinstance(materia_id, str):
-            try:
-                materia = await materias_collection.find_one({"_id": ObjectId(materia_id)})
-            except:
-                pass
-        
-        if not materia and isinstance(materia_id, ObjectId):
-            materia = await materias_collection.find_one({"_id": str(materia_id)})
-        
-        print(f"   {'✅' if materia else '❌'} Materia: {materia['nombre'] if materia else 'NO ENCONTRADA'}")
-        
-        resultado.append(SolicitudResponse(
-            id=str(sol["_id"]),
-            estudiante_id=str(sol["estudiante_id"]),
-            estudiante_nombre_anonimo=sol.get("estudiante_nombre_anonimo", "Anónimo"),
-            materia_id=str(sol["materia_id"]),
-            materia_nombre=materia["nombre"] if materia else "Desconocida",
-            docente_id=str(sol["docente_id"]),
-            docente_nombre_anonimo=sol.get("docente_nombre_anonimo", "Anónimo"),
-            grupo=sol["grupo"],
-            aporte=sol["aporte"],
-            calificacion_actual=sol.get("calificacion_actual", 0),
-            motivo=sol.get("motivo", ""),
-            estado=sol["estado"],
-            fecha_creacion=sol["fecha_creacion"],
-            fecha_actualizacion=sol["fecha_actualizacion"]
-        ))
+        resultado.append({
+            "id": str(sol["_id"]),
+            "estudiante_id": str(sol["estudiante_id"]),
+            "estudiante_nombre_anonimo": sol.get("estudiante_nombre_anonimo", "Anónimo"),
+            "materia_id": str(sol["materia_id"]),
+            "materia_nombre": materia["nombre"] if materia else "Desconocida",
+            "docente_id": str(sol["docente_id"]),
+            "docente_nombre_anonimo": sol.get("docente_nombre_anonimo", "Anónimo"),
+            "grupo": sol["grupo"],
+            "aporte": sol["aporte"],
+            "calificacion_actual": sol.get("calificacion_actual", 0),
+            "motivo": sol.get("motivo", ""),
+            "estado": sol["estado"],
+            "fecha_creacion": sol["fecha_creacion"],
+            "fecha_actualizacion": sol["fecha_actualizacion"]
+        })
     
-    return resultado
+    return model_rows(request, resultado, SolicitudResponse)
 
 @router.post("/recalificaciones/{solicitud_id}/calificar")
 async def calificar_solicitud(
@@ -561,10 +990,10 @@ async def calificar_solicitud(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
     # Verificar que la solicitud existe y está asignada a este docente como RECALIFICADOR
-    solicitud = await solicitudes_collection.find_one({
+    solicitud = await find_one(solicitudes_collection, {
         "_id": ObjectId(solicitud_id),
         "docente_recalificador_id": current_user["user_id"]
-    })
+    }, SOLICITUD_CALIFICAR)
     
     if not solicitud:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada o no asignada")
@@ -578,16 +1007,24 @@ async def calificar_solicitud(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La nota debe estar entre 0 y 10")
     
     # Actualizar solicitud
-    await solicitudes_collection.update_one(
-        {"_id": ObjectId(solicitud_id)},
+    fecha = datetime.utcnow()
+    anterior = await solicitudes_collection.find_one_and_update(
+        # Condicionado al estado leído: otra petición pudo calificarla entretanto
+        {"_id": ObjectId(solicitud_id), "estado": solicitud["estado"]},
         {
             "$set": {
                 "estado": "calificada",
                 "calificacion_nueva": nota,
                 "comentario_docente": calificacion.get("comentario", ""),
-                "fecha_actualizacion": datetime.utcnow()
+                "fecha_actualizacion": fecha
             }
-        }
+        },
+        projection=SOLICITUD_TRANSICION.spec
+    )
+    if anterior is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La solicitud cambió de estado, recarga e intenta de nuevo")
+    await record_transition(
+        anterior["materia_id"], anterior["estado"], "calificada", anterior.get("fecha_creacion"), fecha
     )
     
     # Notificar al estudiante
@@ -621,7 +1058,7 @@ async def obtener_evidencia_solicitud(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado")
     
     # Verificar que la solicitud existe y está asignada a este docente como recalificador
-    solicitud = await solicitudes_collection.find_one({"_id": ObjectId(solicitud_id)})
+    solicitud = await find_one(solicitudes_collection, {"_id": ObjectId(solicitud_id)}, SOLICITUD_EVIDENCIA)
     
     if not solicitud:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada")
@@ -633,26 +1070,6 @@ async def obtener_evidencia_solicitud(
             detail="No tienes permiso para ver esta evidencia"
         )
     
-    print(f"\n📎 DEBUG EVIDENCIA SOLICITUD:")
-    print(f"   Solicitud ID: {solicitud_id}")
-    print(f"   Docente original: {solicitud.get('docente_id')}")
-    print(f"   Materia: {solicitud.get('materia_id')}")
-    print(f"   Grupo: {solicitud.get('grupo')}")
-    print(f"   Aporte: {solicitud.get('aporte')}")
-    print(f"   Estudiante: {solicitud.get('estudiante_id')}")
-    
-    # Buscar TODAS las evidencias para debug
-    todas_evidencias = await evidencias_collection.find({}).to_list(length=100)
-    print(f"\n   📋 TODAS las evidencias en BD ({len(todas_evidencias)}):")
-    for ev in todas_evidencias:
-        print(f"      - ID: {ev.get('_id')}")
-        print(f"        Estudiante: {ev.get('estudiante_id')}")
-        print(f"        Docente: {ev.get('docente_id')}")
-        print(f"        Materia: {ev.get('materia_id')}")
-        print(f"        Grupo: {ev.get('grupo')}")
-        print(f"        Aporte: {ev.get('aporte')}")
-        print()
-    
     # Buscar la evidencia del docente original para este estudiante/materia/grupo/aporte
     query = {
         "estudiante_id": solicitud.get("estudiante_id"),
@@ -661,22 +1078,18 @@ async def obtener_evidencia_solicitud(
         "grupo": solicitud.get("grupo"),
         "aporte": solicitud.get("aporte")
     }
-    print(f"   🔍 Query de búsqueda: {query}")
-    
-    evidencia = await evidencias_collection.find_one(query)
+    evidencia = await find_one(evidencias_collection, query, EVIDENCIA_DETALLE)
     
     if not evidencia:
-        print(f"   ❌ No se encontró evidencia con esos criterios exactos")
+        logger.info("Solicitud sin evidencia asociada", extra={"solicitud_id": solicitud_id, "query": query})
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No hay evidencia asociada a esta solicitud"
         )
     
-    print(f"   ✅ Evidencia encontrada: {evidencia.get('archivo_nombre_hash')}")
-    
     return {
         "id": str(evidencia["_id"]),
-        "archivo_url": evidencia.get("archivo_url"),
+        "archivo_url": archivo_url(evidencia["_id"]) if evidencia.get("archivo_url") else None,
         "archivo_nombre_hash": evidencia.get("archivo_nombre_hash"),
         "descripcion": evidencia.get("descripcion"),
         "recortada": evidencia.get("recortada", False),
@@ -0,0 +1,164 @@
+"""
+Pruebas de los handlers contra una base en memoria (mongomock).
+
+Se arman como en los contenedores: common/ y el directorio de cada servicio en
+el path (el Dockerfile los copia juntos en /app). Cada prueba arma una app
+FastAPI con el router del servicio y el middleware del presupuesto de
+consultas, y pide con TestClient como lo haría el frontend.
+
+Las variables de entorno se fijan antes de importar config: las proyecciones
+corren en modo estricto, así que un handler que lee un campo que no declaró
+falla con ProjectionError.
+
+Uso (desde la raíz del repo):
+    pip install -r common/requirements.txt -r tests/requirements.txt
+    python -m pytest tests
+"""
+import os
+import sys
+from itertools import islice
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "common"), str(ROOT / "microservices" / "admin"), str(ROOT / "microservices" / "teacher")]
+
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DATABASE_NAME", "blindcheck_test")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("ENCRYPTION_KEY", "test")
+os.environ["STRICT_PROJECTIONS"] = "true"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import mongomock  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import database  # noqa: E402
+from utils.auth import get_current_user  # noqa: E402
+from utils.query_budget import QueryBudgetMiddleware, query_budget_listener  # noqa: E402
+
+pytest_plugins = ["pytester", "utils.pytest_query_budget"]
+
+# =============== COLECCIONES EN MEMORIA ===============
+# Adaptador asíncrono mínimo sobre mongomock con la interfaz de Motor que usan
+# los handlers probados. Cada operación avisa al listener del presupuesto de
+# consultas como lo haría pymongo, así que QueryStats y el plugin de pytest
+# ven los mismos comandos que en producción.
+
+def _notify(command_name: str, collection: str, filtro):
+    query_budget_listener.started(SimpleNamespace(
+        command_name=command_name, command={command_name: collection, "filter": filtro or {}},
+    ))
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit: int):
+        self._cursor.limit(limit)
+        return self
+
+    def skip(self, skip: int):
+        self._cursor.skip(skip)
+        return self
+
+    def batch_size(self, size: int):
+        return self
+
+    async def to_list(self, length=None):
+        return list(islice(self._cursor, length)) if length else list(self._cursor)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._cursor)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class AsyncCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def with_options(self, **kwargs):
+        # Read preference y read concern no aplican a una base en memoria
+        return self
+
+    def find(self, filtro=None, projection=None, **kwargs):
+        _notify("find", self._collection.name, filtro)
+        return AsyncCursor(self._collection.find(filtro or {}, projection, **kwargs))
+
+    async def find_one(self, filtro=None, projection=None, **kwargs):
+        _notify("find", self._collection.name, filtro)
+        return self._collection.find_one(filtro or {}, projection, **kwargs)
+
+    async def count_documents(self, filtro, **kwargs):
+        _notify("aggregate", self._collection.name, filtro)
+        return self._collection.count_documents(filtro, **kwargs)
+
+    @property
+    def name(self) -> str:
+        return self._collection.name
+
+    def aggregate(self, pipeline, **kwargs):
+        _notify("aggregate", self._collection.name, None)
+        pipeline = list(pipeline)
+        if pipeline and "$merge" in pipeline[-1]:
+            # mongomock no implementa $merge: se corre el resto y se reemplaza o inserta por _id
+            merge = pipeline.pop()["$merge"]
+            destino = self._collection.database[merge["into"]]
+            for doc in self._collection.aggregate(pipeline, **kwargs):
+                destino.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+            return AsyncCursor(iter([]))
+        return AsyncCursor(iter(self._collection.aggregate(pipeline, **kwargs)))
+
+    def __getattr__(self, attr):
+        # Escrituras e índices (insert_one, update_one, find_one_and_update, ...): la misma llamada, awaitable
+        method = getattr(self._collection, attr)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """Base mongomock (sincrónica, para cargar datos) detrás de las colecciones de database.py"""
+    db = mongomock.MongoClient()["blindcheck_test"]
+    # Un cliente nuevo por prueba: las LazyCollection descartan lo que tenían cacheado
+    client = object()
+    monkeypatch.setattr(database, "get_client", lambda: client)
+    monkeypatch.setattr(database, "get_collection", lambda name: AsyncCollection(db[name]))
+    return db
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """Almacenamiento local en un directorio temporal como driver de get_storage()"""
+    import utils.storage
+
+    local = utils.storage.LocalStorage(str(tmp_path / "uploads"), fanout=2)
+    monkeypatch.setattr(utils.storage, "_storage", local)
+    return local
+
+# =============== APP DE PRUEBA ===============
+
+@pytest.fixture
+def make_client(mongo):
+    """make_client(router, usuario) -> TestClient con el router y el usuario autenticado"""
+
+    def make(router, user: dict) -> TestClient:
+        app = FastAPI()
+        app.include_router(router)
+        app.add_middleware(QueryBudgetMiddleware)
+        app.dependency_overrides[get_current_user] = lambda: user
+        return TestClient(app)
+
+    return make
@@ -0,0 +1,47 @@
+"""
+ETags por versión (utils/etags.py): 304 mientras no haya escrituras y un ETag
+nuevo después de cada bump().
+"""
+import pytest
+
+from routers import subdecano
+from utils import etags
+
+SUBDECANO = {"user_id": "SUB001", "role": "subdecano"}
+
+@pytest.fixture
+def client(make_client, mongo, monkeypatch):
+    # La caché de versiones es del proceso: cada prueba empieza sin versiones leídas
+    monkeypatch.setattr(etags, "_cache", {})
+    mongo.materias.insert_one({"nombre": "Cálculo", "codigo": "MAT101", "descripcion": None})
+    return make_client(subdecano.router, SUBDECANO)
+
+def test_304_mientras_no_cambia(client):
+    primera = client.get("/api/subdecano/materias")
+    assert primera.status_code == 200
+    assert primera.headers["Cache-Control"] == "private, no-cache"
+    etag = primera.headers["ETag"]
+
+    revalidada = client.get("/api/subdecano/materias", headers={"If-None-Match": etag})
+    assert revalidada.status_code == 304
+    assert revalidada.content == b""
+    assert revalidada.headers["ETag"] == etag
+    # Débil o en una lista también vale
+    assert client.get("/api/subdecano/materias", headers={"If-None-Match": f'"otro", W/{etag}'}).status_code == 304
+
+def test_escritura_cambia_el_etag(client):
+    etag = client.get("/api/subdecano/materias").headers["ETag"]
+    creada = client.post("/api/subdecano/materias", json={"nombre": "Física", "codigo": "FIS101"})
+    assert creada.status_code == 200
+
+    response = client.get("/api/subdecano/materias", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [materia["codigo"] for materia in response.json()] == ["FIS101", "MAT101"]
+
+def test_epoch_nuevo_si_se_borran_las_versiones(client, mongo, monkeypatch):
+    etag = client.get("/api/subdecano/materias").headers["ETag"]
+    # Regenerar el dataset borra versiones: el contador vuelve a 0 pero el ETag no se repite
+    mongo.versiones.delete_many({})
+    monkeypatch.setattr(etags, "_cache", {})
+    assert client.get("/api/subdecano/materias", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,124 @@
+"""
+Subida de evidencias del docente: errores del cliente, limpieza de archivos y
+formato guardado.
+"""
+import io
+import json
+
+import pytest
+from bson import ObjectId
+from PIL import Image
+
+from routers import docente
+
+DOCENTE = {"user_id": "DOC001", "role": "docente"}
+MATERIA_ID = ObjectId()
+
+def png(width: int = 64, height: int = 48) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+@pytest.fixture
+def client(make_client, mongo):
+    mongo.docentes.insert_one({"_id": "DOC001", "nombre": "Docente 1", "materias": [str(MATERIA_ID)]})
+    mongo.materias.insert_one({"_id": MATERIA_ID, "nombre": "Cálculo", "codigo": "MAT101"})
+    return make_client(docente.router, DOCENTE)
+
+def subir_recortada(client, data: bytes, materia_id=str(MATERIA_ID), crop_area=None):
+    form = {"estudiante_id": "EST001", "materia_id": materia_id, "grupo": "GR1", "aporte": "Examen"}
+    if crop_area is not None:
+        form["crop_area"] = json.dumps(crop_area)
+    return client.post(
+        "/api/docente/evidencias/subir-recortada", data=form,
+        files={"archivo": ("examen.png", data, "image/png")},
+    )
+
+# =============== SUBIR RECORTADA: ERRORES DEL CLIENTE ===============
+
+def test_imagen_corrupta_es_400(client):
+    response = subir_recortada(client, b"no es una imagen")
+    assert response.status_code == 400
+    assert "Imagen no válida" in response.json()["detail"]
+
+def test_recorte_fuera_de_la_imagen_es_400(client):
+    response = subir_recortada(client, png(), crop_area={"x": 0, "y": 40, "width": 64, "height": 20})
+    assert response.status_code == 400
+
+def test_crop_area_no_numerico_es_400(client):
+    response = subir_recortada(client, png(), crop_area={"x": 0, "y": "10", "width": 64, "height": 5})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "crop_area inválido"
+
+def test_materia_id_invalido_es_400(client):
+    response = subir_recortada(client, png(), materia_id="no-es-un-id")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "materia_id inválido"
+
+# =============== FORMATO GUARDADO ===============
+
+def test_subida_registra_el_formato_conservado(client, mongo, storage, monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "image_normalize", True)
+    monkeypatch.setattr(settings, "image_format", "jpeg")
+    response = subir_recortada(client, png())
+    assert response.status_code == 200
+    doc = mongo.evidencias.find_one()
+    assert (doc["normalizada"], doc["formato_conservado"]) == (False, True)
+    assert doc["archivo_nombre_hash"].endswith(".png")
+    assert doc["bytes_almacenados"] <= doc["bytes_original"]
+
+# =============== LOTE: LIMPIEZA SI FALLA EL INSERT ===============
+
+def subir_lote(client, estudiantes):
+    return client.post(
+        "/api/docente/evidencias/lote",
+        data={"items": json.dumps([{"estudiante_id": est} for est in estudiantes]),
+              "materia_id": str(MATERIA_ID), "grupo": "GR1", "aporte": "Examen"},
+        files=[("archivos", (f"{est}.png", png(), "image/png")) for est in estudiantes],
+    )
+
+def archivos_guardados(storage) -> set:
+    return {path.name for path in (storage.root / "evidencias").rglob("*") if path.is_file()}
+
+def archivos_de_la_base(mongo) -> set:
+    return {doc["archivo_nombre_hash"] for doc in mongo.evidencias.find()}
+
+def test_lote_con_error_de_escritura(client, mongo, storage):
+    # Índice único: la evidencia de EST002 ya existe y su insert falla, las otras dos no
+    mongo.evidencias.create_index("estudiante_id", unique=True)
+    mongo.evidencias.insert_one({"estudiante_id": "EST002", "archivo_nombre_hash": "previa.jpg"})
+
+    response = subir_lote(client, ["EST001", "EST002", "EST003"])
+    assert response.status_code == 200
+    assert (response.json()["guardadas"], response.json()["fallidas"]) == (2, 1)
+    assert "error" in response.json()["resultados"][1]
+    assert archivos_guardados(storage) == archivos_de_la_base(mongo) - {"previa.jpg"}
+
+def test_lote_con_resultado_incierto(client, mongo, storage, monkeypatch):
+    from pymongo.errors import AutoReconnect
+
+    evidencias = docente.evidencias_collection
+
+    class CorteDeRed:
+        """insert_many que guarda el primer documento y pierde la conexión"""
+
+        async def insert_many(self, docs, **kwargs):
+            await evidencias.insert_one(docs[0])
+            for doc in docs[1:]:
+                doc.setdefault("_id", ObjectId())
+            raise AutoReconnect("connection reset")
+
+        def __getattr__(self, attr):
+            return getattr(evidencias, attr)
+
+    monkeypatch.setattr(docente, "evidencias_collection", CorteDeRed())
+    response = subir_lote(client, ["EST001", "EST002", "EST003"])
+    assert response.status_code == 200
+    resultados = response.json()["resultados"]
+    assert response.json()["guardadas"] == 1
+    assert "id" in resultados[0] and "error" in resultados[1] and "error" in resultados[2]
+    # Ni archivos sin documento ni documentos sin archivo
+    assert archivos_guardados(storage) == archivos_de_la_base(mongo)
+    assert len(archivos_de_la_base(mongo)) == 1
@@ -0,0 +1,73 @@
+"""
+Normalización de evidencias (utils/images.py): si recodificar agranda el
+archivo sin reducirlo se conserva el formato original, y el informe de ahorro
+no lo cuenta como ahorro.
+"""
+import asyncio
+import io
+import random
+
+import pytest
+from PIL import Image
+
+from config import settings
+from tools.image_report import scan
+from utils.images import process_evidence
+
+def png_liso(width: int = 64, height: int = 48) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def png_ruido(width: int = 256, height: int = 192) -> bytes:
+    rng = random.Random(1)
+    img = Image.frombytes("RGB", (width, height), bytes(rng.randrange(256) for _ in range(width * height * 3)))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+@pytest.fixture(autouse=True)
+def normalizar(monkeypatch):
+    monkeypatch.setattr(settings, "image_format", "jpeg")
+    monkeypatch.setattr(settings, "image_max_edge", 2560)
+
+def test_conserva_el_formato_si_normalizar_agranda():
+    original = png_liso()
+    procesada = process_evidence(original, "captura.png", normalize=True)
+    assert procesada["formato_conservado"] is True
+    assert procesada["normalizada"] is False
+    assert (procesada["extension"], procesada["content_type"]) == (".png", "image/png")
+    assert len(procesada["data"]) <= len(original)
+
+def test_conserva_el_formato_tambien_recortada():
+    procesada = process_evidence(png_liso(), "captura.png", {"x": 0, "y": 0, "width": 64, "height": 10}, normalize=True)
+    assert procesada["formato_conservado"] is True
+    assert procesada["dimension_final"] == (64, 38)
+
+def test_normaliza_si_reduce_el_archivo():
+    procesada = process_evidence(png_ruido(), "foto.png", normalize=True)
+    assert procesada["formato_conservado"] is False
+    assert procesada["normalizada"] is True
+    assert procesada["content_type"] == "image/jpeg"
+
+def test_reducida_no_conserva_el_formato(monkeypatch):
+    # Con reducción de tamaño se normaliza aunque el archivo crezca: las dimensiones mandan
+    monkeypatch.setattr(settings, "image_max_edge", 32)
+    procesada = process_evidence(png_liso(), "captura.png", normalize=True)
+    assert procesada["formato_conservado"] is False
+    assert procesada["dimension_final"] == (32, 24)
+
+def test_informe_no_cuenta_las_conservadas_como_ahorro(mongo):
+    mongo.evidencias.insert_many([
+        {"archivo_url": "/uploads/evidencias/a.jpg", "normalizada": True,
+         "bytes_original": 1000, "bytes_almacenados": 400},
+        {"archivo_url": "/uploads/evidencias/b.png", "normalizada": False, "formato_conservado": True,
+         "bytes_original": 300, "bytes_almacenados": 250},
+        {"archivo_url": "/uploads/evidencias/c.jpg"},
+    ])
+    resultado = asyncio.run(scan(10, random.Random(1)))
+    assert resultado["normalizadas"] == {
+        "evidencias": 1, "bytes_original": 1000, "bytes_almacenados": 400, "ahorro": 0.6,
+    }
+    assert resultado["conservadas"] == {"evidencias": 1, "bytes_almacenados": 250}
+    assert (resultado["sin_normalizar"], resultado["muestra"]) == (1, ["/uploads/evidencias/c.jpg"])
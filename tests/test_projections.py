@@ -0,0 +1,60 @@
+"""
+Los listados leen solo los campos de su proyección (utils/queries.py).
+
+Con STRICT_PROJECTIONS=true (ver conftest.py) un acceso a un campo no
+declarado lanza ProjectionError, que TestClient propaga a la prueba.
+"""
+from datetime import datetime
+
+import pytest
+
+from routers import docente, subdecano
+from utils.queries import Projection, ProjectionError
+
+SUBDECANO = {"user_id": "SUB001", "role": "subdecano"}
+DOCENTE = {"user_id": "DOC001", "role": "docente"}
+
+@pytest.fixture
+def personas(mongo):
+    """Docentes y estudiantes con todos los campos que guarda el sistema, incluidos los sensibles"""
+    mongo.docentes.insert_many([
+        {
+            "_id": f"DOC{i:03d}", "email": f"docente{i}@uni.edu", "nombre": f"Docente {i}",
+            "password": "hash", "carrera": "Software", "materias": ["M1"], "activo": True,
+            "primer_login": False, "fecha_registro": datetime(2026, 1, i), "busqueda": "docente",
+        }
+        for i in range(1, 4)
+    ])
+    mongo.estudiantes.insert_many([
+        {
+            "_id": f"EST{i:03d}", "email": f"estudiante{i}@uni.edu", "nombre": f"Estudiante {i}",
+            "password": "hash", "carrera": "Sistemas", "materias_cursando": ["M1"], "activo": True,
+            "primer_login": True, "fecha_registro": datetime(2026, 2, i), "busqueda": "estudiante",
+        }
+        for i in range(1, 4)
+    ])
+    return mongo
+
+def test_listar_docentes(make_client, personas):
+    response = make_client(subdecano.router, SUBDECANO).get("/api/subdecano/docentes")
+    assert response.status_code == 200
+    assert [doc["id"] for doc in response.json()] == ["DOC001", "DOC002", "DOC003"]
+    assert "password" not in response.json()[0]
+
+def test_listar_estudiantes_subdecano(make_client, personas):
+    response = make_client(subdecano.router, SUBDECANO).get("/api/subdecano/estudiantes")
+    assert response.status_code == 200
+    assert response.json()[0]["materias_cursando"] == ["M1"]
+
+def test_listar_estudiantes_docente(make_client, personas):
+    response = make_client(docente.router, DOCENTE).get("/api/docente/estudiantes")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": f"EST{i:03d}", "nombre": f"Estudiante {i}", "carrera": "Sistemas"} for i in range(1, 4)
+    ]
+
+def test_campo_fuera_de_la_proyeccion(make_client, personas, monkeypatch):
+    # La misma proyección sin "carrera": el handler la lee igual y debe fallar
+    monkeypatch.setattr(docente, "ESTUDIANTE_PICKER", Projection("nombre"))
+    with pytest.raises(ProjectionError, match="carrera"):
+        make_client(docente.router, DOCENTE).get("/api/docente/estudiantes")
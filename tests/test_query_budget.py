@@ -0,0 +1,90 @@
+"""
+Presupuesto de consultas por petición (utils/query_budget.py y el plugin
+utils/pytest_query_budget.py, activado en conftest.py).
+
+Los listados que resuelven sus referencias con find_by_ids hacen una consulta
+por colección, no una por fila: max_repeated=0 falla si vuelve un N+1.
+"""
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from routers import docente
+
+DOCENTE = {"user_id": "DOC001", "role": "docente"}
+
+@pytest.fixture
+def evidencias(mongo):
+    """Seis evidencias de tres materias, con materia_id como str(ObjectId) o como ObjectId"""
+    materias = [ObjectId() for _ in range(3)]
+    mongo.materias.insert_many([
+        {"_id": _id, "nombre": f"Materia {i}", "codigo": f"M{i}"} for i, _id in enumerate(materias)
+    ])
+    mongo.evidencias.insert_many([
+        {
+            "docente_id": "DOC001", "materia_id": str(materias[i % 3]) if i % 2 else materias[i % 3],
+            "estudiante_id": "EST001", "grupo": "GR1", "aporte": "1", "descripcion": f"Evidencia {i}",
+            "archivo_nombre_hash": f"{i:016x}.jpg", "archivo_url": f"/uploads/evidencias/{i:016x}.jpg",
+            "codigo_interno": f"EV-{i}", "fecha_subida": datetime(2026, 3, 1 + i),
+        }
+        for i in range(6)
+    ])
+    return mongo
+
+@pytest.mark.query_budget(max_queries=2, max_repeated=0)
+def test_listar_evidencias_sin_n_mas_uno(make_client, evidencias):
+    response = make_client(docente.router, DOCENTE).get("/api/docente/evidencias")
+    assert response.status_code == 200
+    assert len(response.json()) == 6
+    assert {ev["materia_nombre"] for ev in response.json()} == {"Materia 0", "Materia 1", "Materia 2"}
+
+def test_consultas_atribuidas_a_la_peticion(make_client, evidencias, mongo_queries):
+    client = make_client(docente.router, DOCENTE)
+    client.get("/api/docente/evidencias")
+    client.get("/api/docente/evidencias")
+
+    # Una entrada por petición, con su ruta y solo sus propios comandos
+    assert [route for route, _ in mongo_queries] == ["/api/docente/evidencias"] * 2
+    for _, stats in mongo_queries:
+        assert stats.commands == 2
+        assert stats.repeated == 0
+        assert set(stats.shapes) == {
+            "find evidencias {docente_id:?}",
+            "find materias {_id:{$in:[?]}}",
+        }
+
+N_MAS_UNO = '''
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.query_budget import QueryBudgetMiddleware, query_budget_listener
+
+app = FastAPI()
+app.add_middleware(QueryBudgetMiddleware)
+
+@app.get("/materias")
+def listar():
+    # Un find_one por fila: la misma forma de consulta tres veces
+    for materia_id in range(3):
+        query_budget_listener.started(SimpleNamespace(
+            command_name="find", command={"find": "materias", "filter": {"_id": materia_id}},
+        ))
+    return []
+
+@pytest.mark.query_budget(max_repeated=0)
+def test_n_mas_uno():
+    TestClient(app).get("/materias")
+'''
+
+def test_presupuesto_excedido_falla_el_test(pytester):
+    pytester.makepyfile(N_MAS_UNO)
+    result = pytester.runpytest_inprocess("-p", "utils.pytest_query_budget")
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines([
+        "*Presupuesto de consultas excedido:*",
+        "*/materias: 2 consultas repetidas (presupuesto 0); posible N+1 x3: find materias {_id:?}*",
+    ])
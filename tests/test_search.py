@@ -0,0 +1,21 @@
+"""
+Búsqueda por prefijo (utils/search.py): las primeras k por nombre normalizado,
+no k coincidencias cualesquiera ordenadas después.
+"""
+from routers import subdecano
+from utils.search import search_fields
+
+SUBDECANO = {"user_id": "SUB001", "role": "subdecano"}
+NOMBRES = ["Zoila García", "Álvaro García", "Bruno García", "Álvaro García", "Carla Garcés", "Ana Torres"]
+
+def test_primeros_k_por_nombre(make_client, mongo):
+    # Insertados al revés del orden esperado: Mongo los devuelve en orden natural
+    mongo.docentes.insert_many([
+        {"_id": f"DOC{i:03d}", "email": f"docente{i}@uni.edu", "nombre": nombre, "carrera": "Software",
+         **search_fields(nombre, f"docente{i}@uni.edu")}
+        for i, nombre in reversed(list(enumerate(NOMBRES)))
+    ])
+    response = make_client(subdecano.router, SUBDECANO).get("/api/subdecano/docentes/buscar?q=garc&k=3")
+    assert response.status_code == 200
+    # Sin tildes en el orden, y el _id desempata los nombres repetidos
+    assert [doc["id"] for doc in response.json()] == ["DOC001", "DOC003", "DOC002"]
@@ -0,0 +1,134 @@
+"""
+Subidas temporales y sesiones reanudables (utils/staging.py) sobre mongomock y
+almacenamiento local en un directorio temporal.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils import staging
+from utils.staging import ChunkConflict
+
+DOCENTE_ID = "DOC001"
+
+async def chunks(data: bytes):
+    yield data
+
+async def sesion_completa(sesion_id: str = "ses1", data: bytes = b"0123456789") -> dict:
+    sesion = await staging.create_session(sesion_id, f"{sesion_id}.jpg", DOCENTE_ID, "image/jpeg", len(data))
+    await staging.append_chunk(sesion, 0, len(data), chunks(data))
+    return await staging.get_session(sesion_id, DOCENTE_ID)
+
+# =============== BARRIDO ===============
+
+def test_barrido_de_vencidas(mongo, storage, monkeypatch):
+    async def run():
+        vencida = await staging.create_staging("tmp1", "tmp1.jpg", DOCENTE_ID, "image/jpeg", chunks(b"vieja"))
+        vigente = await staging.create_staging("tmp2", "tmp2.jpg", DOCENTE_ID, "image/jpeg", chunks(b"nueva"))
+        sesion = await sesion_completa("ses1")
+        # La temporal y la sesión vencieron (el TTL de Mongo todavía no las borró)
+        mongo.evidencias_staging.update_many(
+            {"_id": {"$in": ["tmp1", "ses1"]}}, {"$set": {"expira": datetime.utcnow() - timedelta(seconds=1)}}
+        )
+        assert await staging.get_staging("tmp1", DOCENTE_ID) is None
+
+        assert await staging.sweep_expired() == 2
+        assert not await storage.exists(vencida["clave"])
+        assert not await storage.exists(sesion["partes"][0]["clave"])
+        assert await storage.exists(vigente["clave"])
+        # Barrer de nuevo (otra réplica a la vez) no falla ni borra más
+        assert await staging.sweep_expired() == 0
+
+    asyncio.run(run())
+    assert [doc["_id"] for doc in mongo.evidencias_staging.find()] == ["tmp2"]
+
+def test_subida_fallida_no_deja_registro(mongo, storage):
+    async def cortada():
+        yield b"a medias"
+        raise ConnectionError()
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            await staging.create_staging("tmp1", "tmp1.jpg", DOCENTE_ID, "image/jpeg", cortada())
+
+    asyncio.run(run())
+    assert mongo.evidencias_staging.count_documents({}) == 0
+
+# =============== BLOQUES ===============
+
+def test_bloque_fuera_de_orden(mongo, storage):
+    async def run():
+        sesion = await staging.create_session("ses1", "ses1.jpg", DOCENTE_ID, "image/jpeg", 10)
+        assert await staging.append_chunk(sesion, 0, 4, chunks(b"0123")) == 4
+        # El cliente reintenta con la sesión que leyó antes de confirmar el primer bloque
+        with pytest.raises(ChunkConflict) as conflicto:
+            await staging.append_chunk(sesion, 0, 4, chunks(b"0123"))
+        assert conflicto.value.offset == 4
+        with pytest.raises(ChunkConflict) as conflicto:
+            await staging.append_chunk(await staging.get_session("ses1", DOCENTE_ID), 6, 4, chunks(b"6789"))
+        assert conflicto.value.offset == 4
+        return await staging.get_session("ses1", DOCENTE_ID)
+
+    sesion = asyncio.run(run())
+    assert sesion["offset"] == 4
+    # El bloque confirmado sigue en el almacenamiento aunque el duplicado escribió la misma clave
+    assert [parte["offset"] for parte in sesion["partes"]] == [0]
+    assert asyncio.run(storage.get(sesion["partes"][0]["clave"])) == b"0123"
+
+def test_bloque_incompleto(mongo, storage):
+    async def run():
+        sesion = await staging.create_session("ses1", "ses1.jpg", DOCENTE_ID, "image/jpeg", 10)
+        with pytest.raises(ValueError, match="incompleto"):
+            await staging.append_chunk(sesion, 0, 6, chunks(b"012"))
+        return await staging.get_session("ses1", DOCENTE_ID)
+
+    assert asyncio.run(run())["offset"] == 0
+
+# =============== PLAZO DE FINALIZAR ===============
+
+def test_finalizar_en_curso_no_se_repite(mongo, storage):
+    async def run():
+        await sesion_completa()
+        assert await staging.begin_finalize("ses1", DOCENTE_ID)
+        return await staging.begin_finalize("ses1", DOCENTE_ID)
+
+    assert asyncio.run(run()) is None
+
+def test_finalizar_vencido_no_pisa_al_que_lo_retoma(mongo, storage):
+    async def run():
+        await sesion_completa()
+        # El primer finalizar se pasa del plazo (aquí vence al tomarlo) y otro lo retoma
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(staging, "FINALIZE_LEASE_SECONDS", -1)
+            lento = await staging.begin_finalize("ses1", DOCENTE_ID)
+        nuevo = await staging.begin_finalize("ses1", DOCENTE_ID)
+        assert nuevo is not None
+
+        # El lento falla o termina tarde: no toca la sesión del nuevo ni sus bloques
+        assert await staging.reopen_session(lento) is False
+        assert await staging.complete_session(lento, {"id": "lento"}) is False
+        actual = mongo.evidencias_staging.find_one({"_id": "ses1"})
+        assert actual["estado"] == "procesando"
+        assert actual["procesando_hasta"] == nuevo["procesando_hasta"]
+        assert await storage.exists(nuevo["partes"][0]["clave"])
+
+        assert await staging.complete_session(nuevo, {"id": "nuevo"}) is True
+        assert not await storage.exists(nuevo["partes"][0]["clave"])
+        return await staging.get_session("ses1", DOCENTE_ID)
+
+    sesion = asyncio.run(run())
+    assert sesion["estado"] == "finalizada"
+    assert sesion["resultado"] == {"id": "nuevo"}
+
+def test_reabrir_tras_falla_transitoria(mongo, storage):
+    async def run():
+        await sesion_completa()
+        sesion = await staging.begin_finalize("ses1", DOCENTE_ID)
+        assert await staging.reopen_session(sesion) is True
+        # Vuelve a subiendo con sus bloques: se puede finalizar de nuevo
+        return await staging.begin_finalize("ses1", DOCENTE_ID)
+
+    sesion = asyncio.run(run())
+    assert sesion["estado"] == "procesando"
+    assert len(sesion["partes"]) == 1
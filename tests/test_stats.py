@@ -0,0 +1,94 @@
+"""
+Estadísticas de solicitudes (utils/stats.py): los $inc de cada transición y la
+reconciliación desde solicitudes tienen que llegar a los mismos números.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from routers import docente
+from utils import stats
+
+CREADA = datetime(2026, 3, 1, 8, 0)
+DOCENTE = {"user_id": "DOC002", "role": "docente"}
+
+def sin_metadatos(doc: dict) -> dict:
+    return {k: v for k, v in doc.items() if k not in ("corrida", "reconciliado")}
+
+def test_transiciones(mongo):
+    async def run():
+        await stats.record_transition("M1", None, "pendiente")
+        await stats.record_transition("M1", "pendiente", "en_revision")
+        await stats.record_transition("M1", "en_revision", "calificada", CREADA, CREADA + timedelta(hours=2))
+        await stats.record_transition("M2", None, "pendiente")
+        # Misma transición de estado a sí mismo: no cuenta
+        await stats.record_transition("M2", "pendiente", "pendiente")
+
+    asyncio.run(run())
+    assert mongo.estadisticas.find_one({"_id": "global"}) == {
+        "_id": "global", "total": 2, "estados": {"pendiente": 1, "en_revision": 0, "calificada": 1},
+        "resolucion": {"count": 1, "segundos": 7200.0},
+    }
+    materia = mongo.estadisticas.find_one({"_id": "materia:M1"})
+    assert (materia["tipo"], materia["materia_id"], materia["total"]) == ("materia", "M1", 1)
+    assert materia["estados"] == {"pendiente": 0, "en_revision": 0, "calificada": 1}
+
+def test_reconciliar_corrige_la_deriva(mongo):
+    mongo.solicitudes.insert_many([
+        {"materia_id": "M1", "estado": "calificada", "fecha_creacion": CREADA,
+         "fecha_actualizacion": CREADA + timedelta(hours=2)},
+        {"materia_id": "M1", "estado": "pendiente", "fecha_creacion": CREADA, "fecha_actualizacion": CREADA},
+        {"materia_id": "M2", "estado": "rechazada", "fecha_creacion": CREADA,
+         "fecha_actualizacion": CREADA + timedelta(hours=1)},
+    ])
+    # Un $inc perdido y una materia que ya no tiene solicitudes
+    mongo.estadisticas.insert_many([
+        {"_id": "global", "total": 2, "estados": {"pendiente": 2}},
+        {"_id": "materia:M9", "tipo": "materia", "materia_id": "M9", "total": 1, "estados": {"pendiente": 1}},
+    ])
+    asyncio.run(stats.reconcile())
+
+    assert sin_metadatos(mongo.estadisticas.find_one({"_id": "global"})) == {
+        "_id": "global", "total": 3, "estados": {"calificada": 1, "pendiente": 1, "rechazada": 1},
+        "resolucion": {"count": 2, "segundos": 10800.0},
+    }
+    assert mongo.estadisticas.find_one({"_id": "materia:M9"}) is None
+    assert sin_metadatos(mongo.estadisticas.find_one({"_id": "materia:M2"}))["estados"] == {"rechazada": 1}
+
+# =============== CALIFICAR: TRANSICIÓN CONDICIONADA ===============
+
+def solicitud_en_revision(mongo) -> ObjectId:
+    solicitud_id = ObjectId()
+    mongo.solicitudes.insert_one({
+        "_id": solicitud_id, "estudiante_id": "EST001", "materia_id": "M1", "docente_id": "DOC001",
+        "docente_recalificador_id": "DOC002", "estado": "en_revision",
+        "fecha_creacion": CREADA, "fecha_actualizacion": CREADA,
+    })
+    return solicitud_id
+
+def test_calificar_registra_la_transicion(make_client, mongo):
+    solicitud_id = solicitud_en_revision(mongo)
+    client = make_client(docente.router, DOCENTE)
+    response = client.post(f"/api/docente/recalificaciones/{solicitud_id}/calificar", json={"nota": 8.5})
+    assert response.status_code == 200
+    assert mongo.solicitudes.find_one({"_id": solicitud_id})["estado"] == "calificada"
+    assert mongo.estadisticas.find_one({"_id": "global"})["estados"] == {"en_revision": -1, "calificada": 1}
+
+def test_calificar_en_carrera_es_409(make_client, mongo, monkeypatch):
+    solicitud_id = solicitud_en_revision(mongo)
+    leer = docente.find_one
+
+    async def leer_y_calificar_en_paralelo(*args, **kwargs):
+        # Otra petición califica justo después de que este handler leyó la solicitud
+        doc = await leer(*args, **kwargs)
+        mongo.solicitudes.update_one({"_id": solicitud_id}, {"$set": {"estado": "calificada"}})
+        return doc
+
+    monkeypatch.setattr(docente, "find_one", leer_y_calificar_en_paralelo)
+    client = make_client(docente.router, DOCENTE)
+    response = client.post(f"/api/docente/recalificaciones/{solicitud_id}/calificar", json={"nota": 8.5})
+    assert response.status_code == 409
+    # Sin transición registrada ni notificación
+    assert mongo.estadisticas.count_documents({}) == 0
+    assert mongo.mensajes.count_documents({}) == 0
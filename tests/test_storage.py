@@ -0,0 +1,157 @@
+"""
+Drivers de almacenamiento (utils/storage.py): LocalStorage sobre un
+directorio temporal y S3Storage contra un servidor moto (se omite si faltan
+aiobotocore o moto).
+"""
+import asyncio
+from urllib.parse import urlparse
+
+import pytest
+
+from utils.storage import S3_MIN_PART_SIZE, LocalStorage, S3Storage
+
+async def chunks(*parts, error=None):
+    for part in parts:
+        yield part
+    if error:
+        raise error
+
+# =============== LOCAL ===============
+
+def test_local_escribe_con_fanout(tmp_path):
+    storage = LocalStorage(str(tmp_path), fanout=2)
+
+    async def run():
+        assert await storage.put("evidencias/3f9a0c1b.jpg", b"imagen") == 6
+        assert await storage.get("evidencias/3f9a0c1b.jpg") == b"imagen"
+        assert await storage.size("evidencias/3f9a0c1b.jpg") == 6
+        assert [chunk async for chunk in storage.stream("evidencias/3f9a0c1b.jpg", chunk_size=4)] == [b"imag", b"en"]
+
+    asyncio.run(run())
+    assert (tmp_path / "evidencias" / "3f" / "9a" / "3f9a0c1b.jpg").read_bytes() == b"imagen"
+
+def test_local_lee_y_borra_el_layout_plano(tmp_path):
+    # Archivo de antes del fan-out, todavía sin migrar
+    (tmp_path / "evidencias").mkdir()
+    (tmp_path / "evidencias" / "3f9a0c1b.jpg").write_bytes(b"viejo")
+    storage = LocalStorage(str(tmp_path), fanout=2)
+
+    async def run():
+        assert await storage.exists("evidencias/3f9a0c1b.jpg")
+        assert await storage.get("evidencias/3f9a0c1b.jpg") == b"viejo"
+        await storage.delete("evidencias/3f9a0c1b.jpg")
+        assert not await storage.exists("evidencias/3f9a0c1b.jpg")
+
+    asyncio.run(run())
+    assert not (tmp_path / "evidencias" / "3f9a0c1b.jpg").exists()
+
+def test_local_escritura_atomica(tmp_path):
+    storage = LocalStorage(str(tmp_path), fanout=2)
+
+    async def run():
+        await storage.put("evidencias/3f9a0c1b.jpg", b"anterior")
+        with pytest.raises(ConnectionError):
+            await storage.put_stream("evidencias/3f9a0c1b.jpg", chunks(b"a medias", error=ConnectionError()))
+        # Ni el .part ni un archivo truncado: queda el anterior
+        assert await storage.get("evidencias/3f9a0c1b.jpg") == b"anterior"
+        with pytest.raises(FileNotFoundError):
+            await storage.get("evidencias/ffffffff.jpg")
+
+    asyncio.run(run())
+    assert [path.name for path in (tmp_path / "evidencias" / "3f" / "9a").iterdir()] == ["3f9a0c1b.jpg"]
+
+# =============== S3 (MOTO) ===============
+
+@pytest.fixture(scope="module")
+def moto_endpoint():
+    pytest.importorskip("aiobotocore")
+    server_module = pytest.importorskip("moto.server")
+    server = server_module.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+@pytest.fixture
+def s3(moto_endpoint, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+
+    def make(**kwargs) -> S3Storage:
+        return S3Storage(
+            "evidencias-test", prefix="blindcheck/", endpoint_url=moto_endpoint, region="us-east-1",
+            multipart_threshold=S3_MIN_PART_SIZE, part_size=S3_MIN_PART_SIZE, **kwargs
+        )
+
+    async def create_bucket():
+        storage = make()
+        client = await storage._get_client()
+        try:
+            await client.create_bucket(Bucket="evidencias-test")
+        except client.exceptions.BucketAlreadyOwnedByYou:
+            pass
+        await storage.close()
+
+    asyncio.run(create_bucket())
+    return make
+
+def test_s3_put_get_delete(s3):
+    storage = s3()
+
+    async def run():
+        await storage.put("evidencias/3f9a0c1b.jpg", b"imagen", "image/jpeg")
+        assert await storage.get("evidencias/3f9a0c1b.jpg") == b"imagen"
+        assert await storage.size("evidencias/3f9a0c1b.jpg") == 6
+        client = await storage._get_client()
+        head = await client.head_object(Bucket="evidencias-test", Key="blindcheck/evidencias/3f9a0c1b.jpg")
+        assert head["ContentType"] == "image/jpeg"
+        await storage.delete("evidencias/3f9a0c1b.jpg")
+        assert not await storage.exists("evidencias/3f9a0c1b.jpg")
+        with pytest.raises(FileNotFoundError):
+            await storage.get("evidencias/3f9a0c1b.jpg")
+        await storage.close()
+
+    asyncio.run(run())
+
+def test_s3_multipart(s3):
+    storage = s3()
+    parte = b"x" * (S3_MIN_PART_SIZE // 2)
+
+    async def run():
+        size = await storage.put_stream("evidencias/grande.png", chunks(*[parte] * 5))
+        assert size == len(parte) * 5
+        assert await storage.get("evidencias/grande.png") == parte * 5
+        await storage.close()
+
+    asyncio.run(run())
+
+def test_s3_multipart_abortado(s3):
+    storage = s3()
+    parte = b"x" * S3_MIN_PART_SIZE
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            await storage.put_stream("evidencias/cortado.png", chunks(parte, parte, error=ConnectionError()))
+        client = await storage._get_client()
+        pendientes = await client.list_multipart_uploads(Bucket="evidencias-test")
+        assert pendientes.get("Uploads", []) == []
+        assert not await storage.exists("evidencias/cortado.png")
+        await storage.close()
+
+    asyncio.run(run())
+
+def test_s3_presign_con_endpoint_publico(s3):
+    storage = s3(presign_endpoint_url="https://archivos.blindcheck.space")
+
+    async def run():
+        url = await storage.presign(
+            "evidencias/3f9a0c1b.jpg", expires=60, filename="examen.jpg", content_type="image/jpeg"
+        )
+        await storage.close()
+        return url
+
+    url = urlparse(asyncio.run(run()))
+    # Firmada para la dirección pública, no para la interna del servicio
+    assert url.netloc == "archivos.blindcheck.space"
+    assert url.path == "/evidencias-test/blindcheck/evidencias/3f9a0c1b.jpg"
+    assert "response-content-disposition" in url.query